@@ -0,0 +1,231 @@
+"""
+This module keeps the accounts in an account store, a local SQLite database, as an alternative to
+the old and new master accounts files. Most accounts are untouched on any given day, but the master
+file is rewritten in full every day. Instead, the backend reads the accounts from the store (when
+it is given as the old master accounts file) and writes back only the accounts the day's
+transactions created, changed, or deleted, with one `executemany` per kind of change in a single
+SQLite transaction. Tools can look up any account without reading the whole master file, even
+while the backend is saving, because the database is in WAL mode.
+
+The accounts are held exactly as the master file holds them, balances in whole cents, so a store
+exports the same master accounts file the flat-file backend would have written. The store does not
+keep the order the backend held the accounts in, so its current accounts file is in account number
+order, where the flat-file backend's lists accounts created during the day last.
+
+To run this module, run one of:
+`python account_store.py STORE import old_master_accounts.txt` to create a store from a file,
+`python account_store.py STORE export-master new_master_accounts.txt` to write its master file,
+`python account_store.py STORE export-current new_current_accounts.txt` to write its current
+accounts file, or `python account_store.py STORE account NUMBER` to print an account's record.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+
+from print_error import log_constraint_error
+from read import read_old_master_accounts
+from write import write_new_current_accounts, write_new_master_accounts
+
+# The record layouts are shared with the frontend through the common/ directory
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common")
+)
+from records import MASTER_ACCOUNT  # noqa: E402
+
+# Every SQLite database starts with these bytes
+MAGIC = b"SQLite format 3\x00"
+
+# Stored in the database's user_version
+VERSION = 1
+
+# The constraints are those the master file's format and the backend put on each field
+SCHEMA = """
+CREATE TABLE accounts (
+    account_number TEXT PRIMARY KEY CHECK (length(account_number) <= 5),
+    name TEXT NOT NULL CHECK (length(name) <= 20),
+    status TEXT NOT NULL CHECK (status IN ('A', 'D')),
+    balance_cents INTEGER NOT NULL CHECK (balance_cents BETWEEN 0 AND 9999999),
+    total_transactions INTEGER NOT NULL CHECK (total_transactions BETWEEN 0 AND 9999),
+    plan TEXT NOT NULL CHECK (plan IN ('SP', 'NP'))
+) WITHOUT ROWID
+"""
+
+# The columns of an account row, in order
+COLUMNS = "account_number, name, status, balance_cents, total_transactions, plan"
+
+
+def is_account_store(file_path):
+    """Return whether a file is an account store (a SQLite database) rather than a text file."""
+    try:
+        with open(file_path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def account_row(account):
+    """Return the row an account is stored as, with its balance in whole cents."""
+    return (
+        account["account_number"],
+        account["name"],
+        account["status"],
+        # Rounded exactly as the master file formats it, so the store and the file always agree
+        round(float(f"{account['balance']:.2f}") * 100),
+        account["total_transactions"],
+        account.get("plan", "NP"),
+    )
+
+
+class AccountStore:
+    """The accounts held in a SQLite database."""
+
+    def __init__(self, file_path, create=False):
+        """Open the account store at `file_path`, or create an empty one if `create` is set."""
+        self.file_path = file_path
+        self._saved = {}
+        if not create and not is_account_store(file_path):
+            log_constraint_error("Not an account store", file_path, fatal=True)
+
+        try:
+            self._connection = sqlite3.connect(file_path)
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            # With WAL, a commit is still atomic without syncing every write to disk
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+            version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+            if version == 0 and create:
+                with self._connection:
+                    self._connection.execute(SCHEMA)
+                    self._connection.execute(f"PRAGMA user_version = {VERSION}")
+            elif version != VERSION:
+                raise sqlite3.DatabaseError("unsupported version")
+        except sqlite3.Error:
+            log_constraint_error(
+                "The account store is corrupted (or an unsupported version)",
+                file_path,
+                fatal=True,
+            )
+
+    def read_accounts(self):
+        """
+        Return the stored accounts in the order of a master file, and remember them so `save`
+        only writes the accounts that changed since.
+        """
+        rows = self._connection.execute(
+            f"SELECT {COLUMNS} FROM accounts ORDER BY account_number"
+        ).fetchall()
+        self._saved = {row[0]: row for row in rows}
+        return [
+            {
+                "account_number": number,
+                "name": name,
+                "status": status,
+                "balance": cents / 100,
+                "total_transactions": total,
+                "plan": plan,
+            }
+            for number, name, status, cents, total, plan in rows
+        ]
+
+    def save(self, accounts):
+        """
+        Store the accounts as they are now, writing only the rows that were created, changed, or
+        deleted since they were read, in a single transaction. Returns the number of rows written.
+        """
+        rows = {row[0]: row for row in map(account_row, accounts)}
+        upserts = [
+            row for number, row in rows.items() if self._saved.get(number) != row
+        ]
+        deletes = [(number,) for number in self._saved if number not in rows]
+
+        try:
+            with self._connection:
+                self._connection.executemany(
+                    "DELETE FROM accounts WHERE account_number = ?", deletes
+                )
+                self._connection.executemany(
+                    f"INSERT OR REPLACE INTO accounts ({COLUMNS}) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    upserts,
+                )
+        except sqlite3.IntegrityError as e:
+            log_constraint_error(
+                f"An account does not fit the account store: {e}",
+                self.file_path,
+                fatal=True,
+            )
+
+        self._saved = rows
+        return len(upserts) + len(deletes)
+
+    def import_master(self, master_file_path):
+        """Replace the stored accounts with those of a master accounts file."""
+        self._saved = dict(
+            self._connection.execute(
+                "SELECT account_number, NULL FROM accounts"
+            ).fetchall()
+        )
+        return self.save(read_old_master_accounts(master_file_path))
+
+    def account_record(self, account_number):
+        """Return an account's master record, or None if there is no such account."""
+        row = self._connection.execute(
+            f"SELECT {COLUMNS} FROM accounts WHERE account_number = ?",
+            (account_number.lstrip("0") or "0",),
+        ).fetchone()
+        if row is None:
+            return None
+        number, name, status, cents, total, plan = row
+        return MASTER_ACCOUNT.format(number, name, status, cents / 100, total, plan)
+
+    def close(self):
+        self._connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create, export, and look up accounts in an account store."
+    )
+    parser.add_argument("store_path", help="Path to the account store")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_ = commands.add_parser(
+        "import", help="Create the store (or replace its accounts) from a master file"
+    )
+    import_.add_argument("master_path", help="Path to the master bank accounts file")
+
+    export_master = commands.add_parser(
+        "export-master", help="Write the stored accounts as a master accounts file"
+    )
+    export_master.add_argument("output_path", help="Where to write it")
+
+    export_current = commands.add_parser(
+        "export-current", help="Write the stored accounts as a current accounts file"
+    )
+    export_current.add_argument("output_path", help="Where to write it")
+
+    account = commands.add_parser("account", help="Print an account's master record")
+    account.add_argument("account_number", help="Account number")
+
+    args = parser.parse_args()
+    store = AccountStore(args.store_path, create=args.command == "import")
+
+    if args.command == "import":
+        written = store.import_master(args.master_path)
+        print(f"Imported {args.master_path} into {args.store_path} ({written} rows written)")
+    elif args.command == "export-master":
+        write_new_master_accounts(store.read_accounts(), args.output_path)
+    elif args.command == "export-current":
+        write_new_current_accounts(store.read_accounts(), args.output_path)
+    else:
+        record = store.account_record(args.account_number)
+        if record is None:
+            print(f"Account {args.account_number.zfill(5)} does not exist")
+        else:
+            print(record)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+This module benchmarks reading transactions: `read_transactions` on a text transaction file
+against the same transactions in the packed binary transaction-log format.
+
+To run this module, run `python bench_read.py [--records 200000] [--repeat 5]`.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from read import read_transactions
+from binary_transactions import pack_header, pack_record, record_from_line
+
+
+def generate_lines(count: int) -> list[str]:
+    """Generate `count` well-formed transaction lines followed by the end of transactions line."""
+    rng = random.Random(3060)
+    lines = []
+    for _ in range(count):
+        code = rng.choice(["01", "02", "03", "04"])
+        misc = "  "
+        if code == "02":
+            misc = f"{rng.randint(10001, 99999):05}"
+        elif code == "03":
+            misc = rng.choice(["EC", "CQ", "FI"])
+        lines.append(
+            f"{code} {rng.choice(['Alice', 'Bob', 'Jane Doe']).ljust(20)} "
+            f"{rng.randint(10001, 99999):05} {rng.uniform(0, 2000):08.2f} {misc}"
+        )
+    lines.append("00                      00000 00000.00   ")
+    return lines
+
+
+def best_time(function, repeat: int) -> float:
+    """Return the fastest of `repeat` timed calls to `function`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare read throughput of text and binary transaction files."
+    )
+    parser.add_argument(
+        "--records", type=int, default=200000, help="Number of transactions"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Timed reads per format (best is kept)"
+    )
+
+    args = parser.parse_args()
+
+    lines = generate_lines(args.records)
+
+    with tempfile.TemporaryDirectory() as directory:
+        text_file = os.path.join(directory, "transactions.txt")
+        binary_file = os.path.join(directory, "transactions.btx")
+
+        with open(text_file, "w") as f:
+            f.writelines(line + "\n" for line in lines)
+        with open(binary_file, "wb") as f:
+            f.write(pack_header())
+            f.writelines(pack_record(*record_from_line(line)) for line in lines)
+
+        # Both formats must produce exactly the same transactions
+        assert read_transactions(text_file) == read_transactions(binary_file)
+
+        print(f"{args.records} transactions, best of {args.repeat}")
+        for label, path in (("Text", text_file), ("Binary", binary_file)):
+            seconds = best_time(lambda: read_transactions(path), args.repeat)
+            print(
+                f"{label:<7} {os.path.getsize(path) / 1024 / 1024:7.2f} MiB   "
+                f"{seconds:7.3f} s   {args.records / seconds:12,.0f} records/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
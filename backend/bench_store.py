@@ -0,0 +1,149 @@
+"""
+This module benchmarks a day's run on flat master files against the same run on an account store:
+reading the accounts, applying the day's transactions (with the batch engine), and writing the new
+current and master accounts files or saving the changed accounts to the store.
+
+To run this module, run `python bench_store.py [--accounts 1000 10000 99999] [--transactions 1000]
+[--repeat 5]`.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from account_store import AccountStore
+from batch import apply_transactions_batched
+from read import read_old_master_accounts, read_transactions
+from records import MASTER_ACCOUNT, MASTER_END_OF_FILE
+from write import write_new_current_accounts, write_new_master_accounts
+
+
+def generate_master_lines(count: int) -> tuple[list[str], list[int]]:
+    """Generate a master accounts file of `count` accounts, returning it and the account numbers."""
+    rng = random.Random(3060)
+    numbers = rng.sample(range(1, 100000), count)
+    lines = [
+        MASTER_ACCOUNT.format(
+            number,
+            "Alice",
+            "A",
+            rng.uniform(0, 50000),
+            rng.randint(0, 999),
+            rng.choice(["SP", "NP"]),
+        )
+        for number in sorted(numbers, key=str)
+    ]
+    return lines + [MASTER_END_OF_FILE], numbers
+
+
+def generate_transaction_lines(count: int, numbers: list[int]) -> list[str]:
+    """Generate `count` deposits into the accounts, followed by the end of transactions line."""
+    rng = random.Random(3060)
+    lines = [
+        f"04 {'Alice':<20} {rng.choice(numbers):05} {rng.uniform(0, 1000):08.2f}   "
+        for _ in range(count)
+    ]
+    return lines + ["00                      00000 00000.00   "]
+
+
+def best_time(function, repeat: int, setup=None) -> float:
+    """Return the fastest of `repeat` timed calls to `function`, each after an untimed `setup`."""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare a day's run on flat master files and on an account store."
+    )
+    parser.add_argument(
+        "--accounts",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 99999],
+        help="Numbers of accounts to time (at most 99999)",
+    )
+    parser.add_argument(
+        "--transactions", type=int, default=1000, help="Transactions in the day"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Timed runs of each case (best is kept)"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{args.transactions} deposits a day, best of {args.repeat}\n"
+        f"{'Accounts':>8}  {'Flat files':>10}  {'Store':>10}  {'Rows saved':>10}"
+    )
+    for count in args.accounts:
+        master_lines, numbers = generate_master_lines(count)
+
+        with tempfile.TemporaryDirectory() as directory:
+            master_path = os.path.join(directory, "old_master_accounts.txt")
+            transactions_path = os.path.join(directory, "transactions.txt")
+            current_path = os.path.join(directory, "new_current_accounts.txt")
+            new_master_path = os.path.join(directory, "new_master_accounts.txt")
+            store_path = os.path.join(directory, "accounts.db")
+            day_store_path = os.path.join(directory, "day.db")
+
+            with open(master_path, "w") as f:
+                f.writelines(line + "\n" for line in master_lines)
+            with open(transactions_path, "w") as f:
+                f.writelines(
+                    line + "\n"
+                    for line in generate_transaction_lines(args.transactions, numbers)
+                )
+            transactions = read_transactions(transactions_path)
+
+            store = AccountStore(store_path, create=True)
+            store.import_master(master_path)
+            store.close()
+
+            def flat_run():
+                accounts = read_old_master_accounts(master_path)
+                apply_transactions_batched(accounts, transactions)
+                write_new_current_accounts(accounts, current_path)
+                write_new_master_accounts(accounts, new_master_path)
+
+            # Every run starts from the same store, copied outside the timing
+            def copy_store():
+                shutil.copyfile(store_path, day_store_path)
+
+            saved = []
+
+            def store_run():
+                day_store = AccountStore(day_store_path)
+                accounts = day_store.read_accounts()
+                apply_transactions_batched(accounts, transactions)
+                saved.append(day_store.save(accounts))
+                day_store.close()
+
+            flat_seconds = best_time(flat_run, args.repeat)
+            store_seconds = best_time(store_run, args.repeat, setup=copy_store)
+
+            # Both must leave the same master file
+            with open(new_master_path) as f:
+                flat_master = f.read()
+            day_store = AccountStore(day_store_path)
+            write_new_master_accounts(day_store.read_accounts(), new_master_path)
+            day_store.close()
+            with open(new_master_path) as f:
+                assert f.read() == flat_master
+
+        print(
+            f"{count:>8}  {flat_seconds * 1000:>8.1f}ms  {store_seconds * 1000:>8.1f}ms  "
+            f"{saved[-1]:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
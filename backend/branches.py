@@ -0,0 +1,201 @@
+"""
+This module runs the backend for several branches in one invocation. A manifest lists each branch's
+name and files, one branch per line:
+
+    BRANCH OLD_MASTER_ACCOUNTS MERGED_TRANSACTIONS NEW_CURRENT_ACCOUNTS NEW_MASTER_ACCOUNTS
+
+Blank lines and lines starting with `#` are ignored, and relative paths are relative to the
+manifest's directory. The branches run concurrently in a bounded pool of worker processes. Each
+branch runs exactly as a single backend run would, with its standard output and error held in
+memory, so a branch's fatal error only ends that branch. Each branch's output is printed under a
+header as it finishes, followed by a combined summary of every branch. A branch stopped by its time
+budget is reported as stopped rather than failed.
+
+The other path options (`--summary-report`, `--validation-cache`, `--seen-sessions`, `--history`,
+`--metrics`, and `--resume-state`) apply to every branch, so they must contain `{branch}`, which is
+replaced by the branch's name.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import print_error
+from metrics import RunMetrics
+from print_error import log_constraint_error
+from progress import STOPPED_EXIT_CODE
+
+# Options holding a path that each branch needs its own copy of
+BRANCH_PATH_OPTIONS = [
+    "summary_report",
+    "validation_cache",
+    "seen_sessions",
+    "history",
+    "metrics",
+    "resume_state",
+]
+
+
+def read_manifest(manifest_path):
+    """Read a manifest into a list of branches, each a dictionary of its name and file paths."""
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    branches = []
+    names = set()
+    with open(manifest_path, "r") as file:
+        for line_num, line in enumerate(file, start=1):
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            if len(fields) != 5:
+                log_constraint_error(
+                    f"Line {line_num}: Expected a branch name and four paths, got '{line.rstrip()}'",
+                    manifest_path,
+                    fatal=True,
+                )
+            name = fields[0]
+            if name in names:
+                log_constraint_error(
+                    f"Line {line_num}: Duplicate branch '{name}'",
+                    manifest_path,
+                    fatal=True,
+                )
+            names.add(name)
+
+            paths = [os.path.join(base, path) for path in fields[1:]]
+            branches.append(
+                {
+                    "name": name,
+                    "old_master_accounts_path": paths[0],
+                    "transactions_path": paths[1],
+                    "new_current_accounts_path": paths[2],
+                    "new_master_accounts_path": paths[3],
+                }
+            )
+    return branches
+
+
+def branch_args(args, branch):
+    """Return the command line arguments of a single run of the backend for one branch."""
+    options = dict(vars(args), manifest=None)
+    for option in BRANCH_PATH_OPTIONS:
+        if options[option] is not None:
+            options[option] = options[option].replace("{branch}", branch["name"])
+    options.update(
+        (key, value) for key, value in branch.items() if key.endswith("_path")
+    )
+    return argparse.Namespace(**options)
+
+
+def run_branch(args, branch):
+    """Run the backend for one branch in this process and return the outcome of the run."""
+    import main as backend
+
+    # A worker process runs many branches, so the error counts start again for each one
+    for severity in print_error.error_counts:
+        print_error.error_counts[severity] = 0
+
+    run_args = branch_args(args, branch)
+    metrics = RunMetrics()
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            try:
+                backend.run(run_args, metrics, count_transactions=True)
+            except SystemExit as e:
+                metrics.exit_code = e.code
+            except Exception:
+                # An unexpected error in one branch is reported like a fatal error
+                traceback.print_exc()
+                metrics.exit_code = 1
+    finally:
+        if run_args.metrics is not None:
+            metrics.write(run_args.metrics)
+
+    # The transaction counts are in the summary if the branch keeps one, or the counters if not
+    applied = rejected = None
+    if metrics.summary is not None:
+        applied = sum(count for count, _ in metrics.summary.applied.values())
+        rejected = sum(count for count, _ in metrics.summary.rejected.values())
+    elif metrics.counters is not None:
+        applied = sum(metrics.counters.applied.values())
+        rejected = sum(metrics.counters.rejected.values())
+
+    return {
+        "name": branch["name"],
+        "exit_code": metrics.exit_code,
+        "output": output.getvalue(),
+        "seconds": time.perf_counter() - start,
+        "accounts": metrics.records_read.get("old_master_accounts"),
+        "applied": applied,
+        "rejected": rejected,
+        "errors": dict(print_error.error_counts),
+    }
+
+
+def run_manifest(args):
+    """
+    Run every branch of the manifest in a pool of `args.workers` processes, print each branch's
+    output as it finishes and then the combined summary, and return the exit code of the whole run:
+    1 if any branch failed, STOPPED_EXIT_CODE if any branch stopped on its time budget, or 0.
+    """
+    branches = read_manifest(args.manifest)
+    results = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {
+            executor.submit(run_branch, args, branch): branch["name"]
+            for branch in branches
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[result["name"]] = result
+            print(f"== Branch {result['name']} (exit code {result['exit_code']}) ==")
+            print(result["output"], end="")
+    elapsed = time.perf_counter() - start
+
+    print(format_summary([results[branch["name"]] for branch in branches], elapsed), end="")
+    exit_codes = {result["exit_code"] for result in results.values()}
+    if exit_codes - {0, STOPPED_EXIT_CODE}:
+        return 1
+    return STOPPED_EXIT_CODE if STOPPED_EXIT_CODE in exit_codes else 0
+
+
+def branch_result(exit_code):
+    """Return how a branch with the given exit code is shown in the summary."""
+    if exit_code == 0:
+        return "OK"
+    return "STOPPED" if exit_code == STOPPED_EXIT_CODE else "FAILED"
+
+
+def format_summary(results, elapsed):
+    """Return the combined summary of the branch runs as text."""
+
+    def column(value):
+        return "-" if value is None else value
+
+    lines = [
+        "== Summary ==",
+        f"{'Branch':<20} {'Result':<7} {'Accounts':>9} {'Applied':>9} {'Rejected':>9} "
+        f"{'Errors':>7} {'Seconds':>8}",
+    ]
+    for result in results:
+        errors = result["errors"]["fatal"] + result["errors"]["non_fatal"]
+        lines.append(
+            f"{result['name']:<20} {branch_result(result['exit_code']):<7} "
+            f"{column(result['accounts']):>9} {column(result['applied']):>9} "
+            f"{column(result['rejected']):>9} {errors:>7} {result['seconds']:>8.2f}"
+        )
+
+    succeeded = sum(result["exit_code"] == 0 for result in results)
+    stopped = sum(result["exit_code"] == STOPPED_EXIT_CODE for result in results)
+    failed = len(results) - succeeded - stopped
+    lines.append(
+        f"{len(results)} branches: {succeeded} succeeded, {stopped} stopped, "
+        f"{failed} failed in {elapsed:.2f} s"
+    )
+    return "\n".join(lines) + "\n"
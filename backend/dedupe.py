@@ -0,0 +1,282 @@
+"""
+This module suppresses replayed sessions. When a teller terminal retries an upload, the same session
+can appear in the merged transactions file twice (or appear again on a later day), and posting it
+again would repeat every withdrawal and deposit in it. Sessions written by the frontend with
+`--session-ids` carry a unique ID on their end of session line; the backend remembers every ID it
+has applied in a persistent seen-set and skips any session whose ID it has seen before.
+
+The seen-set is a directory holding two files:
+
+- `seen.idx`: every applied session ID as a 16-byte BLAKE2b digest, sorted. It is memory-mapped
+  and binary searched in place, so it is never loaded into memory however long the history gets.
+- `seen.bloom`: a Bloom filter over the same digests. Almost every new session ID is ruled out
+  by the filter alone, so the index is only searched for actual replays and rare false positives.
+
+Memory use is the Bloom filter (about 1.2 MB per million IDs of capacity) plus the IDs added
+in the current run. When the history outgrows the filter's capacity, the filter is rebuilt at
+twice the size the next time the seen-set is saved.
+"""
+
+import hashlib
+import heapq
+import itertools
+import math
+import mmap
+import os
+import struct
+
+from fileio import replace_file
+from print_error import log_constraint_error
+
+# Index file: header (magic, format version, digest count) followed by the sorted digests
+INDEX_FILE = "seen.idx"
+INDEX_HEADER = struct.Struct("<4sHQ")
+INDEX_MAGIC = b"BKSI"
+
+# Bloom filter file: header (magic, format version, hash count, bit count, capacity) and the bits
+BLOOM_FILE = "seen.bloom"
+BLOOM_HEADER = struct.Struct("<4sHHQQ")
+BLOOM_MAGIC = b"BKBF"
+
+VERSION = 1
+DIGEST_SIZE = 16
+
+# The filter is sized for this many IDs at a 1% false positive rate until the history outgrows it
+DEFAULT_CAPACITY = 1_000_000
+FALSE_POSITIVE_RATE = 0.01
+
+# Number of digests read from the old index at a time while merging in the new ones
+MERGE_CHUNK = 4096
+
+
+def session_digest(session_id):
+    """Return the fixed-size digest stored for a session ID."""
+    return hashlib.blake2b(session_id.encode(), digest_size=DIGEST_SIZE).digest()
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter over session digests, using double hashing on the digest halves."""
+
+    def __init__(self, capacity):
+        """Create an empty filter sized for `capacity` digests at the target false positive rate."""
+        self.capacity = capacity
+        self.bit_count = max(
+            64,
+            math.ceil(-capacity * math.log(FALSE_POSITIVE_RATE) / math.log(2) ** 2),
+        )
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+
+    def _positions(self, digest):
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return (
+            (first + i * second) % self.bit_count for i in range(self.hash_count)
+        )
+
+    def add(self, digest):
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(digest)
+        )
+
+
+class SeenSessions:
+    """
+    The persistent set of session IDs that have already been applied.
+
+    IDs added with `add` are checked along with the stored history straight away, so a session
+    repeated within one merged file is caught too, but they are only written to disk by `save`.
+    """
+
+    def __init__(self, directory, capacity=DEFAULT_CAPACITY):
+        """Open the seen-set stored in `directory` (which is created on save if it does not exist)."""
+        self.directory = directory
+        self.new_digests = set()
+
+        self.index = None
+        self.count = 0
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path) and os.path.getsize(index_path) > 0:
+            with open(index_path, "rb") as f:
+                self.index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.count = INDEX_HEADER.unpack_from(self.index, 0)
+            if magic != INDEX_MAGIC or version != VERSION:
+                log_constraint_error(
+                    "Not a seen-session index (or an unsupported version)",
+                    index_path,
+                    fatal=True,
+                )
+            if len(self.index) != INDEX_HEADER.size + DIGEST_SIZE * self.count:
+                log_constraint_error(
+                    "The seen-session index is truncated or corrupted",
+                    index_path,
+                    fatal=True,
+                )
+
+        self.bloom = self._load_bloom(max(capacity, self.count))
+
+    def _load_bloom(self, capacity):
+        """Read the stored Bloom filter, or rebuild it from the index if it is missing or stale."""
+        bloom_path = os.path.join(self.directory, BLOOM_FILE)
+        if os.path.exists(bloom_path):
+            with open(bloom_path, "rb") as f:
+                header = f.read(BLOOM_HEADER.size)
+                bits = f.read()
+            if len(header) == BLOOM_HEADER.size:
+                magic, version, hash_count, bit_count, stored_capacity = (
+                    BLOOM_HEADER.unpack(header)
+                )
+                bloom = BloomFilter(stored_capacity)
+                if (
+                    magic == BLOOM_MAGIC
+                    and version == VERSION
+                    and (bloom.hash_count, bloom.bit_count) == (hash_count, bit_count)
+                    and len(bits) == len(bloom.bits)
+                ):
+                    bloom.bits[:] = bits
+                    return bloom
+
+        # The filter is only an accelerator, so a missing or damaged one is rebuilt from the index
+        bloom = BloomFilter(capacity)
+        for digest in self._stored_digests():
+            bloom.add(digest)
+        return bloom
+
+    def _stored_digest(self, index):
+        offset = INDEX_HEADER.size + DIGEST_SIZE * index
+        return self.index[offset : offset + DIGEST_SIZE]
+
+    def _stored_digests(self):
+        """Yield the digests in the index in sorted order, reading them a chunk at a time."""
+        for start in range(0, self.count, MERGE_CHUNK):
+            offset = INDEX_HEADER.size + DIGEST_SIZE * start
+            chunk = self.index[
+                offset : offset + DIGEST_SIZE * min(MERGE_CHUNK, self.count - start)
+            ]
+            for i in range(0, len(chunk), DIGEST_SIZE):
+                yield chunk[i : i + DIGEST_SIZE]
+
+    def _stored(self, digest):
+        """Binary search the index for a digest."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._stored_digest(middle) < digest:
+                low = middle + 1
+            else:
+                high = middle
+        return low < self.count and self._stored_digest(low) == digest
+
+    def __contains__(self, session_id):
+        digest = session_digest(session_id)
+        if digest in self.new_digests:
+            return True
+        if digest not in self.bloom:
+            return False
+        return self._stored(digest)
+
+    def __len__(self):
+        return self.count + len(self.new_digests)
+
+    def add(self, session_id):
+        """Remember a session ID as applied."""
+        digest = session_digest(session_id)
+        self.new_digests.add(digest)
+        self.bloom.add(digest)
+
+    def save(self):
+        """Merge the IDs added in this run into the stored seen-set."""
+        if not self.new_digests:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Double the filter once the history outgrows it, so its false positive rate stays low
+        total = self.count + len(self.new_digests)
+        bloom = self.bloom
+        if total > bloom.capacity:
+            bloom = BloomFilter(max(total, bloom.capacity * 2))
+            for digest in self._stored_digests():
+                bloom.add(digest)
+            for digest in self.new_digests:
+                bloom.add(digest)
+
+        # The filter is written first: if the index write is interrupted, the filter only has
+        # extra bits set, which costs index lookups but never lets a replay through
+        replace_file(
+            os.path.join(self.directory, BLOOM_FILE),
+            [
+                BLOOM_HEADER.pack(
+                    BLOOM_MAGIC,
+                    VERSION,
+                    bloom.hash_count,
+                    bloom.bit_count,
+                    bloom.capacity,
+                ),
+                bloom.bits,
+            ],
+            binary=True,
+            sync=True,
+        )
+
+        # The new digests are merged into the sorted index as a stream, never holding it in memory
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        replace_file(
+            index_path,
+            itertools.chain(
+                [INDEX_HEADER.pack(INDEX_MAGIC, VERSION, total)],
+                heapq.merge(self._stored_digests(), sorted(self.new_digests)),
+            ),
+            binary=True,
+            sync=True,
+        )
+
+        # Reopen the new index so that the seen-set stays usable after saving
+        if self.index is not None:
+            self.index.close()
+        with open(index_path, "rb") as f:
+            self.index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = total
+        self.bloom = bloom
+        self.new_digests = set()
+
+    def close(self):
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+
+def skip_replayed_sessions(transactions, seen_sessions):
+    """
+    Yield the transactions without the sessions that have already been applied, and add the
+    IDs of the remaining sessions to `seen_sessions`. Transactions without a session ID are
+    always kept. Each skipped session is logged.
+    """
+    current_session = None
+    replayed = False
+
+    for transaction in transactions:
+        session_id = transaction["session_id"]
+        if session_id is None:
+            yield transaction
+            continue
+
+        # Decide once per session, when its first transaction is reached
+        if transaction["session_number"] != current_session:
+            current_session = transaction["session_number"]
+            replayed = session_id in seen_sessions
+            if replayed:
+                log_constraint_error(
+                    f"Session '{session_id}' has already been applied, skipping it",
+                    f"DUPLICATE SESSION {current_session}",
+                    fatal=False,
+                )
+            else:
+                seen_sessions.add(session_id)
+
+        if not replayed:
+            yield transaction
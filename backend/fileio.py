@@ -0,0 +1,213 @@
+"""
+This module opens the backend's account and transaction files, which may be compressed with
+gzip, xz, or bzip2. Compressed files are decompressed and compressed as a stream, a large block at
+a time, so archived files can be read and written directly without a temporary uncompressed copy
+or an extra pass over the data.
+
+A file being read is recognized as compressed by its magic bytes, whatever its name. A file being
+written is compressed if its name ends with the compression's extension (`.gz`, `.xz`, or `.bz2`).
+Uncompressed files are opened exactly as before.
+
+It also holds the helpers the backend's modules share to replace a file atomically and to tell
+whether a file has changed.
+"""
+
+import bz2
+import io
+import os
+import lzma
+import zlib
+
+from print_error import log_constraint_error
+
+# Size of the blocks read from a compressed file, and of the buffers in front of the streams
+READ_BUFFER_SIZE = 1024 * 1024
+
+# Magic bytes, file name extensions, and (de)compressor factories of each compression
+COMPRESSIONS = {
+    "gzip": {
+        "magic": b"\x1f\x8b",
+        "extensions": (".gz", ".gzip"),
+        # wbits=31 reads and writes the gzip header and trailer around the deflate stream
+        "decompressor": lambda: zlib.decompressobj(wbits=31),
+        "compressor": lambda: zlib.compressobj(wbits=31),
+    },
+    "xz": {
+        "magic": b"\xfd7zXZ\x00",
+        "extensions": (".xz",),
+        "decompressor": lzma.LZMADecompressor,
+        "compressor": lzma.LZMACompressor,
+    },
+    "bzip2": {
+        "magic": b"BZh",
+        "extensions": (".bz2",),
+        "decompressor": bz2.BZ2Decompressor,
+        "compressor": bz2.BZ2Compressor,
+    },
+}
+
+_MAGIC_LENGTH = max(len(compression["magic"]) for compression in COMPRESSIONS.values())
+
+
+def detect_compression(file_path):
+    """Return the compression of an existing file from its magic bytes, or None if it has none."""
+    with open(file_path, "rb") as file:
+        prefix = file.read(_MAGIC_LENGTH)
+    for name, compression in COMPRESSIONS.items():
+        if prefix.startswith(compression["magic"]):
+            return name
+    return None
+
+
+def compression_for_path(file_path):
+    """Return the compression of a file to be written from its extension, or None if it has none."""
+    for name, compression in COMPRESSIONS.items():
+        if file_path.endswith(compression["extensions"]):
+            return name
+    return None
+
+
+def open_input(file_path, mode="r"):
+    """
+    Open a file for reading in text mode ("r") or binary mode ("rb"), decompressing it as it is
+    read if it is compressed.
+    """
+    compression = detect_compression(file_path)
+    if compression is None:
+        return open(file_path, mode)
+
+    file = io.BufferedReader(
+        DecompressingReader(file_path, compression), READ_BUFFER_SIZE
+    )
+    return file if "b" in mode else io.TextIOWrapper(file)
+
+
+def open_output(file_path, buffering=READ_BUFFER_SIZE):
+    """
+    Open a file for writing text through a buffer of `buffering` bytes, compressing it as it is
+    written if its extension names a compression.
+    """
+    compression = compression_for_path(file_path)
+    if compression is None:
+        return open(file_path, "w", buffering=buffering)
+
+    return io.TextIOWrapper(
+        io.BufferedWriter(CompressingWriter(file_path, compression), buffering)
+    )
+
+
+def replace_file(file_path, chunks, binary=False, sync=False):
+    """
+    Write a file atomically, so readers never see it half-written: the chunks (bytes if `binary`
+    is set, text otherwise) are written to a temporary file that then replaces it. The file's
+    directory is created if needed, and with `sync` the data is on disk before the file is
+    replaced.
+    """
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    temporary_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb" if binary else "w") as file:
+        file.writelines(chunks)
+        if sync:
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(temporary_path, file_path)
+
+
+def file_fingerprint(file_path):
+    """Identify a version of a file by its size and modification time."""
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class DecompressingReader(io.RawIOBase):
+    """
+    A read-only raw file holding the decompressed contents of a compressed file. Concatenated
+    streams (as written by `cat a.gz b.gz` or parallel compressors) are read one after another.
+    """
+
+    def __init__(self, file_path, compression):
+        """Open the compressed file."""
+        super().__init__()
+        self.file_path = file_path
+        self.compression = compression
+        self._new_decompressor = COMPRESSIONS[compression]["decompressor"]
+        self._decompressor = self._new_decompressor()
+        self._file = open(file_path, "rb", buffering=0)
+        self._current = memoryview(b"")
+        self._at_end = False
+
+    def readable(self):
+        return True
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def readinto(self, buffer):
+        while not self._current:
+            if self._at_end:
+                return 0
+            self._current = memoryview(self._decompress_block())
+
+        size = min(len(buffer), len(self._current))
+        buffer[:size] = self._current[:size]
+        self._current = self._current[size:]
+        return size
+
+    def _decompress_block(self):
+        """Read and decompress the next block of the file (which may decompress to nothing)."""
+        data = self._file.read(READ_BUFFER_SIZE)
+        if not data:
+            self._at_end = True
+            if not self._decompressor.eof:
+                log_constraint_error(
+                    f"The file ended before the end of its {self.compression} stream",
+                    self.file_path,
+                    fatal=True,
+                )
+            return b""
+
+        try:
+            # A stream that ended exactly at the end of the last block is followed by another one
+            if self._decompressor.eof:
+                self._decompressor = self._new_decompressor()
+            output = self._decompressor.decompress(data)
+            # Start a new stream after the end of each one
+            while self._decompressor.eof and self._decompressor.unused_data:
+                data = self._decompressor.unused_data
+                self._decompressor = self._new_decompressor()
+                output += self._decompressor.decompress(data)
+        except (zlib.error, lzma.LZMAError, OSError, EOFError) as e:
+            log_constraint_error(
+                f"Not valid {self.compression} data: {e}", self.file_path, fatal=True
+            )
+        return output
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+class CompressingWriter(io.RawIOBase):
+    """A write-only raw file that compresses everything written to it into a file."""
+
+    def __init__(self, file_path, compression):
+        """Create (or replace) the compressed file."""
+        super().__init__()
+        self._compressor = COMPRESSIONS[compression]["compressor"]()
+        self._file = open(file_path, "wb", buffering=READ_BUFFER_SIZE)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._file.write(self._compressor.compress(data))
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            try:
+                self._file.write(self._compressor.flush())
+            finally:
+                self._file.close()
+        super().close()
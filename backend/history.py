@@ -0,0 +1,330 @@
+"""
+This module keeps a compact history of the master bank accounts file, so any account (or the
+whole master file) can be rebuilt as it was at the end of any recorded day.
+
+Instead of a full copy of every day's master file, the history directory holds:
+
+- `snapshots/DATE.txt`: a full copy of the master file every SNAPSHOT_INTERVAL days (and whenever
+  a day changes most of the accounts), with the records sorted by account number and without the
+  end of file line, so a single account can be found by binary search.
+- `deltas/DATE.txt`: for every other day, only the records that changed since the day before: a
+  `U` line with the new record for each created or updated account, and a `D` line with the
+  account number for each deleted account.
+- `index.json`: the recorded days and, for every account, the days on which a delta changed it.
+
+An account is rebuilt from the last snapshot before the date and, if the index shows it changed
+since, the one delta that changed it last. The whole master file is rebuilt from the last
+snapshot and at most SNAPSHOT_INTERVAL - 1 deltas, never from the start of the history.
+
+To run this module, run one of:
+`python history.py DIR record DATE new_master_accounts.txt` to add a day's master file,
+`python history.py DIR account NUMBER DATE` to print an account's record as of a date, or
+`python history.py DIR master DATE [OUTPUT]` to rebuild the master file as of a date.
+"""
+
+import argparse
+import bisect
+import datetime
+import json
+import os
+import sys
+
+from fileio import open_input, replace_file
+from print_error import log_constraint_error
+
+# The record layouts are shared with the frontend through the common/ directory
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common")
+)
+from records import MASTER_ACCOUNT, MASTER_END_OF_FILE  # noqa: E402
+
+INDEX_FILE = "index.json"
+SNAPSHOT_DIRECTORY = "snapshots"
+DELTA_DIRECTORY = "deltas"
+VERSION = 1
+
+# Days between full snapshots, and the share of changed accounts that forces a snapshot early
+SNAPSHOT_INTERVAL = 7
+SNAPSHOT_CHANGE_RATIO = 0.5
+
+# Every master record is this many characters long, followed by a newline
+RECORD_LENGTH = MASTER_ACCOUNT.length
+
+# Where a master record holds its account key
+ACCOUNT_NUMBER = MASTER_ACCOUNT.slices["account_number"]
+END_OF_FILE_KEY = MASTER_END_OF_FILE[ACCOUNT_NUMBER]
+
+
+def account_key(account_number):
+    """Return the five digit key a record is stored under for an account number."""
+    return str(account_number).zfill(5)
+
+
+def master_order(key):
+    """Sort key putting records in the order the backend writes the master file in."""
+    return key.lstrip("0") or "0"
+
+
+def read_master_records(file_path):
+    """Read a master bank accounts file into a dictionary of account key: record."""
+    records = {}
+    with open_input(file_path) as file:
+        for i, line in enumerate(file, start=1):
+            record = line.rstrip("\n")
+            key = record[ACCOUNT_NUMBER]
+            if key == END_OF_FILE_KEY:
+                break
+            if len(record) != RECORD_LENGTH or not key.isdigit():
+                log_constraint_error(
+                    f"Line {i}: Not a master account record: '{record}'",
+                    file_path,
+                    fatal=True,
+                )
+            if key in records:
+                log_constraint_error(
+                    f"Line {i}: Duplicate account number '{key}'",
+                    file_path,
+                    fatal=True,
+                )
+            records[key] = record
+    return records
+
+
+def validate_date(date):
+    """Return a date given as YYYY-MM-DD in the same form, or exit with an error."""
+    try:
+        return datetime.date.fromisoformat(date).isoformat()
+    except ValueError:
+        log_constraint_error(
+            f"Invalid date '{date}', expected YYYY-MM-DD", "history", fatal=True
+        )
+
+
+class MasterHistory:
+    """The history of master files stored in a directory."""
+
+    def __init__(self, directory):
+        """Open the history in `directory` (which is created when the first day is recorded)."""
+        self.directory = directory
+        self.days = []
+        self.snapshots = []
+        self.changes = {}
+
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, "r") as file:
+                    index = json.load(file)
+                if index.get("version") != VERSION:
+                    raise ValueError("unsupported version")
+                self.days = [(date, kind) for date, kind in index["days"]]
+                self.changes = index["changes"]
+            except (OSError, ValueError, KeyError, TypeError):
+                log_constraint_error(
+                    "The history index is corrupted (or an unsupported version)",
+                    index_path,
+                    fatal=True,
+                )
+            self.snapshots = [date for date, kind in self.days if kind == "snapshot"]
+
+    def _path(self, kind, date):
+        directory = SNAPSHOT_DIRECTORY if kind == "snapshot" else DELTA_DIRECTORY
+        return os.path.join(self.directory, directory, f"{date}.txt")
+
+    def _save_index(self):
+        """Write the index atomically, after the day's snapshot or delta has been written."""
+        index = {"version": VERSION, "days": self.days, "changes": self.changes}
+        replace_file(os.path.join(self.directory, INDEX_FILE), [json.dumps(index)])
+
+    def _recorded_day(self, date):
+        """Return the position of the last recorded day on or before a date, or -1 if none."""
+        return bisect.bisect_right(self.days, (date, "~")) - 1
+
+    def record(self, date, master_file_path):
+        """
+        Add a day's master file to the history. Days must be recorded in order, but the last day
+        may be recorded again (when the backend is rerun), which replaces it.
+        """
+        date = validate_date(date)
+        if self.days and date < self.days[-1][0]:
+            log_constraint_error(
+                f"Cannot record {date} after the later day {self.days[-1][0]}",
+                self.directory,
+                fatal=True,
+            )
+        if self.days and date == self.days[-1][0]:
+            self._forget_last_day()
+
+        records = read_master_records(master_file_path)
+        previous = self.master_records(self.days[-1][0]) if self.days else {}
+
+        # Compare with the day before to find the records that were created, updated, or deleted
+        upserts = [
+            record for key, record in records.items() if previous.get(key) != record
+        ]
+        deletes = [key for key in previous if key not in records]
+
+        # Take a snapshot every SNAPSHOT_INTERVAL days, so at most SNAPSHOT_INTERVAL - 1 deltas
+        # are ever applied to rebuild a day, or sooner if the delta would be most of the file
+        if (
+            not self.snapshots
+            or len(self.days) - self._recorded_day(self.snapshots[-1])
+            >= SNAPSHOT_INTERVAL
+            or len(upserts) + len(deletes)
+            > SNAPSHOT_CHANGE_RATIO * max(len(records), 1)
+        ):
+            replace_file(
+                self._path("snapshot", date),
+                (f"{records[key]}\n" for key in sorted(records)),
+            )
+            self.days.append((date, "snapshot"))
+            self.snapshots.append(date)
+        else:
+            replace_file(
+                self._path("delta", date),
+                [f"U {record}\n" for record in sorted(upserts)]
+                + [f"D {key}\n" for key in sorted(deletes)],
+            )
+            self.days.append((date, "delta"))
+            for key in [record[ACCOUNT_NUMBER] for record in upserts] + deletes:
+                self.changes.setdefault(key, []).append(date)
+
+        self._save_index()
+
+    def _forget_last_day(self):
+        """Drop the last recorded day from the index, so it can be recorded again."""
+        date, kind = self.days.pop()
+        if kind == "snapshot":
+            self.snapshots.pop()
+            return
+        for key, _ in self._read_delta(date):
+            dates = self.changes[key]
+            dates.pop()
+            if not dates:
+                del self.changes[key]
+
+    def _read_delta(self, date):
+        """Yield the (account key, record or None if deleted) pairs of a day's delta."""
+        with open(self._path("delta", date), "r") as file:
+            for line in file:
+                kind, _, rest = line.rstrip("\n").partition(" ")
+                if kind == "U":
+                    yield rest[ACCOUNT_NUMBER], rest
+                else:
+                    yield rest, None
+
+    def _snapshot_for(self, date):
+        """Return the date of the last snapshot on or before a date, or exit if there is none."""
+        position = bisect.bisect_right(self.snapshots, date) - 1
+        if position < 0:
+            log_constraint_error(
+                f"The history has no master file on or before {date}",
+                self.directory,
+                fatal=True,
+            )
+        return self.snapshots[position]
+
+    def account_record(self, account_number, date):
+        """
+        Return an account's master record as of the end of a day, or None if the account did
+        not exist then. Reads one delta or one binary search of a snapshot, never the history.
+        """
+        date = validate_date(date)
+        key = account_key(account_number)
+        snapshot = self._snapshot_for(date)
+
+        # If a delta after the snapshot changed the account, the last such delta has its record
+        dates = self.changes.get(key, [])
+        position = bisect.bisect_right(dates, date) - 1
+        if position >= 0 and dates[position] > snapshot:
+            for changed_key, record in self._read_delta(dates[position]):
+                if changed_key == key:
+                    return record
+
+        return self._search_snapshot(snapshot, key)
+
+    def _search_snapshot(self, snapshot, key):
+        """Binary search a snapshot's fixed length, sorted records for an account key."""
+        with open(self._path("snapshot", snapshot), "rb") as file:
+            low, high = 0, os.fstat(file.fileno()).st_size // (RECORD_LENGTH + 1)
+            while low < high:
+                middle = (low + high) // 2
+                file.seek(middle * (RECORD_LENGTH + 1))
+                record = file.read(RECORD_LENGTH).decode()
+                if record[ACCOUNT_NUMBER] < key:
+                    low = middle + 1
+                elif record[ACCOUNT_NUMBER] > key:
+                    high = middle
+                else:
+                    return record
+        return None
+
+    def master_records(self, date):
+        """Return the whole master file as of the end of a day, as a dictionary of key: record."""
+        snapshot = self._snapshot_for(date)
+        with open(self._path("snapshot", snapshot), "r") as file:
+            records = {line[ACCOUNT_NUMBER]: line.rstrip("\n") for line in file}
+
+        # Apply the deltas recorded after the snapshot, up to and including the date
+        first = self._recorded_day(snapshot) + 1
+        for day, _ in self.days[first : self._recorded_day(date) + 1]:
+            for key, record in self._read_delta(day):
+                if record is None:
+                    records.pop(key, None)
+                else:
+                    records[key] = record
+        return records
+
+    def write_master(self, date, file_path):
+        """Write the master file as it was at the end of a day, in the backend's format."""
+        records = self.master_records(validate_date(date))
+        replace_file(
+            file_path,
+            [f"{records[key]}\n" for key in sorted(records, key=master_order)]
+            + [f"{MASTER_END_OF_FILE}\n"],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Record master files in a compact history and rebuild them as of any day."
+    )
+    parser.add_argument("directory", help="Directory holding the history")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Add a day's master file to the history")
+    record.add_argument("date", help="Day of the master file (YYYY-MM-DD)")
+    record.add_argument("master_path", help="Path to the master bank accounts file")
+
+    account = commands.add_parser("account", help="Print an account's record as of a day")
+    account.add_argument("account_number", help="Account number")
+    account.add_argument("date", help="Day to look up (YYYY-MM-DD)")
+
+    master = commands.add_parser("master", help="Rebuild the master file as of a day")
+    master.add_argument("date", help="Day to rebuild (YYYY-MM-DD)")
+    master.add_argument(
+        "output_path", nargs="?", help="Where to write it (printed if left out)"
+    )
+
+    args = parser.parse_args()
+    history = MasterHistory(args.directory)
+
+    if args.command == "record":
+        history.record(args.date, args.master_path)
+    elif args.command == "account":
+        record = history.account_record(args.account_number, args.date)
+        if record is None:
+            print(f"Account {account_key(args.account_number)} did not exist on {args.date}")
+        else:
+            print(record)
+    elif args.output_path is not None:
+        history.write_master(args.date, args.output_path)
+    else:
+        records = history.master_records(validate_date(args.date))
+        for key in sorted(records, key=master_order):
+            print(records[key])
+        print(MASTER_END_OF_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,49 @@ merged bank account transaction file and the old master bank accounts file as in
 It applies the transactions to the accounts and produces two output files: the new
 current bank accounts file and the new master bank accounts file.
 
-To run this module, run: `python main.py old_master_accounts.txt merged_transactions.txt new_current_accounts.txt new_master_accounts.txt`
-The backend will apply the transactions and produce the required output files.
+To run this module, run:
+`python main.py old_master_accounts.txt merged_transactions.txt new_current_accounts.txt
+new_master_accounts.txt`
+The backend will apply the transactions and produce the required output files. Any of the files may
+be compressed with gzip, xz, or bzip2 (see fileio.py), and the old master accounts file may be an
+account store (see account_store.py).
+
+Run `python main.py --help` for the options. Each one is described in the module that implements
+it: the batch engine (batch.py), streaming and pipes (read.py), replayed sessions (dedupe.py), the
+summary report (summary.py), the validation cache (validation_cache.py), dry runs (overlay.py), the
+history (history.py), the metrics (metrics.py), period end (period_end.py), progress and time
+budgets (progress.py), and manifests of branches (branches.py).
 """
 
 import argparse
+import datetime
+import os
+import sys
 
-from read import read_old_master_accounts, read_transactions
+from read import (
+    iter_pipe_transactions,
+    iter_transactions,
+    read_old_master_accounts,
+    read_transactions,
+)
 from write import write_new_current_accounts, write_new_master_accounts
 from transactions import apply_transactions
+from batch import apply_transactions_batched
+from dedupe import SeenSessions, skip_replayed_sessions
+from summary import RunSummary
+from overlay import AccountsOverlay, dry_run_report
+from history import MasterHistory
+from metrics import RunMetrics, TransactionCounters
+from branches import BRANCH_PATH_OPTIONS, run_manifest
+from period_end import PLANS, apply_period_end, load_plans
+from account_store import AccountStore, is_account_store
+from progress import (
+    STOPPED_EXIT_CODE,
+    RunProgress,
+    load_resume_state,
+    restore_accounts,
+    save_resume_state,
+)
 
 
 def main():
@@ -23,28 +57,358 @@ def main():
     )
 
     parser.add_argument(
-        "old_master_accounts_path", help="Path to the old master bank accounts file"
+        "old_master_accounts_path",
+        nargs="?",
+        help="Path to the old master bank accounts file (or an account store)",
+    )
+    parser.add_argument(
+        "transactions_path", nargs="?", help="Path to the transactions file"
     )
-    parser.add_argument("transactions_path", help="Path to the transactions file")
     parser.add_argument(
         "new_current_accounts_path",
+        nargs="?",
         help="Output path for the new current bank accounts file",
     )
     parser.add_argument(
         "new_master_accounts_path",
+        nargs="?",
         help="Output path for the new master bank accounts file",
     )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Apply the transactions with the batch engine (same results, grouped by account)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream the transactions into the engine as they are read instead of reading them all first",
+    )
+    parser.add_argument(
+        "--pipe",
+        action="store_true",
+        help="Read the transactions as they arrive from standard input ('-') or a named pipe",
+    )
+    parser.add_argument(
+        "--seen-sessions",
+        metavar="DIR",
+        help="Directory of the seen-set used to skip sessions that have already been applied",
+    )
+
+    parser.add_argument(
+        "--summary-report",
+        metavar="PATH",
+        help="Write the end-of-day totals and balance reconciliation to PATH",
+    )
+
+    parser.add_argument(
+        "--validation-cache",
+        metavar="PATH",
+        help="Cache of validated master file blocks, so unchanged blocks are not validated again",
+    )
+
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what the transactions would change without writing any files",
+    )
+
+    parser.add_argument(
+        "--history",
+        metavar="DIR",
+        help="Add the new master accounts file to the history of master files in DIR",
+    )
+    parser.add_argument(
+        "--date",
+        default=datetime.date.today().isoformat(),
+        help="Day the new master accounts file is recorded for in the history (default: today)",
+    )
+
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        help="Write the metrics of the run to PATH in the Prometheus text format",
+    )
+
+    parser.add_argument(
+        "--period-end",
+        action="store_true",
+        help="Charge the period-end fees and interest on every active account after the transactions",
+    )
+    parser.add_argument(
+        "--period-end-plans",
+        metavar="PATH",
+        help="Read each plan's period-end fee and interest rate from the JSON file PATH "
+        "(the built-in ones are only examples)",
+    )
+
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Report the progress of the transactions, their throughput, and an ETA on stderr",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        metavar="SECONDS",
+        help="Stop between transactions after SECONDS and save where to resume in --resume-state",
+    )
+    parser.add_argument(
+        "--resume-state",
+        metavar="PATH",
+        help="Where a run stopped by --time-budget saves its position, and a rerun resumes from",
+    )
+
+    parser.add_argument(
+        "--manifest",
+        metavar="PATH",
+        help="Run every branch listed in the manifest at PATH instead of a single set of files",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of branches run at once with --manifest (default: one per CPU)",
+    )
 
     args = parser.parse_args()
+    if args.time_budget is not None and args.resume_state is None:
+        parser.error("--time-budget requires --resume-state")
+    if args.period_end_plans is not None and not args.period_end:
+        parser.error("--period-end-plans requires --period-end")
+    if args.resume_state is not None and (args.dry_run or args.pipe):
+        parser.error("--resume-state cannot be used with --dry-run or --pipe")
+    if args.manifest is not None:
+        if args.old_master_accounts_path is not None:
+            parser.error("the file paths come from the manifest when --manifest is given")
+        if args.pipe:
+            parser.error("--pipe cannot be used with --manifest")
+        for option in BRANCH_PATH_OPTIONS:
+            path = getattr(args, option)
+            if path is not None and "{branch}" not in path:
+                parser.error(
+                    f"--{option.replace('_', '-')} must contain {{branch}} with --manifest"
+                )
+        exit_code = run_manifest(args)
+        if exit_code:
+            sys.exit(exit_code)
+        return
+
+    if args.transactions_path is None:
+        parser.error("the input paths are required unless --manifest is given")
+    if (
+        not args.dry_run
+        and args.new_master_accounts_path is None
+        and not is_account_store(args.old_master_accounts_path)
+    ):
+        parser.error(
+            "the output paths are required unless --dry-run is given or the accounts are "
+            "read from an account store"
+        )
+    if args.history is not None and args.new_master_accounts_path is None:
+        parser.error("--history requires the new master accounts path")
+
+    # The metrics are written however the run ends, including a fatal error's exit
+    metrics = RunMetrics()
+    try:
+        run(args, metrics)
+    except SystemExit as e:
+        metrics.exit_code = e.code
+        raise
+    except BaseException:
+        # A crash (or an interrupt) is exported as a failed run, like a fatal error
+        metrics.exit_code = 1
+        raise
+    finally:
+        if args.metrics is not None:
+            metrics.write(args.metrics)
+
+
+def run(args, metrics, count_transactions=False):
+    """
+    Run the backend with the parsed command line arguments, timing its stages in `metrics`. The
+    applied and rejected transactions are counted in `metrics` if they are exported or if
+    `count_transactions` is set.
+    """
+    # The plans file is read first, so a bad one stops the run before it changes anything
+    plans = PLANS
+    if args.period_end_plans is not None:
+        plans = load_plans(args.period_end_plans)
+
+    # A run stopped on its time budget left the accounts in its new master file, and saved how many
+    # transactions of the file it processed in its resume state
+    resume = None
+    if args.resume_state is not None:
+        resume = load_resume_state(args.resume_state, args.transactions_path)
+    old_master_accounts_path = args.old_master_accounts_path
+    skip = 0
+    if resume is not None:
+        skip = resume["processed"]
+        old_master_accounts_path = resume["new_master_accounts_path"]
+        print(
+            f"Resuming after {skip:,} transactions, from {old_master_accounts_path}",
+            file=sys.stderr,
+        )
+
+    # An account store given as the old master accounts file is read, and updated, instead of it
+    store = None
+    if is_account_store(old_master_accounts_path):
+        store = AccountStore(old_master_accounts_path)
+
+    def read_accounts():
+        if store is not None:
+            return store.read_accounts()
+        return read_old_master_accounts(old_master_accounts_path, args.validation_cache)
+
+    progress = None
+    if args.progress or args.time_budget is not None:
+        progress = RunProgress(args.progress, args.time_budget)
+
+    # Read accounts and transactions, then apply transactions to accounts. When streaming, the
+    # transactions file is read ahead while the accounts are read, and parsed as it is applied.
+    # A pipe is only opened once the accounts are read, and read as the transactions arrive.
+    if args.pipe:
+        with metrics.stage("read_accounts"):
+            accounts = read_accounts()
+        transactions = iter_pipe_transactions(
+            args.transactions_path, sessions=args.seen_sessions is not None
+        )
+        if args.metrics is not None:
+            transactions = metrics.count_read("transactions", transactions)
+    elif args.stream:
+        transactions = iter_transactions(
+            args.transactions_path,
+            sessions=args.seen_sessions is not None,
+            progress=progress,
+            skip=skip,
+        )
+        if args.metrics is not None:
+            transactions = metrics.count_read("transactions", transactions)
+        with metrics.stage("read_accounts"):
+            accounts = read_accounts()
+    else:
+        with metrics.stage("read_accounts"):
+            accounts = read_accounts()
+        with metrics.stage("read_transactions"):
+            transactions = read_transactions(args.transactions_path)
+        metrics.records_read["transactions"] = len(transactions)
+        if skip:
+            transactions = transactions[skip:]
+        if progress is not None:
+            progress.watch_total(len(transactions))
+    metrics.records_read["old_master_accounts"] = len(accounts)
+    if resume is not None:
+        accounts = restore_accounts(accounts, resume)
+
+    if progress is not None:
+        transactions = progress.watch(transactions)
+
+    # Drop replays of sessions that have already been applied (on an earlier run or in this file)
+    seen_sessions = None
+    if args.seen_sessions is not None:
+        seen_sessions = SeenSessions(args.seen_sessions)
+        transactions = skip_replayed_sessions(transactions, seen_sessions)
+        if not args.stream and not args.pipe and progress is None:
+            transactions = list(transactions)
+
+    # The summary is kept up to date by the engine as each transaction is applied. A dry run
+    # always keeps one, for the rejections it reports.
+    summary = None
+    if args.summary_report is not None or args.dry_run:
+        summary = RunSummary()
+        summary.open(accounts)
+        # A resumed day's summary includes the transactions applied before it stopped
+        if resume is not None and resume.get("summary") is not None:
+            summary.restore_totals(resume["summary"])
+            metrics.resumed_totals = resume["summary"]
+        metrics.summary = summary
+
+    # The metrics take their transaction counts from the summary, or count them on their own
+    recorder = summary
+    if recorder is None and (args.metrics is not None or count_transactions):
+        recorder = metrics.counters = TransactionCounters()
+
+    # A dry run applies the transactions to an overlay, leaving the accounts as they were read
+    if args.dry_run:
+        accounts = AccountsOverlay(accounts)
+
+    # When streaming or reading a pipe, this stage includes reading and parsing the transactions
+    with metrics.stage("apply"):
+        if args.batch:
+            apply_transactions_batched(accounts, transactions, recorder)
+        else:
+            apply_transactions(accounts, transactions, recorder)
+
+    stopped = progress is not None and progress.stopped
+    if args.progress:
+        progress.print_done()
+
+    # The period-end fees and interest are charged on the balances left by all the transactions
+    if args.period_end and not stopped:
+        with metrics.stage("period_end"):
+            totals = apply_period_end(accounts, plans)
+        metrics.period_end = totals
+        if summary is not None:
+            summary.record_period_end(totals)
+
+    if summary is not None:
+        summary.close(accounts)
+        summary.check_reconciliation()
+
+    if args.dry_run:
+        print(dry_run_report(accounts, summary), end="")
+        if args.summary_report is not None:
+            summary.write_report(args.summary_report)
+        return
+
+    # Save the changed accounts to the account store, and write updated accounts to the new
+    # current and master accounts files (which are optional with an account store)
+    if store is not None:
+        with metrics.stage("save_account_store"):
+            metrics.records_written["account_store"] = store.save(accounts)
+            store.close()
+    with metrics.stage("write"):
+        if args.new_current_accounts_path is not None:
+            write_new_current_accounts(accounts, args.new_current_accounts_path)
+            metrics.records_written["new_current_accounts"] = len(accounts)
+        if args.new_master_accounts_path is not None:
+            write_new_master_accounts(accounts, args.new_master_accounts_path)
+            metrics.records_written["new_master_accounts"] = len(accounts)
+
+    # A stopped run's master file is not the day's, so it is only recorded once the day is done
+    if args.history is not None and not stopped:
+        with metrics.stage("record_history"):
+            MasterHistory(args.history).record(
+                args.date, args.new_master_accounts_path
+            )
+
+    # The sessions are only recorded as applied once their results have been written
+    if seen_sessions is not None:
+        with metrics.stage("save_seen_sessions"):
+            seen_sessions.save()
+            seen_sessions.close()
 
-    # Read accounts and transactions, then apply transactions to accounts
-    accounts = read_old_master_accounts(args.old_master_accounts_path)
-    transactions = read_transactions(args.transactions_path)
-    apply_transactions(accounts, transactions)
+    if args.summary_report is not None:
+        summary.write_report(args.summary_report)
 
-    # Write updated accounts to new current accounts file
-    write_new_current_accounts(accounts, args.new_current_accounts_path)
-    write_new_master_accounts(accounts, args.new_master_accounts_path)
+    if stopped:
+        processed = skip + progress.count
+        save_resume_state(
+            args.resume_state,
+            args.transactions_path,
+            processed,
+            store.file_path if store is not None else args.new_master_accounts_path,
+            accounts,
+            summary,
+        )
+        print(
+            f"Stopped on the time budget after {processed:,} transactions, "
+            f"rerun with --resume-state {args.resume_state} to resume",
+            file=sys.stderr,
+        )
+        sys.exit(STOPPED_EXIT_CODE)
+    if resume is not None:
+        os.remove(args.resume_state)
 
 
 if __name__ == "__main__":
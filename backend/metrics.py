@@ -0,0 +1,235 @@
+"""
+This module exports the metrics of a backend run as a Prometheus text-format file, for a textfile
+collector to scrape. The metrics are:
+
+- how long each stage of the run took;
+- how many records were read from and written to each file;
+- the applied and rejected transactions for each transaction code;
+- the fatal and non-fatal errors logged;
+- the fees charged on the transactions and, with `--period-end`, the monthly maintenance fees;
+- the run's exit code.
+
+The applied and rejected counts and the fees are counted by the engine as it applies each
+transaction. When the run keeps a `RunSummary` they are taken from it; otherwise the engine records
+into `TransactionCounters`, which only bumps two plain dictionary counters per transaction, so
+turning the metrics on costs a few percent of the run at most. The error counts come from the
+counters in `print_error`, and everything else is counted once per stage. The file is written even
+when the run ends with a fatal error or crashes, so a failed run still shows up in monitoring.
+"""
+
+import time
+
+import print_error
+from fileio import replace_file
+from summary import to_cents
+from transactions import TransactionCode
+
+# Prefix of every metric name
+NAMESPACE = "backend"
+
+CODE_NAMES = {code.value: code.name for code in TransactionCode}
+
+
+class TransactionCounters:
+    """
+    The applied and rejected transactions by code and the fees charged, recorded by the engine
+    the same way as in a `RunSummary` but without adding up any amounts.
+    """
+
+    def __init__(self):
+        """Start with every count at zero."""
+        self.applied = {code.value: 0 for code in TransactionCode}
+        self.rejected = {code.value: 0 for code in TransactionCode}
+        # Number of applied transactions charged each fee, since there are only a few fees
+        self.fees = {0.0: 0, 0.05: 0, 0.10: 0}
+
+    def record(self, transaction_code, amount, posting):
+        """Record one transaction, given the posting returned by its handler (None if rejected)."""
+        # Plain dictionaries with the usual keys already in place keep this as cheap as possible
+        try:
+            if posting is None:
+                self.rejected[transaction_code] += 1
+            else:
+                self.applied[transaction_code] += 1
+                self.fees[posting[0]] += 1
+        except KeyError:
+            if posting is None:
+                self.rejected[transaction_code] = 1
+            elif transaction_code not in self.applied:
+                self.applied[transaction_code] = 1
+                self.fees[posting[0]] = self.fees.get(posting[0], 0) + 1
+            else:
+                self.fees[posting[0]] = 1
+
+    @property
+    def fee_cents(self):
+        return sum(to_cents(fee) * count for fee, count in self.fees.items())
+
+
+class RunMetrics:
+    """The metrics of one backend run, written out with `write` when the run ends."""
+
+    def __init__(self):
+        """Start collecting metrics for a run that starts now."""
+        self.started = time.time()
+        self.stage_seconds = {}
+        self.records_read = {}
+        self.records_written = {}
+        self.summary = None
+        self.counters = None
+        # The totals of the period-end pass, if the run made one
+        self.period_end = None
+        # The summary's totals when the run resumed, which belong to the runs before it
+        self.resumed_totals = None
+        self.exit_code = 0
+
+    def stage(self, name):
+        """Return a context manager that adds the time spent inside it to a stage's duration."""
+        return _Stage(self, name)
+
+    def count_read(self, file, records):
+        """Yield the records of a stream while counting them as read from a file."""
+        count = 0
+        try:
+            for count, record in enumerate(records, start=1):
+                yield record
+        finally:
+            self.records_read[file] = self.records_read.get(file, 0) + count
+
+    def format(self):
+        """Return the metrics in the Prometheus text format."""
+        lines = []
+
+        def metric(name, kind, description, samples):
+            lines.append(f"# HELP {NAMESPACE}_{name} {description}")
+            lines.append(f"# TYPE {NAMESPACE}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(
+                    f'{key}="{_escape(str(text))}"' for key, text in labels
+                )
+                label_text = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{NAMESPACE}_{name}{label_text} {value}")
+
+        metric(
+            "run_start_time_seconds",
+            "gauge",
+            "Unix time the run started.",
+            [((), f"{self.started:.3f}")],
+        )
+        metric(
+            "run_exit_code",
+            "gauge",
+            "Exit code of the run (0 if it finished, 1 after a fatal error or a crash, 3 if it "
+            "stopped on its time budget).",
+            [((), self.exit_code)],
+        )
+        metric(
+            "stage_duration_seconds",
+            "gauge",
+            "Time spent in each stage of the run.",
+            [
+                ((("stage", stage),), f"{seconds:.6f}")
+                for stage, seconds in self.stage_seconds.items()
+            ],
+        )
+        metric(
+            "records_read_total",
+            "counter",
+            "Records read from each input file.",
+            [((("file", file),), count) for file, count in self.records_read.items()],
+        )
+        metric(
+            "records_written_total",
+            "counter",
+            "Records written to each output file.",
+            [
+                ((("file", file),), count)
+                for file, count in self.records_written.items()
+            ],
+        )
+
+        errors = print_error.error_counts
+        metric(
+            "errors_total",
+            "counter",
+            "Errors logged, by severity.",
+            [
+                ((("severity", "fatal"),), errors["fatal"]),
+                ((("severity", "non_fatal"),), errors["non_fatal"]),
+            ],
+        )
+
+        # The transaction counts come from the run's summary if it keeps one
+        if self.summary is not None:
+            applied = {code: count for code, (count, _) in self.summary.applied.items()}
+            rejected = {code: count for code, (count, _) in self.summary.rejected.items()}
+            # The summary's fees include the period-end fees, which are reported on their own
+            fee_cents = self.summary.fee_cents
+            if self.period_end is not None:
+                fee_cents -= self.period_end.fee_cents
+            if self.resumed_totals is not None:
+                for counts, before in (
+                    (applied, self.resumed_totals["applied"]),
+                    (rejected, self.resumed_totals["rejected"]),
+                ):
+                    for code, (count, _) in before.items():
+                        counts[code] -= count
+                fee_cents -= self.resumed_totals["fee_cents"]
+        elif self.counters is not None:
+            applied = self.counters.applied
+            rejected = self.counters.rejected
+            fee_cents = self.counters.fee_cents
+        else:
+            return "\n".join(lines) + "\n"
+
+        for outcome, counts in (("applied", applied), ("rejected", rejected)):
+            metric(
+                f"transactions_{outcome}_total",
+                "counter",
+                f"Transactions {outcome}, by transaction code.",
+                [
+                    ((("code", code), ("type", CODE_NAMES.get(code, "INVALID"))), count)
+                    for code, count in sorted(counts.items())
+                ],
+            )
+        fees = [((("source", "transactions"),), f"{fee_cents / 100:.2f}")]
+        if self.period_end is not None:
+            fees.append(
+                (
+                    (("source", "period_end"),),
+                    f"{self.period_end.fee_cents / 100:.2f}",
+                )
+            )
+        metric(
+            "fees_charged_dollars_total",
+            "counter",
+            "Fees charged, on the applied transactions or by the period-end pass.",
+            fees,
+        )
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, file_path):
+        """Write the metrics file atomically, so a scrape never reads it half-written."""
+        replace_file(file_path, [self.format()])
+
+
+def _escape(text):
+    """Helper to escape a label value for the Prometheus text format."""
+    return text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Stage:
+    """Times one stage of a run into its `RunMetrics`."""
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        stages = self.metrics.stage_seconds
+        stages[self.name] = stages.get(self.name, 0.0) + seconds
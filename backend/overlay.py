@@ -0,0 +1,147 @@
+"""
+This module lets the backend apply transactions without changing the accounts it read, for a dry
+run. An `AccountsOverlay` stands in for the accounts list: the engine looks accounts up, creates,
+and deletes them through it exactly as it does on the list, but every change is kept in the
+overlay and the list and its accounts are never modified.
+
+No account is copied. Each one is wrapped in an `AccountView`, a small dictionary that holds only
+the account number and the fields the engine changes, and reads everything else from the account.
+Once the transactions are applied, the overlay describes the difference between the accounts before
+and after them.
+"""
+
+from summary import VALID_CODES, format_cents, to_cents
+from transactions import TransactionCode
+
+# Fields shown in the dry run report for each changed account, in order
+REPORTED_FIELDS = ("name", "status", "balance", "total_transactions", "plan")
+
+
+class AccountView(dict):
+    """
+    An account whose changes are written to the view instead of the account itself. The view
+    only holds the account number and the fields written to it; reading any other field reads
+    it from the account underneath.
+    """
+
+    __slots__ = ("account",)
+
+    def __init__(self, account):
+        """Create a view of the account with no changes."""
+        # The account number is copied so the engines' account lookups read it at full speed
+        super().__init__(account_number=account["account_number"])
+        self.account = account
+
+    def __missing__(self, field):
+        return self.account[field]
+
+    def get(self, field, default=None):
+        return self[field] if field in self or field in self.account else default
+
+    def changes(self):
+        """Return the changed fields as a dictionary of field: (old value, new value)."""
+        return {
+            field: (self.account[field], value)
+            for field, value in self.items()
+            if value != self.account[field]
+        }
+
+    def merged(self):
+        """Return the account as it is seen through the view, as a plain dictionary."""
+        return {**self.account, **self}
+
+
+class AccountsOverlay(list):
+    """
+    A copy-on-write stand-in for the accounts list. It is a list of an `AccountView` of each
+    account (the accounts themselves are not copied), so the engines iterate, index, and append
+    to it as they would the accounts list. Accounts appended by a create are held as they are.
+    """
+
+    def __init__(self, accounts):
+        """Create an overlay with no changes on top of the accounts list."""
+        super().__init__(AccountView(account) for account in accounts)
+        self.accounts = accounts
+        self.removed = []
+
+    def remove(self, account):
+        # Views compare by the fields they hold, so an equal view may come before the account
+        position = self.index(account)
+        while self[position] is not account:
+            position = self.index(account, position + 1)
+
+        del self[position]
+        if isinstance(account, AccountView):
+            self.removed.append(account)
+
+    def changed_accounts(self):
+        """Return the views of the accounts in the list that were changed and not deleted."""
+        return [
+            view for view in self if isinstance(view, AccountView) and view.changes()
+        ]
+
+    def created_accounts(self):
+        """Return the accounts that were created and not deleted."""
+        return [account for account in self if not isinstance(account, AccountView)]
+
+    def deleted_accounts(self):
+        """Return the accounts in the list that were deleted, as they were read."""
+        return [view.account for view in self.removed]
+
+
+def format_account(account):
+    """Format an account for the dry run report."""
+    return (
+        f"{account['account_number']:>5} {account['name']:<20} {account['status']} "
+        f"{format_cents(to_cents(account['balance'])):>10} {account['plan']}"
+    )
+
+
+def format_change(field, old, new):
+    """Format the change of one field of an account for the dry run report."""
+    if field == "balance":
+        old, new = format_cents(to_cents(old)), format_cents(to_cents(new))
+    return f"{field} {old} -> {new}"
+
+
+def dry_run_report(overlay, summary):
+    """
+    Return the report of a dry run: the accounts that would be changed, created, and deleted,
+    and the transactions that would be rejected (counted in the `RunSummary`).
+    """
+    changed = overlay.changed_accounts()
+    created = overlay.created_accounts()
+    deleted = overlay.deleted_accounts()
+
+    lines = ["Dry run: no files were written", "", f"Changed accounts: {len(changed):,}"]
+    for view in changed:
+        changes = view.changes()
+        lines.append(
+            f"  {view['account_number']:>5} {view['name']:<20} "
+            + ", ".join(
+                format_change(field, *changes[field])
+                for field in REPORTED_FIELDS
+                if field in changes
+            )
+        )
+
+    lines.append(f"Created accounts: {len(created):,}")
+    lines += [f"  {format_account(account)}" for account in created]
+
+    lines.append(f"Deleted accounts: {len(deleted):,}")
+    lines += [f"  {format_account(account)}" for account in deleted]
+
+    rejections = {
+        code: count for code, (count, _) in summary.rejected.items() if count
+    }
+    lines.append(f"Rejected transactions: {sum(rejections.values()):,}")
+    lines += [
+        f"  {TransactionCode(code).name if code in VALID_CODES else code}: {count:,}"
+        for code, count in sorted(rejections.items())
+    ]
+
+    lines.append(
+        f"Net change to balances: {format_cents(summary.net_cents)} "
+        f"(fees {format_cents(summary.fee_cents)})"
+    )
+    return "\n".join(lines) + "\n"
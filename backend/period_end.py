@@ -0,0 +1,151 @@
+"""
+This module applies the period-end (monthly) charges to the accounts: a maintenance fee and
+interest accrued on the balance, both set by the account's plan. Disabled accounts are not charged.
+
+The charges are not transactions, so they are not applied one account at a time through the
+transaction engine. Instead, the balances of all active accounts are taken out as a column of
+whole cents, the interest, fees, and new balances are computed for the whole column in a few list
+comprehensions, and only then written back to the accounts. Integer cents keep the amounts exact:
+interest is rounded half up to the cent once per account.
+
+An account whose new balance would go over $99,999.99 is clamped to it (it is paid less interest),
+and an account that cannot pay its fee is left unchanged. Each of these is logged once for all the
+accounts it affects, not once per account.
+
+The fees and rates in PLANS are only example values, used when no plans file is given. The bank's
+real fees and rates must be set in a JSON file of the same form, passed to the backend with
+`--period-end-plans PATH` and read by `load_plans`.
+"""
+
+import json
+
+from print_error import log_constraint_error
+
+# Example monthly maintenance fee in cents and yearly interest rate in basis points, by plan (not
+# the bank's real ones, which are set with --period-end-plans)
+PLANS = {
+    "SP": {"fee_cents": 0, "interest_basis_points": 50},
+    "NP": {"fee_cents": 500, "interest_basis_points": 100},
+}
+PERIODS_PER_YEAR = 12
+
+MAX_BALANCE_CENTS = 99999_99
+
+# Number of account numbers listed in a bulk log message
+LOGGED_ACCOUNT_NUMBERS = 10
+
+_INTEREST_DIVISOR = 10000 * PERIODS_PER_YEAR
+
+
+def load_plans(file_path):
+    """
+    Return the fees and rates of each plan from a JSON plans file, in the form of PLANS, or exit
+    with an error if it is missing a plan or holds anything but non-negative whole numbers.
+    """
+    try:
+        with open(file_path, "r") as file:
+            plans = json.load(file)
+        plans = {
+            plan: {
+                "fee_cents": plans[plan]["fee_cents"],
+                "interest_basis_points": plans[plan]["interest_basis_points"],
+            }
+            for plan in PLANS
+        }
+    except (OSError, ValueError, KeyError, TypeError):
+        log_constraint_error(
+            f"Not a plans file (it must give fee_cents and interest_basis_points for "
+            f"{' and '.join(PLANS)})",
+            file_path,
+            fatal=True,
+        )
+
+    for plan, rates in plans.items():
+        for name, value in rates.items():
+            if type(value) is not int or value < 0:
+                log_constraint_error(
+                    f"{plan} {name} must be a non-negative whole number, not {value!r}",
+                    file_path,
+                    fatal=True,
+                )
+    return plans
+
+
+class PeriodEndTotals:
+    """What a period-end pass charged and paid, in whole cents, and the accounts it skipped."""
+
+    def __init__(self):
+        self.charged_count = 0
+        self.fee_cents = 0
+        self.interest_cents = 0
+        self.clamped = []
+        self.rejected = []
+
+    @property
+    def net_cents(self):
+        """The net change to the sum of all balances."""
+        return self.interest_cents - self.fee_cents
+
+
+def apply_period_end(accounts, plans=PLANS):
+    """
+    Charge the period-end fee and pay the period's interest on every active account, and return
+    the `PeriodEndTotals` of the pass. The clamped and rejected accounts are logged in bulk.
+    """
+    active = [account for account in accounts if account["status"] == "A"]
+    fee_by_plan = {plan: rates["fee_cents"] for plan, rates in plans.items()}
+    rate_by_plan = {
+        plan: rates["interest_basis_points"] for plan, rates in plans.items()
+    }
+
+    # One pass per column over all the active accounts
+    account_plans = [account["plan"] for account in active]
+    balances = [round(account["balance"] * 100) for account in active]
+    fees = [fee_by_plan[plan] for plan in account_plans]
+    interest = [
+        (balance * rate_by_plan[plan] + _INTEREST_DIVISOR // 2) // _INTEREST_DIVISOR
+        for balance, plan in zip(balances, account_plans)
+    ]
+    new_balances = [
+        balance + earned - fee for balance, earned, fee in zip(balances, interest, fees)
+    ]
+
+    totals = PeriodEndTotals()
+    for account, balance, fee, new_balance in zip(active, balances, fees, new_balances):
+        if new_balance < 0:
+            totals.rejected.append(account["account_number"])
+            continue
+        if new_balance > MAX_BALANCE_CENTS:
+            totals.clamped.append(account["account_number"])
+            new_balance = MAX_BALANCE_CENTS
+
+        account["balance"] = new_balance / 100
+        totals.charged_count += 1
+        totals.fee_cents += fee
+        totals.interest_cents += new_balance - balance + fee
+
+    if totals.clamped:
+        log_constraint_error(
+            f"{len(totals.clamped)} accounts would exceed $99999.99 and were clamped to it: "
+            f"{_describe_accounts(totals.clamped)}",
+            "PERIOD END",
+            fatal=False,
+        )
+    if totals.rejected:
+        log_constraint_error(
+            f"{len(totals.rejected)} accounts cannot pay the period-end fee and were left unchanged: "
+            f"{_describe_accounts(totals.rejected)}",
+            "PERIOD END",
+            fatal=False,
+        )
+    return totals
+
+
+def _describe_accounts(account_numbers):
+    """Helper to list the first few of a list of account numbers, and how many more there are."""
+    text = ", ".join(
+        number.zfill(5) for number in account_numbers[:LOGGED_ACCOUNT_NUMBERS]
+    )
+    if len(account_numbers) > LOGGED_ACCOUNT_NUMBERS:
+        text += f", and {len(account_numbers) - LOGGED_ACCOUNT_NUMBERS} more"
+    return text
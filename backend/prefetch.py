@@ -0,0 +1,93 @@
+"""
+This module reads input files ahead of the backend. A background thread reads the file in blocks
+and queues a few of them, so the disk reads overlap with parsing and applying the transactions
+instead of alternating with them.
+"""
+
+import io
+import os
+import queue
+import threading
+
+from fileio import open_input
+
+# Size of each block read ahead, and how many blocks may wait in the queue
+PREFETCH_BLOCK_SIZE = 1024 * 1024
+PREFETCH_DEPTH = 4
+
+
+class PrefetchReader(io.RawIOBase):
+    """
+    A read-only raw file whose blocks are read ahead by a background thread. Wrap it in an
+    `io.BufferedReader` (and an `io.TextIOWrapper` for text) to use it like any opened file.
+    """
+
+    def __init__(self, file_path, block_size=PREFETCH_BLOCK_SIZE, depth=PREFETCH_DEPTH):
+        """Open the file and start reading it ahead."""
+        super().__init__()
+        self.file_path = file_path
+        self._file = open_input(file_path, "rb")
+        self._blocks = queue.Queue(maxsize=depth)
+        self._stopped = threading.Event()
+        self._current = memoryview(b"")
+        self._at_end = False
+        # Offset in the file (as stored, so compressed) reached by the block being read from
+        self.source_position = 0
+
+        self._thread = threading.Thread(
+            target=self._read_ahead, args=(block_size,), daemon=True
+        )
+        self._thread.start()
+
+    def _read_ahead(self, block_size):
+        """Read the file into the queue until it ends or the reader is closed."""
+        try:
+            while not self._stopped.is_set():
+                block = self._file.read(block_size)
+                if not block:
+                    break
+                self._put((block, os.lseek(self._file.fileno(), 0, os.SEEK_CUR)))
+        except (OSError, SystemExit) as e:
+            # Raised again in the reading thread, where a fatal error can end the run
+            self._put(e)
+        self._put(None)
+
+    def _put(self, item):
+        # Wait for room in the queue, but give up once the reader has been closed
+        while not self._stopped.is_set():
+            try:
+                self._blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self):
+        return True
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def readinto(self, buffer):
+        while not self._current:
+            if self._at_end:
+                return 0
+            block = self._blocks.get()
+            if block is None:
+                self._at_end = True
+                return 0
+            if isinstance(block, BaseException):
+                raise block
+            block, self.source_position = block
+            self._current = memoryview(block)
+
+        size = min(len(buffer), len(self._current))
+        buffer[:size] = self._current[:size]
+        self._current = self._current[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stopped.set()
+            self._thread.join()
+            self._file.close()
+        super().close()
@@ -1,5 +1,8 @@
 import sys
 
+# Number of errors logged in this run by severity, read by the metrics exporter
+error_counts = {"fatal": 0, "non_fatal": 0}
+
 
 def log_constraint_error(description, context, fatal=False):
     """
@@ -12,7 +15,9 @@ def log_constraint_error(description, context, fatal=False):
         fatal: If True, treats as fatal error and exits program
     """
     if fatal:
+        error_counts["fatal"] += 1
         print(f"ERROR: Fatal error - File {context} - {description}")
         sys.exit(1)
     else:
+        error_counts["non_fatal"] += 1
         print(f"ERROR: {context}: {description}")
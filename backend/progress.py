@@ -0,0 +1,215 @@
+"""
+This module watches the transactions on their way into the engine, to report the progress of a
+long run on standard error and to stop a run cleanly when its time budget runs out.
+
+The transactions are passed through `RunProgress.watch`, which only counts them: the clock is read
+once every 1024 transactions, and a progress line is printed at most once every
+PROGRESS_INTERVAL seconds. The share of the run done is the byte offset reached in the transactions
+file when it is streamed, or the share of the transactions taken when they were read in full, and
+the ETA is estimated from it.
+
+When the time budget runs out, the run stops before the next transaction (or, when sessions are
+tracked, before the next session, so a session is never split between runs). The backend then
+writes its outputs as usual, along with a resume state recording how many transactions of the file
+were processed (with the balances to more than the cent, the order of the accounts, and the
+summary's running totals), and a later run with the same resume state carries on from there with
+the same results as if it had never stopped. The metrics only ever describe the run that wrote
+them.
+"""
+
+import datetime
+import json
+import os
+import sys
+import time
+
+from fileio import file_fingerprint, replace_file
+from print_error import log_constraint_error
+
+# The clock is read once every CHECK_MASK + 1 transactions (a power of two, so a mask tests it)
+CHECK_MASK = 1024 - 1
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 1.0
+
+RESUME_STATE_VERSION = 1
+
+# Exit code of a run that stopped on its time budget, so a scheduler can tell it apart from a
+# finished run (0) and a fatal error (1)
+STOPPED_EXIT_CODE = 3
+
+
+class RunProgress:
+    """The progress of the transactions through one run, with an optional time budget."""
+
+    def __init__(self, report=False, time_budget=None):
+        """Start the clock, printing progress lines if `report` and stopping after `time_budget` s."""
+        self.report = report
+        self.start = time.monotonic()
+        self.deadline = None if time_budget is None else self.start + time_budget
+        self.count = 0
+        self.stopped = False
+        self._size = None
+        self._position = None
+        self._total = None
+
+    def watch_position(self, size, position):
+        """Measure the share done by `position()`, the offset reached in a file of `size` bytes."""
+        self._size = size
+        self._position = position
+
+    def watch_total(self, total):
+        """Measure the share done by the number of transactions taken out of `total`."""
+        self._total = total
+
+    def watch(self, transactions):
+        """Yield the transactions, counting them, until they end or the time budget runs out."""
+        iterator = iter(transactions)
+        next_report = self.start + PROGRESS_INTERVAL if self.report else float("inf")
+        deadline = float("inf") if self.deadline is None else self.deadline
+        stopping = False
+        session = None
+        count = 0
+        try:
+            for transaction in iterator:
+                # Once out of time, stop at the next transaction that starts a new session
+                if stopping and (
+                    session is None or transaction["session_number"] != session
+                ):
+                    self.stopped = True
+                    return
+                yield transaction
+
+                count += 1
+                if count & CHECK_MASK:
+                    continue
+                self.count = count
+                now = time.monotonic()
+                if now >= next_report:
+                    self._print_progress(now)
+                    next_report = now + PROGRESS_INTERVAL
+                if now >= deadline and not stopping:
+                    stopping = True
+                    session = transaction["session_number"]
+        finally:
+            self.count = count
+            # Stops reading ahead when the run stops early
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def fraction(self):
+        """Return the share of the transactions done so far, or None if it is not known."""
+        if self._position is not None and self._size:
+            return self._position() / self._size
+        if self._total:
+            return self.count / self._total
+        return None
+
+    def _print_progress(self, now):
+        elapsed = now - self.start
+        line = f"Progress: {self.count:,} transactions, {self.count / elapsed:,.0f}/s"
+        fraction = self.fraction()
+        if fraction:
+            remaining = elapsed * (1 - fraction) / fraction
+            line += (
+                f", {fraction:.1%} done, ETA "
+                f"{datetime.timedelta(seconds=round(remaining))}"
+            )
+        print(line, file=sys.stderr, flush=True)
+
+    def print_done(self):
+        """Print the final progress line."""
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        outcome = "stopped on the time budget" if self.stopped else "done"
+        print(
+            f"Progress: {outcome}, {self.count:,} transactions in {elapsed:.1f} s "
+            f"({self.count / elapsed:,.0f}/s)",
+            file=sys.stderr,
+            flush=True,
+        )
+
+
+def load_resume_state(state_path, transactions_path):
+    """
+    Return the resume state saved by a run that stopped on its time budget, or None if there is
+    none. The transactions file must be the one the stopped run was reading.
+    """
+    if not os.path.exists(state_path):
+        return None
+    try:
+        with open(state_path, "r") as file:
+            state = json.load(file)
+        if state.get("version") != RESUME_STATE_VERSION:
+            raise ValueError("unsupported version")
+        state["processed"], state["new_master_accounts_path"], state["transactions"]
+        state["balances"].items()
+        list(state["order"])
+    except (OSError, ValueError, KeyError, TypeError):
+        log_constraint_error(
+            "The resume state is corrupted (or an unsupported version)",
+            state_path,
+            fatal=True,
+        )
+
+    if state["transactions"] != dict(
+        file_fingerprint(transactions_path), path=os.path.abspath(transactions_path)
+    ):
+        log_constraint_error(
+            "The transactions file is not the one the stopped run was reading",
+            state_path,
+            fatal=True,
+        )
+    return state
+
+
+def restore_accounts(accounts, state):
+    """
+    Return the accounts read back from a stopped run's master file with their exact balances, in
+    the order the stopped run held them (created accounts come after the ones it read).
+    """
+    balances = state["balances"]
+    for account in accounts:
+        balance = balances.get(account["account_number"])
+        if balance is not None:
+            account["balance"] = balance
+
+    position = {number: index for index, number in enumerate(state["order"])}
+    last = len(position)
+    return sorted(
+        accounts, key=lambda account: position.get(account["account_number"], last)
+    )
+
+
+def save_resume_state(
+    state_path,
+    transactions_path,
+    processed,
+    new_master_accounts_path,
+    accounts,
+    summary=None,
+):
+    """
+    Write the resume state of a run that stopped after `processed` transactions of the file,
+    with the running totals of its `RunSummary` if it kept one.
+    """
+    state = {
+        "version": RESUME_STATE_VERSION,
+        "transactions": dict(
+            file_fingerprint(transactions_path), path=os.path.abspath(transactions_path)
+        ),
+        "processed": processed,
+        "new_master_accounts_path": os.path.abspath(new_master_accounts_path),
+        # The master file rounds the balances to the cent, so the exact balances are kept here to
+        # resume with the same results as a run that was never stopped
+        "balances": {
+            account["account_number"]: account["balance"]
+            for account in accounts
+            if float(f"{account['balance']:.2f}") != account["balance"]
+        },
+        # The master file is sorted, but the current accounts file is in the order they are held
+        "order": [account["account_number"] for account in accounts],
+        # The summary of the day carries on from these totals instead of starting again
+        "summary": None if summary is None else summary.totals(),
+    }
+    replace_file(state_path, [json.dumps(state)])
@@ -1,132 +1,259 @@
+import io
+import itertools
+import os
+import sys
+
+from fileio import open_input
+from prefetch import PrefetchReader
 from print_error import log_constraint_error
+from validation_cache import (
+    block_digest,
+    describe_blocks,
+    load_validation_cache,
+    merkle_root,
+    save_validation_cache,
+    split_blocks,
+)
+
+# The binary transaction-log format and the record layouts are shared with the frontend through
+# the common/ directory
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common")
+)
+from binary_transactions import (  # noqa: E402
+    HEADER,
+    MAGIC,
+    RECORD,
+    UNTIMED_VIEW_OF_TIMESTAMPED_RECORD,
+    is_binary_transactions,
+    parse_header,
+)
+from records import MASTER_ACCOUNT, TRANSACTION  # noqa: E402
+
+# Amount of input parsed at a time when streaming transactions
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+# Two digit transaction codes, indexed by the code in a binary record
+_TRANSACTION_CODES = [f"{code:02}" for code in range(256)]
+
+
+def read_old_master_accounts(file_path, validation_cache=None):
+    """
+    Reads and validates the old master bank accounts from the given `file_path`.
+
+    If a `validation_cache` path is given, the blocks of the file that are unchanged since the
+    last run that validated are read without checking their fields again, and the blocks that
+    changed are reported on standard error (see validation_cache.py).
+    """
+    if validation_cache is not None:
+        return _read_old_master_accounts_cached(file_path, validation_cache)
+
+    accounts = []
+    with open_input(file_path) as file:
+        parse_master_lines(file, 1, file_path, accounts)
+    return accounts
+
 
+def _read_old_master_accounts_cached(file_path, cache_path):
+    """Helper to read the old master accounts, only validating the blocks not in the cache."""
+    validated_blocks, previous_root = load_validation_cache(cache_path)
+    with open_input(file_path) as file:
+        lines = file.readlines()
 
-def read_old_master_accounts(file_path):
-    """Reads and validates the old master bank accounts from the given `file_path`."""
     accounts = []
-    with open(file_path, "r") as file:
-        for line_num, line in enumerate(file, 1):
-            clean_line = line.rstrip("\n")
+    digests = []
+    changed_blocks = []
+    line_number = 1
+    for block in split_blocks(lines):
+        digest = block_digest(block)
+        digests.append(digest)
+
+        if digest in validated_blocks:
+            ended = _convert_master_lines(block, accounts)
+        else:
+            changed_blocks.append((line_number, line_number + len(block) - 1))
+            ended = parse_master_lines(block, line_number, file_path, accounts)
+
+        line_number += len(block)
+        if ended:
+            break
+
+    # Only reached when every block is valid, since validation errors are fatal
+    save_validation_cache(cache_path, digests)
+
+    if previous_root == merkle_root(digests):
+        report = f"master file unchanged, {len(digests)} blocks skipped"
+    else:
+        report = (
+            f"{len(changed_blocks)} of {len(digests)} blocks changed and were validated"
+        )
+        if changed_blocks:
+            report += f" ({describe_blocks(changed_blocks[:5])}"
+            if len(changed_blocks) > 5:
+                report += f", and {len(changed_blocks) - 5} more"
+            report += ")"
+    print(f"Validation cache: {report}", file=sys.stderr)
+
+    return accounts
+
+
+def _convert_master_lines(lines, accounts):
+    """
+    Helper to convert lines of the master accounts file that are known to be valid, without
+    validating them again. Returns whether the end of file marker was reached.
+    """
+    end = len(lines)
+    for i, line in enumerate(lines):
+        if line.startswith("00000"):
+            end = i
+            break
+
+    accounts += [
+        {
+            "account_number": account_number.lstrip("0") or "0",
+            "name": name.strip(),
+            "status": status,
+            "balance": float(balance),
+            "total_transactions": int(transactions),
+            "plan": plan_type,
+        }
+        for account_number, name, status, balance, transactions, plan_type in map(
+            MASTER_ACCOUNT.split, lines[:end]
+        )
+    ]
+    return end < len(lines)
+
+
+def parse_master_lines(lines, first_line_number, file_path, accounts):
+    """
+    Parses and validates lines of the master accounts file, numbered from `first_line_number`,
+    adding the accounts to `accounts`. Returns whether the end of file marker was reached.
+    """
+    for line_num, line in enumerate(lines, first_line_number):
+        clean_line = line.rstrip("\n")
+
+        # Validate line length (now 45 chars to include plan type)
+        if len(clean_line) != MASTER_ACCOUNT.length:
+            log_constraint_error(
+                f"Line {line_num}: Invalid length ({len(clean_line)} chars, expected {MASTER_ACCOUNT.length})",
+                file_path,
+                fatal=True,
+            )
+            continue
+
+        try:
+            # Extract fields with positional validation
+            (
+                account_number,
+                name,
+                status,
+                balance_str,
+                transactions_str,
+                plan_type,
+            ) = MASTER_ACCOUNT.split(clean_line)
+            name = name.strip()
+
+            if account_number == "00000":
+                return True
+
+            # Validate account number
+            if not account_number.isdigit():
+                log_constraint_error(
+                    f"Line {line_num}: Account number must be 5 digits",
+                    file_path,
+                    fatal=True,
+                )
+                continue
 
-            # Validate line length (now 44 chars to include plan type)
-            if len(clean_line) != 45:
+            # Validate status
+            if status not in ("A", "D"):
                 log_constraint_error(
-                    f"Line {line_num}: Invalid length ({len(clean_line)} chars, expected 45)",
+                    f"Line {line_num}: Invalid status '{status}'. Must be 'A' or 'D'",
                     file_path,
                     fatal=True,
                 )
                 continue
 
-            try:
-                # Extract fields with positional validation
-                account_number = clean_line[0:5]
-                name = clean_line[6:26].strip()
-                status = clean_line[27]
-                balance_str = clean_line[29:37]
-                transactions_str = clean_line[38:42]
-                plan_type = clean_line[43:45]
-
-                if account_number == "00000":
-                    return accounts
-
-                # Validate account number
-                if not account_number.isdigit():
-                    log_constraint_error(
-                        f"Line {line_num}: Account number must be 5 digits",
-                        file_path,
-                        fatal=True,
-                    )
-                    continue
-
-                # Validate status
-                if status not in ("A", "D"):
-                    log_constraint_error(
-                        f"Line {line_num}: Invalid status '{status}'. Must be 'A' or 'D'",
-                        file_path,
-                        fatal=True,
-                    )
-                    continue
-
-                # Validate balance format with explicit negative check
-                if balance_str[0] == "-":
-                    log_constraint_error(
-                        f"Line {line_num}: Negative balance detected: {balance_str}",
-                        file_path,
-                        fatal=True,
-                    )
-                    continue
-
-                if (
-                    len(balance_str) != 8
-                    or balance_str[5] != "."
-                    or not balance_str[:5].isdigit()
-                    or not balance_str[6:].isdigit()
-                ):
-                    log_constraint_error(
-                        f"Line {line_num}: Invalid balance format. Expected XXXXX.XX, got {balance_str}",
-                        file_path,
-                        fatal=True,
-                    )
-                    continue
-
-                # Validate transaction count
-                if not transactions_str.isdigit():
-                    log_constraint_error(
-                        f"Line {line_num}: Transaction count must be 4 digits",
-                        file_path,
-                        fatal=True,
-                    )
-                    continue
-
-                # Validate plan type
-                if plan_type not in ("SP", "NP"):
-                    log_constraint_error(
-                        f"Line {line_num}: Invalid plan type '{plan_type}'. Must be SP or NP",
-                        file_path,
-                        fatal=True,
-                    )
-                    continue
-
-                # Convert values
-                balance = float(balance_str)
-                transactions = int(transactions_str)
-
-                # Business rule validation
-                if balance < 0:
-                    log_constraint_error(
-                        f"Line {line_num}: Negative balance detected: {balance}",
-                        file_path,
-                        fatal=True,
-                    )
-                    continue
-                if transactions < 0:
-                    log_constraint_error(
-                        f"Line {line_num}: Negative transaction count detected: {transactions}",
-                        file_path,
-                        fatal=True,
-                    )
-                    continue
-
-                accounts.append(
-                    {
-                        "account_number": account_number.lstrip("0") or "0",
-                        "name": name.strip(),
-                        "status": status,
-                        "balance": balance,
-                        "total_transactions": transactions,
-                        "plan": plan_type,
-                    }
+            # Validate balance format with explicit negative check
+            if balance_str[0] == "-":
+                log_constraint_error(
+                    f"Line {line_num}: Negative balance detected: {balance_str}",
+                    file_path,
+                    fatal=True,
                 )
+                continue
 
-            except Exception as e:
+            if (
+                len(balance_str) != 8
+                or balance_str[5] != "."
+                or not balance_str[:5].isdigit()
+                or not balance_str[6:].isdigit()
+            ):
                 log_constraint_error(
-                    f"Line {line_num}: Unexpected error - {str(e)}",
+                    f"Line {line_num}: Invalid balance format. Expected XXXXX.XX, got {balance_str}",
                     file_path,
                     fatal=True,
                 )
                 continue
 
-    return accounts
+            # Validate transaction count
+            if not transactions_str.isdigit():
+                log_constraint_error(
+                    f"Line {line_num}: Transaction count must be 4 digits",
+                    file_path,
+                    fatal=True,
+                )
+                continue
+
+            # Validate plan type
+            if plan_type not in ("SP", "NP"):
+                log_constraint_error(
+                    f"Line {line_num}: Invalid plan type '{plan_type}'. Must be SP or NP",
+                    file_path,
+                    fatal=True,
+                )
+                continue
+
+            # Convert values
+            balance = float(balance_str)
+            transactions = int(transactions_str)
+
+            # Business rule validation
+            if balance < 0:
+                log_constraint_error(
+                    f"Line {line_num}: Negative balance detected: {balance}",
+                    file_path,
+                    fatal=True,
+                )
+                continue
+            if transactions < 0:
+                log_constraint_error(
+                    f"Line {line_num}: Negative transaction count detected: {transactions}",
+                    file_path,
+                    fatal=True,
+                )
+                continue
+
+            accounts.append(
+                {
+                    "account_number": account_number.lstrip("0") or "0",
+                    "name": name.strip(),
+                    "status": status,
+                    "balance": balance,
+                    "total_transactions": transactions,
+                    "plan": plan_type,
+                }
+            )
+
+        except Exception as e:
+            log_constraint_error(
+                f"Line {line_num}: Unexpected error - {str(e)}",
+                file_path,
+                fatal=True,
+            )
+            continue
+
+    return False
 
 
 def read_transactions(file_path):
@@ -140,28 +267,140 @@ def read_transactions(file_path):
     - NNNNN is the bank account number
     - PPPPPPPP is the amount of funds involved in the transaction
     - MM is any additional miscellaneous information
+
+    A "00" line with a session ID in its miscellaneous field ends one uploaded session rather
+    than the whole file: the transactions since the previous session are tagged with its
+    "session_id" and "session_number" (the ordinal of the session in the file), and reading
+    continues. A "00" line without a session ID ends the transactions.
+
+    Binary transaction logs are recognized by their header and read with `read_binary_transactions`.
     """
-    transactions = []
-    with open(file_path, "r") as file:
+    with open_input(file_path, "rb") as file:
+        if is_binary_transactions(file.read(len(MAGIC))):
+            return read_binary_transactions(file_path)
+
+    with open_input(file_path) as file:
         lines = file.readlines()
 
-    for i, line in enumerate(lines, 1):
-        if len(line) < 41:
+    records = parse_transaction_lines(lines, 1, file_path)
+    return list(itertools.chain.from_iterable(_assemble_transactions([records], True)))
+
+
+def iter_transactions(file_path, sessions=False, progress=None, skip=0):
+    """
+    Returns an iterator over the transactions of a text or binary transaction file as they are parsed, in the same
+    form as `read_transactions`. The file is read ahead in blocks by a background thread, so
+    reading overlaps with whatever the caller does with each transaction.
+
+    With `sessions`, the transactions of each session are held back until the end of the
+    session, so that they can be tagged with its session ID and number. Otherwise every
+    transaction is yielded as soon as it is parsed, with no session tags.
+
+    The file is opened and read ahead straight away, before the first transaction is asked for.
+    If a `RunProgress` is given, it measures the run's progress by the offset reached in the file.
+    The first `skip` transactions (already applied by a run that was stopped) are left out, and
+    the lines of a text file that hold them are passed over without being parsed.
+    """
+    reader = PrefetchReader(file_path)
+    file = io.BufferedReader(reader, STREAM_BLOCK_SIZE)
+    if progress is not None:
+        progress.watch_position(
+            os.fstat(file.fileno()).st_size, lambda: reader.source_position
+        )
+    return _stream_transactions(file, file_path, sessions, skip)
+
+
+def _stream_transactions(file, file_path, sessions, skip):
+    """Helper generator for `iter_transactions`."""
+    with file:
+        if is_binary_transactions(file.peek(len(MAGIC))):
+            batches = _iter_binary_record_batches(file, file_path)
+        else:
+            batches = _iter_text_record_batches(io.TextIOWrapper(file), file_path, skip)
+            skip = 0
+
+        transactions = itertools.chain.from_iterable(
+            _assemble_transactions(batches, sessions)
+        )
+        yield from itertools.islice(transactions, skip, None)
+
+
+def iter_pipe_transactions(file_path, sessions=False):
+    """
+    Yields the transactions of a text transaction stream, read from standard input (if
+    `file_path` is "-") or a named pipe, as each line arrives, in the same form as
+    `read_transactions`. Frontend sessions can write into the stream while it is read.
+
+    In a stream, a "00" line without a session ID only ends a session (as every frontend session
+    without a session ID ends), and the transactions end when the stream does: for a named pipe,
+    when the last process that has it open for writing closes it. With `sessions`, the
+    transactions of each session are held back until the end of the session, as in
+    `iter_transactions`.
+
+    The pipe is opened when the first transaction is asked for, since opening a named pipe waits
+    until a writer opens it too.
+    """
+    file = sys.stdin if file_path == "-" else open(file_path, "r")
+    with file:
+        # Each line is parsed on its own, so it is applied without waiting for more input
+        batches = (
+            parse_transaction_lines([line], line_number, file_path)
+            for line_number, line in enumerate(file, start=1)
+        )
+        for transactions in _assemble_transactions(batches, sessions, pipe=True):
+            yield from transactions
+
+
+def _iter_text_record_batches(file, file_path, skip=0):
+    """
+    Helper to parse a text transaction file a block of lines at a time, after passing over the
+    lines of its first `skip` transactions.
+    """
+    line_number = 1
+    while skip:
+        line = file.readline()
+        if not line:
+            return
+        line_number += 1
+        transaction_code, *_, miscellaneous = TRANSACTION.split(line)
+        if transaction_code != "00":
+            skip -= 1
+        elif not miscellaneous.strip():
+            # The end of the transactions was reached before the last one to skip
+            return
+
+    while lines := file.readlines(STREAM_BLOCK_SIZE):
+        yield parse_transaction_lines(lines, line_number, file_path)
+        line_number += len(lines)
+
+
+def parse_transaction_lines(lines, first_line_number, file_path):
+    """
+    Parses and validates lines of a text transaction file, numbered from `first_line_number`.
+    "00" lines are returned as records with only a transaction code and miscellaneous field,
+    and parsing stops after one that ends the transactions.
+    """
+    records = []
+    for i, line in enumerate(lines, first_line_number):
+        if len(line) < TRANSACTION.length:
             log_constraint_error(
-                f"Line {i}: Invalid transaction line length ({len(line)} chars, expected at least 41)",
+                f"Line {i}: Invalid transaction line length ({len(line)} chars, expected at least {TRANSACTION.length})",
                 file_path,
                 fatal=True,
             )
 
-        transaction_code = line[0:2]
-        account_name = line[3:23].strip()
-        account_number = line[24:29]
-        amount = line[30:38]
-        miscellaneous = line[39:].strip()
+        transaction_code, account_name, account_number, amount, miscellaneous = (
+            TRANSACTION.split(line)
+        )
+        account_name = account_name.strip()
+        miscellaneous = miscellaneous.strip()
 
-        # Return once we hit the end of transactions marker "00"
+        # Stop once we hit the end of transactions marker "00"
         if transaction_code == "00":
-            return transactions
+            records.append({"transaction_code": "00", "miscellaneous": miscellaneous})
+            if not miscellaneous:
+                break
+            continue
 
         if transaction_code not in ("01", "02", "03", "04", "05", "06", "07", "08"):
             log_constraint_error(
@@ -189,12 +428,196 @@ def read_transactions(file_path):
         else:
             amount = float(amount)
 
-        transactions.append(
+        records.append(
             {
                 "transaction_code": transaction_code,
                 "account_name": account_name,
                 "account_number": account_number,
                 "amount": amount,
                 "miscellaneous": miscellaneous,
+                "session_id": None,
+                "session_number": None,
+            }
+        )
+
+    return records
+
+
+def _assemble_transactions(record_batches, sessions, pipe=False):
+    """
+    Helper to turn batches of parsed records into batches of transactions. A "00" record with
+    a session ID ends a session, and one without a session ID ends the transactions (or, in a
+    `pipe`, only ends a session).
+    """
+    session = []
+    session_number = 0
+    for records in record_batches:
+        ready = []
+        for record in records:
+            if record["transaction_code"] != "00":
+                (session if sessions else ready).append(record)
+            elif record["miscellaneous"]:
+                session_number += 1
+                for transaction in session:
+                    transaction["session_id"] = record["miscellaneous"]
+                    transaction["session_number"] = session_number
+                ready.extend(session)
+                session = []
+            elif pipe:
+                ready.extend(session)
+                session = []
+            else:
+                ready.extend(session)
+                yield ready
+                return
+        yield ready
+    yield session
+
+
+def read_binary_transactions(file_path):
+    """
+    Reads and validates transactions from a packed binary transaction log (see
+    common/binary_transactions.py). The records hold the same fields as the text layout, so the
+    transactions are returned in the same form as `read_transactions`.
+    """
+    with open_input(file_path, "rb") as file:
+        data = file.read()
+
+    record = _binary_record_layout(data, file_path)
+    records, offset, ended = parse_binary_records(
+        data, HEADER.size, 0, record, {}, file_path
+    )
+    if not ended and offset != len(data):
+        log_constraint_error(
+            f"Corrupted binary transaction log - Truncated record at byte {offset}.",
+            file_path,
+            fatal=True,
+        )
+
+    return list(itertools.chain.from_iterable(_assemble_transactions([records], True)))
+
+
+def _iter_binary_record_batches(file, file_path):
+    """Helper to parse a binary transaction log a block at a time."""
+    record = _binary_record_layout(file.read(HEADER.size), file_path)
+
+    # Records that straddle two blocks are carried over and parsed with the next block
+    text_fields = {}
+    data = b""
+    base = HEADER.size
+    while True:
+        block = file.read(STREAM_BLOCK_SIZE)
+        data += block
+        records, offset, ended = parse_binary_records(
+            data, 0, base, record, text_fields, file_path
+        )
+        yield records
+
+        if ended:
+            return
+        data = data[offset:]
+        base += offset
+
+        if not block:
+            if data:
+                log_constraint_error(
+                    f"Corrupted binary transaction log - Truncated record at byte {base}.",
+                    file_path,
+                    fatal=True,
+                )
+            return
+
+
+def _binary_record_layout(header, file_path):
+    """Helper to validate a binary transaction log header and return the layout of its records."""
+    try:
+        has_timestamps = parse_header(header)
+    except ValueError as e:
+        log_constraint_error(
+            f"Corrupted binary transaction log - {e}", file_path, fatal=True
+        )
+
+    # Timestamps are skipped, as the backend does not use them
+    return UNTIMED_VIEW_OF_TIMESTAMPED_RECORD if has_timestamps else RECORD
+
+
+def parse_binary_records(data, offset, base, record, text_fields, file_path):
+    """
+    Parses and validates the complete binary records in `data` from `offset`, where `base` is
+    the position of `data` in the file and `text_fields` caches decoded text fields. Returns
+    the records (in the same form as `parse_transaction_lines`), the offset after the last
+    complete record, and whether a record ending the transactions was reached.
+    """
+    # The records are unpacked inline rather than through `iter_records`, since this loop is the
+    # whole cost of reading a log
+    unpack_from, fixed_size = record.unpack_from, record.size
+    codes = _TRANSACTION_CODES
+
+    records = []
+    end = len(data)
+    while offset + fixed_size <= end:
+        code, account_number, cents, name_length, misc_length = unpack_from(
+            data, offset
+        )
+
+        start = offset
+        name_end = offset + fixed_size + name_length
+        misc_end = name_end + misc_length
+        if misc_end > end:
+            break
+
+        # Holder names and miscellaneous fields repeat heavily, so each distinct pair of raw
+        # fields is decoded and stripped only once
+        raw = data[start + fixed_size : misc_end]
+        offset = misc_end
+        fields = text_fields.get(raw)
+        if fields is None:
+            fields = text_fields[raw] = (
+                raw[:name_length].decode().strip(),
+                raw[name_length:].decode().strip(),
+            )
+
+        # Stop once we hit the end of transactions record
+        if code == 0:
+            records.append({"transaction_code": "00", "miscellaneous": fields[1]})
+            if not fields[1]:
+                return records, offset, True
+            continue
+
+        if not 1 <= code <= 8:
+            log_constraint_error(
+                f"Record at byte {base + start}: Invalid transaction code '{code:02}'",
+                file_path,
+                fatal=True,
+            )
+            continue
+
+        if account_number > 99999:
+            log_constraint_error(
+                f"Record at byte {base + start}: Invalid account number '{account_number}'",
+                file_path,
+                fatal=True,
+            )
+            continue
+
+        if not 0 <= cents <= 9999999:
+            log_constraint_error(
+                f"Record at byte {base + start}: Invalid amount '{cents}' cents",
+                file_path,
+                fatal=True,
+            )
+            continue
+
+        records.append(
+            {
+                "transaction_code": codes[code],
+                "account_name": fields[0],
+                "account_number": str(account_number),
+                "amount": cents / 100,
+                "miscellaneous": fields[1],
+                "session_id": None,
+                "session_number": None,
             }
         )
+
+    return records, offset, False
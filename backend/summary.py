@@ -0,0 +1,170 @@
+"""
+This module keeps the end-of-day aggregates of a backend run. The engine records every
+transaction in a `RunSummary` as it applies or rejects it, so the totals by transaction type, the
+fee revenue, and the rejections are ready when the run ends without reading anything again.
+
+The summary also reconciles the run: the sum of the closing balances must equal the sum of the
+opening balances plus the net postings of the applied transactions, to the cent.
+"""
+
+from print_error import log_constraint_error
+from transactions import TransactionCode
+
+VALID_CODES = {code.value for code in TransactionCode}
+
+
+def to_cents(amount):
+    """Convert a dollar amount to a whole number of cents."""
+    return round(amount * 100)
+
+
+def format_cents(cents):
+    """Format a whole number of cents as a dollar amount with thousands separators."""
+    sign = "-" if cents < 0 else ""
+    return f"{sign}{abs(cents) // 100:,}.{abs(cents) % 100:02}"
+
+
+class RunSummary:
+    """Running totals of one backend run, all kept in whole cents."""
+
+    def __init__(self):
+        """Start a summary with every total at zero."""
+        self.applied = {code.value: [0, 0] for code in TransactionCode}
+        self.rejected = {code.value: [0, 0] for code in TransactionCode}
+        self.fee_cents = 0
+        self.net_cents = 0
+        self.opening_cents = None
+        self.closing_cents = None
+        self.opening_count = 0
+        self.closing_count = 0
+        self.period_end = None
+
+    def open(self, accounts):
+        """Record the opening balances, before any transaction is applied."""
+        self.opening_cents = sum(to_cents(account["balance"]) for account in accounts)
+        self.opening_count = len(accounts)
+
+    def totals(self):
+        """Return the running totals (not the closing balances) as a JSON-serializable dict."""
+        return {
+            "applied": self.applied,
+            "rejected": self.rejected,
+            "fee_cents": self.fee_cents,
+            "net_cents": self.net_cents,
+            "opening_cents": self.opening_cents,
+            "opening_count": self.opening_count,
+        }
+
+    def restore_totals(self, totals):
+        """Carry on from the running totals of a run that stopped on its time budget."""
+        self.applied = {code: list(total) for code, total in totals["applied"].items()}
+        self.rejected = {code: list(total) for code, total in totals["rejected"].items()}
+        self.fee_cents = totals["fee_cents"]
+        self.net_cents = totals["net_cents"]
+        self.opening_cents = totals["opening_cents"]
+        self.opening_count = totals["opening_count"]
+
+    def record(self, transaction_code, amount, posting):
+        """
+        Record one transaction. `posting` is the (fee, net change to the sum of all balances)
+        returned by the handler that applied it, or None if the transaction was rejected.
+        """
+        if posting is None:
+            totals = self.rejected.setdefault(transaction_code, [0, 0])
+        else:
+            fee, net = posting
+            self.fee_cents += to_cents(fee)
+            self.net_cents += to_cents(net)
+            totals = self.applied.setdefault(transaction_code, [0, 0])
+
+        totals[0] += 1
+        totals[1] += to_cents(amount)
+
+    def record_period_end(self, totals):
+        """Record the fees and interest of a period-end pass (see period_end.py)."""
+        self.period_end = totals
+        self.fee_cents += totals.fee_cents
+        self.net_cents += totals.net_cents
+
+    def close(self, accounts):
+        """Record the closing balances, after every transaction has been applied."""
+        self.closing_cents = sum(to_cents(account["balance"]) for account in accounts)
+        self.closing_count = len(accounts)
+
+    def discrepancy_cents(self):
+        """Return how far the closing total is from the opening total plus the net postings."""
+        return self.closing_cents - (self.opening_cents + self.net_cents)
+
+    def check_reconciliation(self):
+        """Log an error if the closing balances do not reconcile, and return whether they do."""
+        discrepancy = self.discrepancy_cents()
+        if discrepancy != 0:
+            log_constraint_error(
+                f"Closing balances differ from opening balances plus net postings by {format_cents(discrepancy)}",
+                "RECONCILIATION",
+                fatal=False,
+            )
+        return discrepancy == 0
+
+    def report(self):
+        """Return the end-of-day summary report as text."""
+        lines = [
+            "End of day summary",
+            "",
+            f"{'Transaction':<12} {'Applied':>9} {'Amount':>16} {'Rejected':>9} {'Amount':>16}",
+        ]
+
+        applied_count = rejected_count = 0
+        for code in TransactionCode:
+            count, cents = self.applied[code.value]
+            rejected, rejected_cents = self.rejected[code.value]
+            applied_count += count
+            rejected_count += rejected
+            lines.append(
+                f"{code.name:<12} {count:>9,} {format_cents(cents):>16} "
+                f"{rejected:>9,} {format_cents(rejected_cents):>16}"
+            )
+
+        # Codes that are not valid transaction codes only ever show up as rejections
+        for code, (rejected, rejected_cents) in self.rejected.items():
+            if code not in VALID_CODES:
+                rejected_count += rejected
+                lines.append(
+                    f"{code:<12} {0:>9} {format_cents(0):>16} "
+                    f"{rejected:>9,} {format_cents(rejected_cents):>16}"
+                )
+
+        lines.append(f"{'TOTAL':<12} {applied_count:>9,} {'':>16} {rejected_count:>9,}")
+
+        discrepancy = self.discrepancy_cents()
+        lines.append("")
+        if self.period_end is not None:
+            totals = self.period_end
+            lines += [
+                f"Period-end fees:         {format_cents(totals.fee_cents):>16}"
+                f"  ({totals.charged_count:,} accounts charged, "
+                f"{len(totals.rejected):,} rejected)",
+                f"Period-end interest:     {format_cents(totals.interest_cents):>16}"
+                f"  ({len(totals.clamped):,} accounts clamped)",
+            ]
+        lines += [
+            f"Fee revenue:             {format_cents(self.fee_cents):>16}",
+            f"Opening balances:        {format_cents(self.opening_cents):>16}"
+            f"  ({self.opening_count:,} accounts)",
+            f"Net postings:            {format_cents(self.net_cents):>16}",
+            f"Closing balances:        {format_cents(self.closing_cents):>16}"
+            f"  ({self.closing_count:,} accounts)",
+            "",
+            "Reconciliation: "
+            + (
+                "OK (closing = opening + net postings)"
+                if discrepancy == 0
+                else f"FAILED (off by {format_cents(discrepancy)})"
+            ),
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, file_path):
+        """Write the summary report to a file."""
+        with open(file_path, "w") as file:
+            file.write(self.report())
@@ -0,0 +1,419 @@
+"""
+This module keeps an inverted index of archived merged transaction files, so one account's history
+can be pulled out of months of files without reading them all. It maps every account number to
+postings, the (file, byte offset) of each transaction line naming the account. A transfer is posted
+under both its account and the destination account in its miscellaneous field.
+
+The index is a directory holding:
+
+- `index.json`: the indexed files (their paths, sizes, and modification times) in the order they
+  were indexed, which is the order of their numbers in the postings, and the segment files.
+- `segments/NNNNNN.idx`: the postings of the files added by one update. A header, then a
+  directory of (account number, postings offset) entries sorted by account number, then each
+  account's postings as varints. Each posting is delta-encoded from the one before it:
+  the file number as a difference, and the offset as a difference within the same file. Most
+  postings take three or four bytes.
+
+An update only scans the files that are not indexed yet, in a single pass each, and writes their
+postings as a new segment. Once there are more than MAX_SEGMENTS segments, they are merged into
+one, so a query never searches more than MAX_SEGMENTS segments. A query binary searches each
+segment's memory-mapped directory for the account, then seeks to the postings in each file. A
+compressed file cannot be seeked, so it is decompressed up to its last posting instead.
+
+To run this module, run one of:
+`python transaction_index.py DIR update FILE...` to index the files that are not indexed yet, or
+`python transaction_index.py DIR account NUMBER` to print an account's transactions, in the order
+their files were indexed.
+"""
+
+import argparse
+import itertools
+import json
+import mmap
+import operator
+import os
+import struct
+import sys
+
+from fileio import (
+    READ_BUFFER_SIZE,
+    detect_compression,
+    file_fingerprint,
+    open_input,
+    replace_file,
+)
+from print_error import log_constraint_error
+from transactions import TransactionCode
+
+# The record layouts and the binary transaction-log format are shared with the frontend through
+# the common/ directory
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common")
+)
+from binary_transactions import MAGIC as BINARY_MAGIC  # noqa: E402
+from binary_transactions import is_binary_transactions  # noqa: E402
+from records import TRANSACTION  # noqa: E402
+
+INDEX_FILE = "index.json"
+SEGMENT_DIRECTORY = "segments"
+VERSION = 1
+
+# Segment file: header (magic, format version, account count), the directory, and the postings
+SEGMENT_HEADER = struct.Struct("<4sHI")
+SEGMENT_MAGIC = b"BKTX"
+DIRECTORY_ENTRY = struct.Struct("<IQ")
+
+# Segments kept before they are merged into one
+MAX_SEGMENTS = 8
+
+_END_OF_SESSION_CODE = b"00"
+_TRANSFER_CODE = TransactionCode.TRANSFER.value.encode()
+
+
+def encode_postings(postings):
+    """Encode a list of (file number, offset) postings, in order, as delta-encoded varints."""
+    data = bytearray()
+    previous_file = previous_offset = 0
+    for file_number, offset in postings:
+        if file_number != previous_file:
+            previous_offset = 0
+        for value in (file_number - previous_file, offset - previous_offset):
+            while value >= 0x80:
+                data.append(value & 0x7F | 0x80)
+                value >>= 7
+            data.append(value)
+        previous_file, previous_offset = file_number, offset
+    return bytes(data)
+
+
+def decode_postings(data):
+    """Decode postings encoded by `encode_postings`."""
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+
+    postings = []
+    file_number = offset = 0
+    for file_delta, offset_delta in zip(values[0::2], values[1::2]):
+        if file_delta:
+            file_number += file_delta
+            offset = 0
+        offset += offset_delta
+        postings.append((file_number, offset))
+    return postings
+
+
+def scan_transactions(file_path, file_number, postings):
+    """
+    Add the postings of every transaction in a text transactions file to `postings`, a dictionary
+    of account number: list of postings. Returns False, without scanning, for a binary log.
+    """
+    split = TRANSACTION.split
+    with open_input(file_path, "rb") as file:
+        if is_binary_transactions(file.peek(len(BINARY_MAGIC))):
+            return False
+
+        offset = 0
+        for line in file:
+            code, _, account_number, _, miscellaneous = split(line)
+            if code != _END_OF_SESSION_CODE and account_number.isdigit():
+                posting = (file_number, offset)
+                account_number = int(account_number)
+                postings.setdefault(account_number, []).append(posting)
+
+                # The destination of a transfer is read as the engine reads it, whatever its padding
+                destination = miscellaneous.strip()
+                if code == _TRANSFER_CODE and destination.isdigit():
+                    destination = int(destination)
+                    if destination != account_number:
+                        postings.setdefault(destination, []).append(posting)
+            offset += len(line)
+    return True
+
+
+class Segment:
+    """A segment file of the index, memory-mapped to look accounts up in place."""
+
+    def __init__(self, file_path):
+        """Open the segment file."""
+        with open(file_path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = SEGMENT_HEADER.unpack_from(self.data, 0)
+        self.postings_start = SEGMENT_HEADER.size + DIRECTORY_ENTRY.size * self.count
+        if (
+            magic != SEGMENT_MAGIC
+            or version != VERSION
+            or len(self.data) < self.postings_start
+        ):
+            log_constraint_error(
+                "Not a transaction index segment (or an unsupported version)",
+                file_path,
+                fatal=True,
+            )
+
+    def _entry(self, index):
+        return DIRECTORY_ENTRY.unpack_from(
+            self.data, SEGMENT_HEADER.size + DIRECTORY_ENTRY.size * index
+        )
+
+    def _postings(self, index):
+        """Helper to decode the postings of the account at a position in the directory."""
+        _, offset = self._entry(index)
+        end = len(self.data) - self.postings_start
+        if index + 1 < self.count:
+            end = self._entry(index + 1)[1]
+        return decode_postings(
+            self.data[self.postings_start + offset : self.postings_start + end]
+        )
+
+    def lookup(self, account_number):
+        """Return an account's postings in the segment, by binary search of its directory."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            number = self._entry(middle)[0]
+            if number < account_number:
+                low = middle + 1
+            elif number > account_number:
+                high = middle
+            else:
+                return self._postings(middle)
+        return []
+
+    def items(self):
+        """Yield every account number in the segment with its postings, in order."""
+        for index in range(self.count):
+            yield self._entry(index)[0], self._postings(index)
+
+    def close(self):
+        self.data.close()
+
+
+class TransactionIndex:
+    """The inverted index of transaction files stored in a directory."""
+
+    def __init__(self, directory):
+        """Open the index in `directory` (which is created when the first files are indexed)."""
+        self.directory = directory
+        self.files = []
+        self.segments = []
+        self.next_segment = 1
+
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, "r") as file:
+                    index = json.load(file)
+                if index.get("version") != VERSION:
+                    raise ValueError("unsupported version")
+                self.files = index["files"]
+                self.segments = index["segments"]
+                self.next_segment = index["next_segment"]
+            except (OSError, ValueError, KeyError, TypeError):
+                log_constraint_error(
+                    "The transaction index is corrupted (or an unsupported version)",
+                    index_path,
+                    fatal=True,
+                )
+
+    def _segment_path(self, name):
+        return os.path.join(self.directory, SEGMENT_DIRECTORY, name)
+
+    def _save_index(self):
+        """Write the index atomically, after the segments it lists have been written."""
+        index = {
+            "version": VERSION,
+            "files": self.files,
+            "segments": self.segments,
+            "next_segment": self.next_segment,
+        }
+        replace_file(
+            os.path.join(self.directory, INDEX_FILE),
+            [json.dumps(index).encode()],
+            binary=True,
+        )
+
+    def update(self, file_paths):
+        """
+        Index the transaction files that are not indexed yet, and return how many were indexed.
+        An indexed file that has changed since is an error, as its postings would be wrong.
+        """
+        indexed = {file["path"]: file for file in self.files}
+        postings = {}
+        new_files = []
+        for file_path in file_paths:
+            path = os.path.abspath(file_path)
+            if not os.path.isfile(path):
+                log_constraint_error("File not found", file_path, fatal=True)
+            fingerprint = file_fingerprint(path)
+            if path in indexed:
+                if dict(fingerprint, path=path) != indexed[path]:
+                    log_constraint_error(
+                        "The file has changed since it was indexed (remove the index to rebuild it)",
+                        file_path,
+                        fatal=True,
+                    )
+                continue
+
+            if not scan_transactions(path, len(self.files) + len(new_files), postings):
+                log_constraint_error(
+                    "Binary transaction logs are not indexed (convert it to text first)",
+                    file_path,
+                    fatal=False,
+                )
+                continue
+            new_files.append(dict(fingerprint, path=path))
+            indexed[path] = new_files[-1]
+
+        if not new_files:
+            return 0
+        self.files += new_files
+        self._write_segment(postings)
+
+        # The merged segments are only removed once the index no longer lists them
+        merged = []
+        if len(self.segments) > MAX_SEGMENTS:
+            merged = self._merge_segments()
+        self._save_index()
+        for name in merged:
+            os.remove(self._segment_path(name))
+        return len(new_files)
+
+    def _write_segment(self, postings):
+        """Write the postings, a dictionary of account number: postings, as a new segment."""
+        entries = []
+        chunks = []
+        offset = 0
+        for account_number in sorted(postings):
+            data = encode_postings(postings[account_number])
+            entries.append(DIRECTORY_ENTRY.pack(account_number, offset))
+            chunks.append(data)
+            offset += len(data)
+
+        name = f"{self.next_segment:06}.idx"
+        self.next_segment += 1
+        replace_file(
+            self._segment_path(name),
+            [SEGMENT_HEADER.pack(SEGMENT_MAGIC, VERSION, len(entries))]
+            + entries
+            + chunks,
+            binary=True,
+        )
+        self.segments.append(name)
+
+    def _merge_segments(self):
+        """Merge every segment into a new one, and return the names of the merged segments."""
+        # Later segments hold later files, so each account's postings stay in order
+        postings = {}
+        for name in self.segments:
+            segment = Segment(self._segment_path(name))
+            for account_number, account_postings in segment.items():
+                postings.setdefault(account_number, []).extend(account_postings)
+            segment.close()
+
+        merged = self.segments
+        self.segments = []
+        self._write_segment(postings)
+        return merged
+
+    def account_postings(self, account_number):
+        """Return an account's postings, in the order their files were indexed."""
+        postings = []
+        for name in self.segments:
+            segment = Segment(self._segment_path(name))
+            postings += segment.lookup(int(account_number))
+            segment.close()
+        return postings
+
+    def account_history(self, account_number):
+        """
+        Yield the (file path, offset, line) of each of an account's transactions, in the order
+        their files were indexed. A file that is missing or has changed since it was indexed is
+        reported and left out.
+        """
+        postings = self.account_postings(account_number)
+        for file_number, file_postings in itertools.groupby(
+            postings, key=operator.itemgetter(0)
+        ):
+            file = self.files[file_number]
+            path = file["path"]
+            if not os.path.exists(path) or dict(
+                file_fingerprint(path), path=path
+            ) != file:
+                log_constraint_error(
+                    "The file is missing or has changed since it was indexed, "
+                    "so its transactions are left out",
+                    path,
+                    fatal=False,
+                )
+                continue
+
+            offsets = [offset for _, offset in file_postings]
+            for offset, line in zip(offsets, _read_lines_at(path, offsets)):
+                yield path, offset, line.decode().rstrip("\n")
+
+
+def _read_lines_at(file_path, offsets):
+    """Helper to yield the lines starting at the given offsets, in order, of a file."""
+    if detect_compression(file_path) is None:
+        with open(file_path, "rb") as file:
+            for offset in offsets:
+                file.seek(offset)
+                yield file.readline()
+        return
+
+    # A compressed file is read forward to each offset, a block at a time
+    with open_input(file_path, "rb") as file:
+        position = 0
+        for offset in offsets:
+            while position < offset:
+                skipped = file.read(min(offset - position, READ_BUFFER_SIZE))
+                if not skipped:
+                    return
+                position += len(skipped)
+            line = file.readline()
+            position += len(line)
+            yield line
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Index archived transaction files by account and look up an account's history."
+    )
+    parser.add_argument("directory", help="Directory holding the index")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update = commands.add_parser("update", help="Index the files not indexed yet")
+    update.add_argument("file_paths", nargs="+", help="Merged transaction files")
+
+    account = commands.add_parser("account", help="Print an account's transactions")
+    account.add_argument("account_number", help="Account number")
+
+    args = parser.parse_args()
+    index = TransactionIndex(args.directory)
+
+    if args.command == "update":
+        count = index.update(args.file_paths)
+        print(
+            f"Indexed {count} new files, {len(index.files)} files in the index "
+            f"({len(index.segments)} segments)"
+        )
+    else:
+        if not args.account_number.isdigit() or len(args.account_number) > 5:
+            log_constraint_error(
+                f"Invalid account number '{args.account_number}'",
+                "transaction index",
+                fatal=True,
+            )
+        for path, offset, line in index.account_history(args.account_number):
+            print(f"{path}:{offset}: {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,8 +16,11 @@ class TransactionCode(Enum):
     CHANGEPLAN = "08"
 
 
-def apply_transactions(accounts, transactions):
-    """Applies transactions to accounts and returns the updated accounts list"""
+def apply_transactions(accounts, transactions, summary=None):
+    """
+    Applies transactions to accounts and returns the updated accounts list. If a `RunSummary`
+    is given, every transaction is recorded in it as it is applied or rejected.
+    """
 
     for transaction in transactions:
         transaction_code = transaction["transaction_code"]
@@ -26,22 +29,25 @@ def apply_transactions(accounts, transactions):
         amount = transaction["amount"]
         miscellaneous = transaction["miscellaneous"]
 
+        # Each handler returns the fee it charged and the net change to the sum of all balances,
+        # or None if it rejected the transaction
+        posting = None
         if transaction_code == TransactionCode.WITHDRAWAL.value:
-            handle_withdrawal(accounts, account_number, amount)
+            posting = handle_withdrawal(accounts, account_number, amount)
         elif transaction_code == TransactionCode.TRANSFER.value:
-            handle_transfer(accounts, account_number, miscellaneous, amount)
+            posting = handle_transfer(accounts, account_number, miscellaneous, amount)
         elif transaction_code == TransactionCode.PAYBILL.value:
-            handle_paybill(accounts, account_number, amount)
+            posting = handle_paybill(accounts, account_number, amount)
         elif transaction_code == TransactionCode.DEPOSIT.value:
-            handle_deposit(accounts, account_number, amount)
+            posting = handle_deposit(accounts, account_number, amount)
         elif transaction_code == TransactionCode.CREATE.value:
-            handle_create(accounts, account_number, account_name, amount)
+            posting = handle_create(accounts, account_number, account_name, amount)
         elif transaction_code == TransactionCode.DELETE.value:
-            handle_delete(accounts, account_number)
+            posting = handle_delete(accounts, account_number)
         elif transaction_code == TransactionCode.DISABLE.value:
-            handle_disable(accounts, account_number)
+            posting = handle_disable(accounts, account_number)
         elif transaction_code == TransactionCode.CHANGEPLAN.value:
-            handle_changeplan(accounts, account_number)
+            posting = handle_changeplan(accounts, account_number)
         else:
             # This should never happen due to prior validation, but we can log an error if it does
             log_constraint_error(
@@ -50,6 +56,9 @@ def apply_transactions(accounts, transactions):
                 fatal=False,
             )
 
+        if summary is not None:
+            summary.record(transaction_code, amount, posting)
+
 
 def handle_withdrawal(accounts, account_number, amount):
     """Handles withdrawal transactions and updates the account balance accordingly."""
@@ -79,6 +88,7 @@ def handle_withdrawal(accounts, account_number, amount):
     # Update the account and the transaction count
     account["balance"] = new_balance
     increment_transaction_count(account)
+    return transaction_cost, -(amount + transaction_cost)
 
 
 def handle_transfer(accounts, from_account_number, to_account_number, amount):
@@ -128,6 +138,12 @@ def handle_transfer(accounts, from_account_number, to_account_number, amount):
     to_account["balance"] = to_account_new_balance
     increment_transaction_count(from_account)
 
+    # A transfer to the same account keeps only the credited balance, so no fee is collected
+    # and the net change is the credit
+    if from_account is to_account:
+        return 0.0, amount
+    return transaction_cost, -transaction_cost
+
 
 def handle_paybill(accounts, account_number, amount):
     """Handles paybill transactions and updates the account balance accordingly."""
@@ -157,6 +173,7 @@ def handle_paybill(accounts, account_number, amount):
     # Update the account and the transaction count
     account["balance"] = new_balance
     increment_transaction_count(account)
+    return transaction_cost, -(amount + transaction_cost)
 
 
 def handle_deposit(accounts, account_number, amount):
@@ -187,6 +204,7 @@ def handle_deposit(accounts, account_number, amount):
     # Update the account and the transaction count
     account["balance"] = new_balance
     increment_transaction_count(account)
+    return transaction_cost, amount - transaction_cost
 
 
 def handle_create(accounts, account_number, account_name, amount):
@@ -210,6 +228,7 @@ def handle_create(accounts, account_number, account_name, amount):
         "plan": "SP",
     }
     accounts.append(account)
+    return 0.0, amount
 
 
 def handle_changeplan(accounts, account_number):
@@ -241,6 +260,7 @@ def handle_changeplan(accounts, account_number):
     account["plan"] = "SP" if account["plan"] == "NP" else "NP"
     account["balance"] = new_balance
     increment_transaction_count(account)
+    return transaction_cost, -transaction_cost
 
 
 def handle_delete(accounts, account_number):
@@ -255,8 +275,9 @@ def handle_delete(accounts, account_number):
         )
         return
 
-    # Remove the account from the accounts list
+    # Remove the account from the accounts list, taking its balance out of the bank's total
     accounts.remove(account)
+    return 0.0, -account["balance"]
 
 
 def handle_disable(accounts, account_number):
@@ -288,6 +309,7 @@ def handle_disable(accounts, account_number):
     account["status"] = "D"
     account["balance"] = new_balance
     increment_transaction_count(account)
+    return transaction_cost, -transaction_cost
 
 
 def get_account(accounts, account_number) -> dict | None:
@@ -0,0 +1,91 @@
+"""
+This module remembers which parts of the old master accounts file have already been validated.
+Most of the master file is byte-identical from one day to the next, so only the parts that
+changed need their fields checked again.
+
+The file is split into blocks of lines. Block boundaries are chosen by the content of the
+lines (after any line whose CRC-32 ends in six zero bits, or after MAX_BLOCK_LINES lines), so an
+account created or deleted in the middle of the file only changes the blocks around it instead
+of shifting every block after it. Each block is identified by a BLAKE2b digest of its text, and
+the whole file by a Merkle root over the block digests in order.
+
+The cache file holds the digests of the blocks of the last file that validated completely, and
+that file's Merkle root. A block whose digest is in the cache is known to be valid. Any other
+block has been changed (or tampered with, or corrupted) since the last run and is revalidated.
+"""
+
+import hashlib
+import json
+import zlib
+
+from fileio import replace_file
+
+# A block ends after a line whose CRC-32 has these bits clear (64 lines per block on average)
+BLOCK_BOUNDARY_MASK = 0x3F
+MAX_BLOCK_LINES = 256
+
+DIGEST_SIZE = 16
+VERSION = 1
+
+
+def split_blocks(lines):
+    """Yield the lines in content-defined blocks (lists of lines)."""
+    block = []
+    for line in lines:
+        block.append(line)
+        if (
+            len(block) >= MAX_BLOCK_LINES
+            or zlib.crc32(line.encode()) & BLOCK_BOUNDARY_MASK == 0
+        ):
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def block_digest(block):
+    """Return the hex digest identifying a block of lines."""
+    return hashlib.blake2b(
+        "".join(block).encode(), digest_size=DIGEST_SIZE
+    ).hexdigest()
+
+
+def merkle_root(digests):
+    """Return the root digest over a sequence of block digests."""
+    return hashlib.blake2b(
+        b"".join(bytes.fromhex(digest) for digest in digests),
+        digest_size=DIGEST_SIZE,
+    ).hexdigest()
+
+
+def load_validation_cache(cache_path):
+    """
+    Read a validation cache and return its validated block digests and Merkle root. A missing or
+    unreadable cache is treated as empty, so every block is validated.
+    """
+    try:
+        with open(cache_path, "r") as file:
+            cache = json.load(file)
+        if cache.get("version") != VERSION or not cache.get("validated"):
+            return set(), None
+        return set(cache["blocks"]), cache["root"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return set(), None
+
+
+def save_validation_cache(cache_path, digests):
+    """Record the blocks of a file that has just validated completely."""
+    cache = {
+        "version": VERSION,
+        "validated": True,
+        "root": merkle_root(digests),
+        "blocks": digests,
+    }
+
+    # Replace the cache atomically so a crash never leaves a half-written cache behind
+    replace_file(cache_path, [json.dumps(cache)])
+
+
+def describe_blocks(blocks):
+    """Describe blocks given as (first line, last line) pairs as line ranges, for the report."""
+    return ", ".join(f"lines {first}-{last}" for first, last in blocks)
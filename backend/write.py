@@ -1,5 +1,23 @@
+import os
+import sys
+
+from fileio import open_output
 from print_error import log_constraint_error
 
+# The record layouts are shared with the frontend through the common/ directory
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common")
+)
+from records import (  # noqa: E402
+    CURRENT_ACCOUNT,
+    CURRENT_END_OF_FILE,
+    MASTER_ACCOUNT,
+    MASTER_END_OF_FILE,
+)
+
+# The account files are written through a large buffer, so each line is not a separate write
+WRITE_BUFFER_SIZE = 1024 * 1024
+
 
 def write_new_current_accounts(accounts, file_path):
     """
@@ -16,7 +34,7 @@ def write_new_current_accounts(accounts, file_path):
     Note: As mentioned in the course Discord, we have included the account plan type
     in the current accounts file.
     """
-    with open(file_path, "w") as file:
+    with open_output(file_path, WRITE_BUFFER_SIZE) as file:
         for acc in accounts:
             # Validate account number
             if (
@@ -80,16 +98,20 @@ def write_new_current_accounts(accounts, file_path):
                     fatal=True,
                 )
 
-            # Format fields
-            acc_num = acc["account_number"].zfill(5)
-            name = acc["name"].ljust(20)[:20]
-            balance = f"{acc['balance']:08.2f}"
-
             # Write line (37 chars + plan type = 39 chars total)
-            file.write(f"{acc_num} {name} {acc['status']} {balance} {plan}\n")
+            file.write(
+                CURRENT_ACCOUNT.format(
+                    acc["account_number"],
+                    acc["name"],
+                    acc["status"],
+                    acc["balance"],
+                    plan,
+                )
+                + "\n"
+            )
 
         # Add END_OF_FILE marker
-        file.write("00000 END_OF_FILE          A 00000.00 NP\n")
+        file.write(CURRENT_END_OF_FILE + "\n")
 
 
 def write_new_master_accounts(accounts, file_path):
@@ -111,7 +133,7 @@ def write_new_master_accounts(accounts, file_path):
     # The master bank accounts must be sorted by account number
     accounts = sorted(accounts, key=lambda x: x["account_number"])
 
-    with open(file_path, "w") as f:
+    with open_output(file_path, WRITE_BUFFER_SIZE) as f:
         for account in accounts:
             # Validate the account number
             if (
@@ -189,14 +211,14 @@ def write_new_master_accounts(accounts, file_path):
                     fatal=True,
                 )
 
-            line = (
-                f"{account['account_number'].zfill(5)} "
-                f"{account['name'].ljust(20)} "
-                f"{account['status']} "
-                f"{account['balance']:08.2f} "
-                f"{str(account['total_transactions']).zfill(4)} "
-                f"{account['plan']}"
+            line = MASTER_ACCOUNT.format(
+                account["account_number"],
+                account["name"],
+                account["status"],
+                account["balance"],
+                account["total_transactions"],
+                account["plan"],
             )
             f.write(line + "\n")
 
-        f.write("00000 END_OF_FILE          A 00000.00 0000 NP\n")
+        f.write(MASTER_END_OF_FILE + "\n")
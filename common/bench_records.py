@@ -0,0 +1,155 @@
+"""
+This module benchmarks the shared record codec against the hand-written slicing and f-strings it
+replaced: splitting master account lines, parsing transaction lines, and formatting both, plus
+splitting a whole master file held as bytes with `struct`.
+
+To run this module, run `python bench_records.py [--records 200000] [--repeat 5]`.
+"""
+
+import argparse
+import random
+import time
+
+from records import MASTER_ACCOUNT, TRANSACTION
+
+
+def generate_master_lines(count: int) -> list[str]:
+    """Generate `count` master account lines."""
+    rng = random.Random(3060)
+    return [
+        MASTER_ACCOUNT.format(
+            rng.randint(1, 99999),
+            rng.choice(["Alice", "Bob", "Jane Doe"]),
+            rng.choice("AD"),
+            rng.uniform(0, 99999),
+            rng.randint(0, 9999),
+            rng.choice(["SP", "NP"]),
+        )
+        for _ in range(count)
+    ]
+
+
+def generate_transaction_lines(count: int) -> list[str]:
+    """Generate `count` transaction lines."""
+    rng = random.Random(3060)
+    return [
+        TRANSACTION.format(
+            rng.randint(1, 8),
+            rng.choice(["Alice", "Bob", "Jane Doe"]),
+            rng.randint(10001, 99999),
+            rng.uniform(0, 2000),
+            rng.choice(["", "EC", "10002"]),
+        )
+        for _ in range(count)
+    ]
+
+
+def best_time(function, repeat: int) -> float:
+    """Return the fastest of `repeat` timed calls to `function`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the shared record codec against hand-written slicing."
+    )
+    parser.add_argument(
+        "--records", type=int, default=200000, help="Number of records to time"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs of each case")
+    args = parser.parse_args()
+
+    master_lines = generate_master_lines(args.records)
+    transaction_lines = generate_transaction_lines(args.records)
+    master_bytes = "".join(f"{line}\n" for line in master_lines).encode()
+    # Master values as the backend holds them: account numbers as digits without leading zeros
+    master_values = [
+        (number.lstrip("0") or "0", name.strip(), status, float(balance), int(total), plan)
+        for number, name, status, balance, total, plan in map(
+            MASTER_ACCOUNT.split, master_lines
+        )
+    ]
+    transaction_values = [TRANSACTION.parse(line) for line in transaction_lines]
+
+    def slice_master():
+        for line in master_lines:
+            (line[0:5], line[6:26], line[27], line[29:37], line[38:42], line[43:45])
+
+    def split_master():
+        split = MASTER_ACCOUNT.split
+        for line in master_lines:
+            split(line)
+
+    def unpack_master():
+        for _ in MASTER_ACCOUNT.iter_unpack(master_bytes):
+            pass
+
+    def slice_transactions():
+        for line in transaction_lines:
+            (
+                int(line[0:2]),
+                line[3:23].strip(),
+                int(line[24:29]),
+                float(line[30:38]),
+                line[39:].strip(),
+            )
+
+    def parse_transactions():
+        parse = TRANSACTION.parse
+        for line in transaction_lines:
+            parse(line)
+
+    def fstring_master():
+        for number, name, status, balance, total, plan in master_values:
+            (
+                f"{number.zfill(5)} {name.ljust(20)} {status} "
+                f"{f'{balance:.2f}'.zfill(8)} {str(total).zfill(4)} {plan}"
+            )
+
+    def format_master():
+        format = MASTER_ACCOUNT.format
+        for values in master_values:
+            format(*values)
+
+    def fstring_transactions():
+        for code, name, number, amount, misc in transaction_values:
+            " ".join(
+                [
+                    f"{code:02}",
+                    name.ljust(20),
+                    f"{number:05}",
+                    f"{amount:.2f}".zfill(8),
+                    misc.ljust(2),
+                ]
+            )
+
+    def format_transactions():
+        format = TRANSACTION.format
+        for values in transaction_values:
+            format(*values)
+
+    cases = [
+        ("split master, slices", slice_master),
+        ("split master, codec", split_master),
+        ("split master, struct", unpack_master),
+        ("parse transactions, slices", slice_transactions),
+        ("parse transactions, codec", parse_transactions),
+        ("format master, f-strings", fstring_master),
+        ("format master, codec", format_master),
+        ("format transactions, f-strings", fstring_transactions),
+        ("format transactions, codec", format_transactions),
+    ]
+
+    print(f"{args.records} records, best of {args.repeat} runs")
+    for name, function in cases:
+        seconds = best_time(function, args.repeat)
+        print(f"{name:<32} {seconds:.3f} s  {args.records / seconds:>12,.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()
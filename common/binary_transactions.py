@@ -0,0 +1,163 @@
+"""
+This module defines the packed binary transaction-log format shared by the frontend and the backend.
+It holds the same records as the text transaction files, without the field-by-field text parsing.
+
+The file starts with a header (magic, format version, flags) followed by one record per
+transaction. Each record is a fixed part holding the transaction code, account number, amount in
+cents, and the byte lengths of the two text fields, optionally followed by a timestamp, and then
+the account holder name and miscellaneous field as UTF-8 bytes:
+
+    code (u8) | account number (u32) | cents (i64) | name length (u8) | misc length (u8) | [timestamp (f64)] | name | misc
+
+The name is stored without its padding. The miscellaneous field is stored exactly as it appears
+after the amount in the text layout, including the separating space and any padding, so every
+well-formed line of a text transaction file whose miscellaneous field is at most 255 bytes
+converts to a record and back unchanged. A longer line cannot be packed.
+"""
+
+import struct
+from collections.abc import Iterator
+
+from records import TRANSACTION
+
+MAGIC = b"BTXN"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")
+
+# Header flag: every record carries a timestamp (seconds since the epoch)
+FLAG_TIMESTAMPS = 1
+
+RECORD = struct.Struct("<BIqBB")
+TIMESTAMPED_RECORD = struct.Struct("<BIqBBd")
+
+# The fixed part of a timestamped record with the timestamp skipped, for readers that ignore it
+UNTIMED_VIEW_OF_TIMESTAMPED_RECORD = struct.Struct("<BIqBB8x")
+
+# The name and miscellaneous lengths are stored in one byte each
+MAX_FIELD_LENGTH = 255
+
+# The miscellaneous field is kept with its separating space, so it starts where the amount ends
+MISCELLANEOUS_START = TRANSACTION.slices["amount"].stop
+
+
+def is_binary_transactions(prefix: bytes) -> bool:
+    """Check whether the first bytes of a file are the binary transaction-log magic."""
+    return prefix[: len(MAGIC)] == MAGIC
+
+
+def pack_header(timestamps: bool = False) -> bytes:
+    """Return the file header for a binary transaction log, with or without timestamps."""
+    return HEADER.pack(MAGIC, VERSION, FLAG_TIMESTAMPS if timestamps else 0)
+
+
+def pack_record(
+    code: int,
+    account_holder_name: str,
+    account_number: int,
+    cents: int,
+    miscellaneous: str,
+    timestamp: float | None = None,
+) -> bytes:
+    """Pack one transaction record. Pass a timestamp exactly when the header has timestamps enabled."""
+    name = account_holder_name.rstrip(" ").encode()
+    misc = miscellaneous.encode()
+    if len(name) > MAX_FIELD_LENGTH or len(misc) > MAX_FIELD_LENGTH:
+        raise ValueError(
+            f"The name and miscellaneous field must each be at most {MAX_FIELD_LENGTH} bytes"
+        )
+
+    if timestamp is None:
+        fixed = RECORD.pack(code, account_number, cents, len(name), len(misc))
+    else:
+        fixed = TIMESTAMPED_RECORD.pack(
+            code, account_number, cents, len(name), len(misc), timestamp
+        )
+    return fixed + name + misc
+
+
+def parse_header(data: bytes) -> bool:
+    """Validate the header of a binary transaction log and return whether its records have timestamps."""
+    if len(data) < HEADER.size:
+        raise ValueError("Truncated header.")
+
+    magic, version, flags = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a binary transaction log.")
+    if version != VERSION:
+        raise ValueError(f"Unsupported binary transaction log version {version}.")
+
+    return bool(flags & FLAG_TIMESTAMPS)
+
+
+def iter_records(data: bytes) -> Iterator[tuple[int, str, int, int, str, float | None]]:
+    """
+    Yield (code, name, account number, cents, miscellaneous, timestamp) for every record in a
+    binary transaction log. The timestamp is None when the log has no timestamps.
+    """
+    has_timestamps = parse_header(data)
+    record = TIMESTAMPED_RECORD if has_timestamps else RECORD
+    unpack_from, fixed_size = record.unpack_from, record.size
+
+    offset, end = HEADER.size, len(data)
+    while offset < end:
+        if offset + fixed_size > end:
+            raise ValueError(f"Truncated record at byte {offset}.")
+        fields = unpack_from(data, offset)
+        code, account_number, cents, name_length, misc_length = fields[:5]
+
+        offset += fixed_size
+        name_end = offset + name_length
+        misc_end = name_end + misc_length
+        if misc_end > end:
+            raise ValueError(f"Truncated record at byte {offset - fixed_size}.")
+
+        yield (
+            code,
+            data[offset:name_end].decode(),
+            account_number,
+            cents,
+            data[name_end:misc_end].decode(),
+            fields[5] if has_timestamps else None,
+        )
+        offset = misc_end
+
+
+def parse_amount(text: str) -> int:
+    """Parse an 8-character text amount field into cents."""
+    digits = text[:5].lstrip("-") + text[6:]
+    if len(text) != 8 or text[5] != "." or not digits.isdigit():
+        raise ValueError(f"Invalid amount '{text}'")
+    return int(text.replace(".", ""))
+
+
+def record_from_line(line: str) -> tuple[int, str, int, int, str]:
+    """Split one line of a text transaction file into (code, name, account number, cents, miscellaneous)."""
+    line = line.rstrip("\n")
+    code, name, account_number, amount, _ = TRANSACTION.split(line)
+    if (
+        len(line) < MISCELLANEOUS_START
+        or not code.isdigit()
+        or not account_number.isdigit()
+    ):
+        raise ValueError(f"Malformed transaction line '{line}'")
+
+    return (
+        int(code),
+        name.rstrip(" "),
+        int(account_number),
+        parse_amount(amount),
+        line[MISCELLANEOUS_START:],
+    )
+
+
+def line_from_record(
+    code: int,
+    account_holder_name: str,
+    account_number: int,
+    cents: int,
+    miscellaneous: str,
+) -> str:
+    """Format a record as one line of a text transaction file (without the newline)."""
+    # Dividing by 100 gives the nearest float, which formats back to exactly the same cents
+    fields = TRANSACTION.format(code, account_holder_name, account_number, cents / 100, "")
+    return fields[:MISCELLANEOUS_START] + miscellaneous
@@ -0,0 +1,90 @@
+"""
+This module converts transaction files between the text layout and the packed binary
+transaction-log format in either direction. The direction is chosen from the input file: a binary
+log is converted to text, anything else is converted to binary. Converting a text file to binary
+and back reproduces every line unchanged, but every line is written with a `\n` ending: a missing
+final newline is added, and `\r\n` line endings become `\n`. A line whose miscellaneous field is
+over 255 bytes cannot be converted, and is reported by its line number.
+
+To run this module, run `python convert_transactions.py <input_file> <output_file> [--timestamp]`.
+With `--timestamp`, records converted from text are stamped with the conversion time.
+"""
+
+import argparse
+import sys
+import time
+
+from binary_transactions import (
+    is_binary_transactions,
+    iter_records,
+    line_from_record,
+    pack_header,
+    pack_record,
+    record_from_line,
+)
+
+
+def text_to_binary(input_file: str, output_file: str, timestamp: bool = False) -> int:
+    """Convert a text transaction file to a binary transaction log and return the number of records."""
+    now = time.time() if timestamp else None
+    count = 0
+
+    with open(input_file, "r", newline="") as source, open(output_file, "wb") as target:
+        target.write(pack_header(timestamp))
+        for line_num, line in enumerate(source, 1):
+            try:
+                record = record_from_line(line.rstrip("\r\n"))
+                packed = pack_record(*record, timestamp=now)
+            except ValueError as e:
+                raise ValueError(f"Line {line_num}: {e}") from None
+            target.write(packed)
+            count += 1
+
+    return count
+
+
+def binary_to_text(input_file: str, output_file: str) -> int:
+    """Convert a binary transaction log to a text transaction file and return the number of records."""
+    with open(input_file, "rb") as source:
+        data = source.read()
+
+    count = 0
+    with open(output_file, "w", newline="\n") as target:
+        for *record, _timestamp in iter_records(data):
+            target.write(line_from_record(*record) + "\n")
+            count += 1
+
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert transaction files between the text layout and the binary transaction-log format."
+    )
+    parser.add_argument("input_file", help="Text or binary transaction file to convert")
+    parser.add_argument("output_file", help="Where to write the converted file")
+    parser.add_argument(
+        "--timestamp",
+        action="store_true",
+        help="Stamp records converted from text with the conversion time",
+    )
+
+    args = parser.parse_args()
+
+    with open(args.input_file, "rb") as f:
+        binary_input = is_binary_transactions(f.read(len(b"BTXN")))
+
+    try:
+        if binary_input:
+            count = binary_to_text(args.input_file, args.output_file)
+            print(f"Converted {count} records to text: {args.output_file}")
+        else:
+            count = text_to_binary(args.input_file, args.output_file, args.timestamp)
+            print(f"Converted {count} records to binary: {args.output_file}")
+    except ValueError as e:
+        print(f"ERROR: {args.input_file}: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
-from pathlib import Path
+import copy
+import os
+import sys
+from collections.abc import Iterator, Mapping, MutableMapping
 
 from enum import Enum
 
+# The record layouts are shared with the backend through the common/ directory
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common")
+)
+from records import CURRENT_ACCOUNT, CURRENT_END_OF_FILE  # noqa: E402
+
 
 class AccountPaymentPlan(Enum):
     STUDENT = "SP"
@@ -11,6 +20,17 @@ class AccountPaymentPlan(Enum):
 class Account:
     """Represents a bank account with a holder name, account number, balance, active status, and payment plan."""
 
+    # Slots keep each account to its fields alone (no per-instance __dict__), which matters with
+    # tens of thousands of accounts loaded. The payment plan is a reference to a shared enum member.
+    __slots__ = (
+        "account_holder_name",
+        "account_number",
+        "balance",
+        "is_active",
+        "account_payment_plan",
+        "is_new",
+    )
+
     def __init__(
         self,
         account_holder_name: str,
@@ -35,11 +55,171 @@ class Account:
         return self.is_active and not self.is_new
 
 
-def read_accounts(filename: str = "accounts.txt") -> dict[int, Account]:
-    """Load the accounts from the accounts.txt file and return a dictionary mapping account numbers to Account objects."""
-    accounts = dict()
+class IndexedAccounts(dict):
+    """
+    A dictionary mapping account numbers to accounts that also indexes the account numbers of
+    each account holder, so checking who owns an account never scans the accounts.
+
+    The index follows every account added, replaced, or removed with item assignment, `del`,
+    or `pop`, so it stays correct through creates and deletes during a session. Disabled
+    accounts stay in the index: they still belong to their holder, they just cannot be used.
+    The highest account number is kept up to date the same way, for creates.
+    """
+
+    def __init__(self):
+        """Create an empty mapping and index."""
+        super().__init__()
+        self.account_numbers_by_holder: dict[str, set[int]] = {}
+        self._max_account_number: int | None = None
+
+    def __setitem__(self, account_number: int, account: Account):
+        previous = self.get(account_number)
+        if previous is not None:
+            self._unindex(account_number, previous)
+
+        super().__setitem__(account_number, account)
+        if (
+            self._max_account_number is None
+            or account_number > self._max_account_number
+        ):
+            self._max_account_number = account_number
+        self.account_numbers_by_holder.setdefault(
+            account.account_holder_name, set()
+        ).add(account_number)
+
+    def __delitem__(self, account_number: int):
+        account = self[account_number]
+        super().__delitem__(account_number)
+        self._unindex(account_number, account)
+        self._removed(account_number)
+
+    def pop(self, account_number: int, *default):
+        if account_number not in self:
+            return super().pop(account_number, *default)
+
+        account = super().pop(account_number)
+        self._unindex(account_number, account)
+        self._removed(account_number)
+        return account
+
+    def _unindex(self, account_number: int, account: Account):
+        """Helper to remove an account number from its holder's entry in the index."""
+        account_numbers = self.account_numbers_by_holder[account.account_holder_name]
+        account_numbers.discard(account_number)
+        if not account_numbers:
+            del self.account_numbers_by_holder[account.account_holder_name]
+
+    def _removed(self, account_number: int):
+        """Helper to find the next highest account number, only if the highest was removed."""
+        if account_number == self._max_account_number:
+            self._max_account_number = max(self.keys(), default=None)
+
+    def owned_by(self, account_number: int, account_holder_name: str) -> bool:
+        """Check whether the account belongs to the given account holder."""
+        return account_number in self.account_numbers_by_holder.get(
+            account_holder_name, ()
+        )
+
+    def max_account_number(self, default: int) -> int:
+        """Return the highest account number, or `default` if there are no accounts."""
+        if self._max_account_number is None:
+            return default
+        return self._max_account_number
+
+
+class AccountsOverlay(MutableMapping):
+    """
+    A copy-on-write view of a shared, read-only mapping of account numbers to accounts.
+
+    Sessions mutate the accounts they look up, so each account is copied into the overlay the
+    first time it is accessed. Creates and deletes only touch the overlay, leaving the shared
+    snapshot unchanged for every other session.
+    """
+
+    def __init__(self, shared_accounts: Mapping[int, Account]):
+        """Create an empty overlay on top of the given shared accounts."""
+        self.shared_accounts = shared_accounts
+        self.local_accounts: dict[int, Account] = {}
+        self.deleted_account_numbers: set[int] = set()
+
+    def __getitem__(self, account_number: int) -> Account:
+        account = self.local_accounts.get(account_number)
+        if account is not None:
+            return account
+
+        if account_number in self.deleted_account_numbers:
+            raise KeyError(account_number)
+
+        account = copy.copy(self.shared_accounts[account_number])
+        self.local_accounts[account_number] = account
+        return account
+
+    def __setitem__(self, account_number: int, account: Account):
+        self.local_accounts[account_number] = account
+        self.deleted_account_numbers.discard(account_number)
+
+    def __delitem__(self, account_number: int):
+        if account_number not in self:
+            raise KeyError(account_number)
+
+        self.local_accounts.pop(account_number, None)
+        if account_number in self.shared_accounts:
+            self.deleted_account_numbers.add(account_number)
+
+    def __contains__(self, account_number) -> bool:
+        if account_number in self.local_accounts:
+            return True
+        return (
+            account_number not in self.deleted_account_numbers
+            and account_number in self.shared_accounts
+        )
+
+    def __iter__(self) -> Iterator[int]:
+        for account_number in self.shared_accounts:
+            if account_number not in self.deleted_account_numbers:
+                yield account_number
+        for account_number in self.local_accounts:
+            if account_number not in self.shared_accounts:
+                yield account_number
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
 
-    if not Path(filename).exists():
+    def owned_by(self, account_number: int, account_holder_name: str) -> bool:
+        """Check whether the account belongs to the given account holder, without copying it into the overlay."""
+        account = self.local_accounts.get(account_number)
+        if account is not None:
+            return account.account_holder_name == account_holder_name
+        if account_number in self.deleted_account_numbers:
+            return False
+        return self.shared_accounts.owned_by(account_number, account_holder_name)
+
+    def max_account_number(self, default: int) -> int:
+        """
+        Return the highest account number, or `default` if there are no accounts. The shared
+        accounts are only scanned if the session deleted the highest of them.
+        """
+        shared_max = self.shared_accounts.max_account_number(default)
+        if shared_max in self.deleted_account_numbers:
+            shared_max = max(
+                (
+                    account_number
+                    for account_number in self.shared_accounts
+                    if account_number not in self.deleted_account_numbers
+                ),
+                default=default,
+            )
+        return max([shared_max, *self.local_accounts])
+
+
+def read_accounts(filename: str = "accounts.txt") -> IndexedAccounts:
+    """
+    Load the accounts from the accounts.txt file and return a dictionary mapping account numbers to Account objects.
+    The dictionary also indexes the account numbers of each account holder as the accounts are read.
+    """
+    accounts = IndexedAccounts()
+
+    if not os.path.exists(filename):
         return accounts
 
     with open(filename, "r") as f:
@@ -48,16 +228,16 @@ def read_accounts(filename: str = "accounts.txt") -> dict[int, Account]:
             if not line:
                 continue
 
-            account_holder_name = line[6:26].strip()
+            account_number, account_holder_name, status, balance, _ = (
+                CURRENT_ACCOUNT.split(line)
+            )
+            account_holder_name = account_holder_name.strip()
             if account_holder_name == "END_OF_FILE":
                 break
 
-            account_number = int(line[0:5])
-
-            status = line[27]
+            account_number = int(account_number)
             is_active = status == "A"
-
-            balance = float(line[29:37])
+            balance = float(balance)
 
             accounts[account_number] = Account(
                 account_holder_name, account_number, balance, is_active
@@ -74,14 +254,13 @@ def write_accounts(accounts: dict[int, Account], filename: str = "accounts.txt")
     """
     with open(filename, "w") as f:
         for account in accounts.values():
-            status = "A" if account.is_active else "D"
-            balance = f"{account.balance:.2f}".zfill(8)
-            line = (
-                f"{account.account_number:05} "
-                f"{account.account_holder_name.ljust(20)} "
-                f"{status} "
-                f"{balance}"
+            line = CURRENT_ACCOUNT.format(
+                account.account_number,
+                account.account_holder_name,
+                "A" if account.is_active else "D",
+                account.balance,
+                account.account_payment_plan.value,
             )
             f.write(line + "\n")
 
-        f.write("00000 END_OF_FILE           A 00000.00\n")
+        f.write(CURRENT_END_OF_FILE + "\n")
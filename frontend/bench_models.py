@@ -0,0 +1,149 @@
+"""
+This module benchmarks the memory used by the frontend models. It measures the bytes allocated per
+account when many `Account` objects are loaded, and per transaction when a long session is recorded
+in a `TransactionLog`, next to plain classes with a per-instance `__dict__` (the previous layout)
+for comparison.
+
+To run this module, run `python bench_models.py [--accounts 89999] [--transactions 100000]`.
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from account import Account, AccountPaymentPlan
+from transaction import Transaction, TransactionCode, TransactionLog
+
+
+class DictAccount:
+    """An account with the same fields as `Account`, stored in a per-instance `__dict__`."""
+
+    def __init__(self, account_holder_name, account_number, balance, is_active=True):
+        self.account_holder_name = account_holder_name
+        self.account_number = account_number
+        self.balance = balance
+        self.is_active = is_active
+        self.account_payment_plan = AccountPaymentPlan.STUDENT
+        self.is_new = False
+
+
+class DictTransaction:
+    """A transaction with the same fields as `Transaction`, stored in a per-instance `__dict__`."""
+
+    def __init__(
+        self, code, account_holder_name, account_number, amount, miscellaneous=None
+    ):
+        self.code = code
+        self.account_holder_name = account_holder_name
+        self.account_number = account_number
+        self.amount = amount
+        self.miscellaneous = miscellaneous
+
+
+def measure(build) -> int:
+    """Return the bytes still allocated by the object that `build()` returns."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return allocated
+
+
+def build_accounts(account_class, count: int) -> dict:
+    """Build `count` accounts keyed by account number, the way `read_accounts` does."""
+    return {
+        number: account_class(
+            f"Holder {number % 500}", number, (number % 5000) + 0.25, True
+        )
+        for number in range(10001, 10001 + count)
+    }
+
+
+def session_transactions(count: int):
+    """Yield the arguments of `count` transactions typical of a long admin session."""
+    codes = [
+        TransactionCode.WITHDRAWAL,
+        TransactionCode.DEPOSIT,
+        TransactionCode.PAYBILL,
+        TransactionCode.TRANSFER,
+    ]
+    for i in range(count):
+        code = codes[i % len(codes)]
+        miscellaneous = None
+        if code == TransactionCode.PAYBILL:
+            miscellaneous = "EC"
+        elif code == TransactionCode.TRANSFER:
+            miscellaneous = 10001 + (i * 7) % 5000
+        yield code, f"Holder {i % 500}", 10001 + i % 5000, (i % 1000) + 0.5, miscellaneous
+
+
+def build_transaction_list(transaction_class, count: int) -> list:
+    """Record `count` transactions as one object each in a list."""
+    return [transaction_class(*arguments) for arguments in session_transactions(count)]
+
+
+def build_transaction_log(count: int) -> TransactionLog:
+    """Record `count` transactions in a packed `TransactionLog`."""
+    log = TransactionLog()
+    for arguments in session_transactions(count):
+        log.append(Transaction(*arguments))
+    return log
+
+
+def report(label: str, allocated: int, count: int):
+    print(
+        f"{label:<34} {allocated / count:8.1f} bytes each   "
+        f"{allocated / 1024 / 1024:8.2f} MiB total"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure memory per account and per transaction for the frontend models."
+    )
+    parser.add_argument(
+        "--accounts", type=int, default=89999, help="Number of accounts to load"
+    )
+    parser.add_argument(
+        "--transactions",
+        type=int,
+        default=100000,
+        help="Number of transactions to record",
+    )
+
+    args = parser.parse_args()
+
+    print(f"{args.accounts} accounts")
+    report(
+        "Accounts with __dict__",
+        measure(lambda: build_accounts(DictAccount, args.accounts)),
+        args.accounts,
+    )
+    report(
+        "Accounts with __slots__",
+        measure(lambda: build_accounts(Account, args.accounts)),
+        args.accounts,
+    )
+
+    print(f"{args.transactions} transactions")
+    report(
+        "Transaction objects with __dict__",
+        measure(lambda: build_transaction_list(DictTransaction, args.transactions)),
+        args.transactions,
+    )
+    report(
+        "Transaction objects with __slots__",
+        measure(lambda: build_transaction_list(Transaction, args.transactions)),
+        args.transactions,
+    )
+    report(
+        "TransactionLog columns",
+        measure(lambda: build_transaction_log(args.transactions)),
+        args.transactions,
+    )
+
+
+if __name__ == "__main__":
+    main()
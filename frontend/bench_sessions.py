@@ -0,0 +1,192 @@
+"""
+This module drives generated session scripts through the frontend in-process and reports how it
+holds up under load: session and command throughput, and latency percentiles for every
+`TransactionHandler` method, for `Session.write_transactions`, and for the first load of each
+session's accounts. The accounts are loaded before a handler's timer starts, so the handler
+percentiles do not include parsing the accounts file.
+
+Each script is fed to the same command loop as `main.py` (with standard input and output swapped
+for in-memory streams), so the timings cover the real handlers, the account lookups, and the
+transaction file writes, without the process startup or socket costs measured by
+`bench_startup.py` and `load_test.py`.
+
+To run this module, run `python bench_sessions.py [--accounts 10000] [--sessions 2000] [--shared]`,
+or pass a directory written by `generate_sessions.py` to replay its accounts file and scripts.
+"""
+
+import argparse
+import contextlib
+import functools
+import glob
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+import main as frontend
+from account import read_accounts, write_accounts
+from generate_sessions import generate_accounts, generate_scripts
+from session import Session
+from transaction import TransactionHandler
+
+# The handler methods that are timed, one per command that produces a transaction
+HANDLER_METHODS = [
+    "withdrawal",
+    "transfer",
+    "paybill",
+    "deposit",
+    "create",
+    "delete",
+    "disable",
+    "changeplan",
+]
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Return the value at the given fraction of an already sorted list (nearest rank)."""
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+@contextlib.contextmanager
+def timed_methods(latencies: dict[str, list[float]]):
+    """
+    Time every call to the handler methods and `Session.write_transactions` while in the block,
+    appending each call's duration in seconds to `latencies[name]`, and time each session's
+    first load of its accounts as "load_accounts".
+    """
+    targets = [(TransactionHandler, name, name) for name in HANDLER_METHODS]
+    targets.append((Session, "write_transactions", "write_transactions"))
+
+    originals = [(Session, "accounts", Session.__dict__["accounts"])]
+    load_accounts = originals[0][2].fget
+    loads = latencies.setdefault("load_accounts", [])
+
+    def timed_accounts(session):
+        if session._accounts is not None:
+            return session._accounts
+        start = time.perf_counter()
+        try:
+            return load_accounts(session)
+        finally:
+            loads.append(time.perf_counter() - start)
+
+    Session.accounts = property(timed_accounts)
+
+    for cls, attribute, name in targets:
+        method = getattr(cls, attribute)
+        originals.append((cls, attribute, method))
+        calls = latencies.setdefault(name, [])
+
+        def timed(*args, _method=method, _calls=calls, **kwargs):
+            # The session's accounts are loaded (and timed) on their own before a handler runs
+            if isinstance(args[0], TransactionHandler):
+                args[0].session.accounts
+            start = time.perf_counter()
+            try:
+                return _method(*args, **kwargs)
+            finally:
+                _calls.append(time.perf_counter() - start)
+
+        setattr(cls, attribute, functools.wraps(method)(timed))
+
+    try:
+        yield
+    finally:
+        for cls, attribute, method in originals:
+            setattr(cls, attribute, method)
+
+
+def run_scripts(
+    scripts: list[str], accounts_file: str, output_dir: str, shared: bool
+) -> float:
+    """Run every script through the frontend command loop and return the wall time."""
+    session_options = {}
+    if shared:
+        # Like the server, all sessions share one read-only snapshot of the accounts
+        session_options["shared_accounts"] = read_accounts(accounts_file)
+
+    output_file = os.path.join(output_dir, "transactions.atf")
+    stdin = sys.stdin
+    start = time.perf_counter()
+    try:
+        for script in scripts:
+            sys.stdin = io.StringIO(script)
+            with contextlib.redirect_stdout(io.StringIO()):
+                frontend.run_session_loop(
+                    accounts_file, lambda: output_file, **session_options
+                )
+    finally:
+        sys.stdin = stdin
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay generated sessions through the frontend in-process and report latencies."
+    )
+    parser.add_argument(
+        "generated_dir",
+        nargs="?",
+        help="Directory written by generate_sessions.py (default: generate sessions now)",
+    )
+    parser.add_argument(
+        "--accounts", type=int, default=10000, help="Number of accounts to generate"
+    )
+    parser.add_argument(
+        "--sessions", type=int, default=2000, help="Number of sessions to generate"
+    )
+    parser.add_argument("--seed", type=int, default=3060, help="Random seed")
+    parser.add_argument(
+        "--shared",
+        action="store_true",
+        help="Share one read-only snapshot of the accounts between sessions, as the server does",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.generated_dir is not None:
+            accounts_file = os.path.join(args.generated_dir, "accounts.txt")
+            scripts = []
+            for path in sorted(
+                glob.glob(os.path.join(args.generated_dir, "sessions", "*.txt"))
+            ):
+                with open(path, "r") as f:
+                    scripts.append(f.read())
+        else:
+            accounts = generate_accounts(args.accounts, random.Random(args.seed))
+            accounts_file = os.path.join(tmp, "accounts.txt")
+            write_accounts(accounts, accounts_file)
+            scripts = generate_scripts(accounts, args.sessions, args.seed)
+
+        latencies: dict[str, list[float]] = {}
+        with timed_methods(latencies):
+            wall_time = run_scripts(scripts, accounts_file, tmp, args.shared)
+
+    commands = sum(len(latencies[name]) for name in HANDLER_METHODS)
+    print(f"Sessions:    {len(scripts)} in {wall_time:.3f} s")
+    print(
+        f"Throughput:  {len(scripts) / wall_time:.1f} sessions/s, "
+        f"{commands / wall_time:.1f} transaction commands/s"
+    )
+    print()
+    print(
+        f"{'Method':<20} {'Calls':>7} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'max us':>9}"
+    )
+    for name, calls in latencies.items():
+        if not calls:
+            continue
+        calls.sort()
+        print(
+            f"{name:<20} {len(calls):>7} "
+            + " ".join(
+                f"{percentile(calls, fraction) * 1e6:>9.1f}"
+                for fraction in (0.5, 0.9, 0.99)
+            )
+            + f" {calls[-1] * 1e6:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+This module benchmarks frontend startup: the time from launching a fresh interpreter running
+`main.py` until the first `> ` prompt is printed. Scripted terminals start the frontend many times
+a day, so this is the latency every one of them pays before it can send its first command.
+
+An empty interpreter (`python -c pass`, timed until it exits) is measured as well, to show how much
+of the startup time is the interpreter itself.
+
+To run this module, run `python bench_startup.py [--runs 50] [accounts_file]`.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+FRONTEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def time_until_prompt(accounts_file: str, transaction_output_file: str) -> float:
+    """Start the frontend and return the seconds until its first prompt appears."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(FRONTEND_DIR, "main.py"),
+            accounts_file,
+            transaction_output_file,
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+
+    # input() flushes the prompt before it waits, so the prompt arrives even through a pipe
+    output = b""
+    while not output.endswith(b"> "):
+        chunk = process.stdout.read1(64)
+        if not chunk:
+            raise RuntimeError(f"The frontend exited before prompting: {output!r}")
+        output += chunk
+    elapsed = time.perf_counter() - start
+
+    process.communicate()
+    return elapsed
+
+
+def time_empty_interpreter() -> float:
+    """Return the seconds an interpreter takes to start and exit without doing anything."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - start
+
+
+def report(label: str, timings: list[float]):
+    """Print summary statistics for a list of timings."""
+    print(
+        f"{label:<22} min {min(timings) * 1000:7.2f} ms   "
+        f"median {statistics.median(timings) * 1000:7.2f} ms   "
+        f"mean {statistics.mean(timings) * 1000:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the time from interpreter start to the frontend's first prompt."
+    )
+    parser.add_argument(
+        "accounts_file",
+        nargs="?",
+        default=os.path.join(FRONTEND_DIR, "accounts.txt"),
+        help="Accounts file to start the frontend with (default: accounts.txt)",
+    )
+    parser.add_argument(
+        "--runs", type=int, default=50, help="Number of starts to time (default: 50)"
+    )
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        transaction_output_file = os.path.join(output_dir, "startup.atf")
+
+        # Warm up the file system cache so the first run is not an outlier
+        time_until_prompt(args.accounts_file, transaction_output_file)
+
+        frontend = [
+            time_until_prompt(args.accounts_file, transaction_output_file)
+            for _ in range(args.runs)
+        ]
+
+    interpreter = [time_empty_interpreter() for _ in range(args.runs)]
+
+    print(f"{args.runs} runs with {sys.executable}")
+    report("Empty interpreter", interpreter)
+    report("Frontend first prompt", frontend)
+
+
+if __name__ == "__main__":
+    main()
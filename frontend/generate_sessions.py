@@ -0,0 +1,255 @@
+"""
+This module generates realistic session scripts for load testing the frontend. It writes an
+accounts file of generated account holders, and session scripts against those accounts: a mix of
+standard and admin sessions that use every command in `main.py`, with mostly valid input and a
+share of the mistakes tellers make (wrong accounts, amounts over the session limits, amounts that
+are negative or overdraw the account, unknown companies and commands, and numbers mistyped as text).
+
+The scripts are plain stdin input like the scenarios in `inputs/`, so they can be replayed with
+`main.py`, `load_test.py`, or `bench_sessions.py`.
+
+To run this module, run `python generate_sessions.py OUTPUT_DIR [--accounts 10000] [--sessions 1000] [--seed 3060]`.
+It writes `OUTPUT_DIR/accounts.txt` and `OUTPUT_DIR/sessions/session-NNNNN.txt`.
+"""
+
+import argparse
+import os
+import random
+
+from account import Account, write_accounts
+
+# Account holder names are made of one of each
+FIRST_NAMES = (
+    "Aedin Alice Aranno Bob Carol Dave Erin Frank Grace Heidi Ifeanyi Ivan Jhaden Judy Mallory "
+    "Niaj Olivia Peggy Rupert Sybil Trent Victor Walter Yusuf"
+).split()
+LAST_NAMES = (
+    "Adeyemi Brown Chen Dubois Evans Garcia Ivanova Kim Lopez Moreau Nakamura Okafor Patel Rossi "
+    "Singh Tremblay"
+).split()
+
+COMPANIES = ["EC", "CQ", "FI"]
+
+# How often each command is chosen in standard and admin sessions
+STANDARD_COMMANDS = {
+    "withdrawal": 30,
+    "deposit": 25,
+    "paybill": 20,
+    "transfer": 15,
+    # Admin commands in a standard session are refused, but tellers still try them
+    "create": 2,
+    "delete": 1,
+    "disable": 1,
+    "changeplan": 1,
+}
+ADMIN_COMMANDS = {
+    "withdrawal": 10,
+    "deposit": 10,
+    "paybill": 8,
+    "transfer": 8,
+    "create": 12,
+    "delete": 6,
+    "disable": 6,
+    "changeplan": 6,
+}
+
+# Share of sessions that are admin sessions, share of commands given invalid input, and share of
+# unknown commands
+ADMIN_SESSION_RATE = 0.15
+INVALID_INPUT_RATE = 0.2
+UNKNOWN_COMMAND_RATE = 0.02
+
+
+def generate_accounts(count: int, rng: random.Random) -> dict[int, Account]:
+    """Generate `count` accounts, with most holders owning more than one account."""
+    holders = [f"{first} {last}"[:20] for first in FIRST_NAMES for last in LAST_NAMES]
+    holders = rng.sample(holders, min(len(holders), max(1, count // 3)))
+
+    # Leave room above the highest account number for the accounts created by admin sessions
+    account_numbers = sorted(rng.sample(range(10001, 90000), count))
+
+    accounts = {}
+    for account_number in account_numbers:
+        accounts[account_number] = Account(
+            rng.choice(holders),
+            account_number,
+            round(rng.uniform(0, 5000), 2),
+            is_active=rng.random() > 0.05,
+        )
+    return accounts
+
+
+class SessionScriptGenerator:
+    """Generates session scripts (the lines typed into the frontend) against a set of accounts."""
+
+    def __init__(self, accounts: dict[int, Account], rng: random.Random):
+        """Create a generator for sessions against the given accounts."""
+        self.rng = rng
+        self.accounts = list(accounts.values())
+        self.account_numbers_by_holder: dict[str, list[int]] = {}
+        for account in self.accounts:
+            self.account_numbers_by_holder.setdefault(
+                account.account_holder_name, []
+            ).append(account.account_number)
+        self.holders = list(self.account_numbers_by_holder)
+
+    def session(self, max_commands: int = 12) -> list[str]:
+        """Generate one session script, from login to logout, as a list of lines."""
+        rng = self.rng
+        kind = "admin" if rng.random() < ADMIN_SESSION_RATE else "standard"
+        holder = None if kind == "admin" else rng.choice(self.holders)
+
+        lines = ["login", kind]
+        if holder is not None:
+            lines.append(holder)
+
+        weights = STANDARD_COMMANDS if kind == "standard" else ADMIN_COMMANDS
+        for _ in range(rng.randint(1, max_commands)):
+            if rng.random() < UNKNOWN_COMMAND_RATE:
+                lines.append(rng.choice(["balance", "help", "withdraw"]))
+                continue
+
+            command = rng.choices(list(weights), list(weights.values()))[0]
+            lines.append(command)
+            invalid = rng.random() < INVALID_INPUT_RATE
+            lines += getattr(self, f"_{command}")(kind, holder, invalid)
+
+        lines.append("logout")
+        return lines
+
+    def _account(self, holder: str | None, invalid: bool) -> tuple[str, int]:
+        """Pick an account to use: one of the holder's own, or someone else's or a missing one."""
+        rng = self.rng
+        if invalid and rng.random() < 0.5:
+            missing = rng.randint(90000, 99999)
+            someone_elses = rng.choice(self.accounts).account_number
+            return "", rng.choice([missing, someone_elses])
+
+        if holder is None:
+            account = rng.choice(self.accounts)
+            return account.account_holder_name, account.account_number
+        return holder, rng.choice(self.account_numbers_by_holder[holder])
+
+    def _number(self, number: int) -> list[str]:
+        """The lines typing an account number, sometimes mistyped as text first."""
+        if self.rng.random() < 0.05:
+            return [f"{number}x", str(number)]
+        return [str(number)]
+
+    def _amount(self, limit: float, invalid: bool) -> str:
+        """An amount within `limit`, or a negative, zero, or oversized one if `invalid`."""
+        rng = self.rng
+        if invalid:
+            return rng.choice(["-20", "0", f"{limit * rng.uniform(1.1, 3):.2f}"])
+        return f"{rng.uniform(1, limit / 4):.2f}"
+
+    def _holder_lines(self, kind: str, name: str) -> list[str]:
+        """Admin sessions are asked for the account holder's name, standard sessions are not."""
+        return [name or "Nobody"] if kind == "admin" else []
+
+    def _withdrawal(self, kind, holder, invalid):
+        name, number = self._account(holder, invalid)
+        return (
+            self._holder_lines(kind, name)
+            + self._number(number)
+            + [self._amount(500, invalid)]
+        )
+
+    def _deposit(self, kind, holder, invalid):
+        name, number = self._account(holder, invalid)
+        return (
+            self._holder_lines(kind, name)
+            + self._number(number)
+            + [self._amount(2000, invalid)]
+        )
+
+    def _paybill(self, kind, holder, invalid):
+        name, number = self._account(holder, invalid)
+        lines = self._holder_lines(kind, name) + self._number(number)
+
+        # An unknown company ends the command before the amount is asked for
+        if invalid and self.rng.random() < 0.3:
+            return lines + ["XY"]
+        return lines + [self.rng.choice(COMPANIES), self._amount(2000, invalid)]
+
+    def _transfer(self, kind, holder, invalid):
+        name, number = self._account(holder, invalid)
+        to_number = self.rng.choice(self.accounts).account_number
+        return (
+            self._holder_lines(kind, name)
+            + self._number(number)
+            + self._number(to_number)
+            + [self._amount(1000, invalid)]
+        )
+
+    def _create(self, kind, holder, invalid):
+        # A standard session is refused before any prompt
+        if kind != "admin":
+            return []
+        rng = self.rng
+        name = rng.choice(self.holders)
+        if invalid:
+            return rng.choice(
+                [[name + " Longer-Than-Twenty", "100"], [name, "100000.00"]]
+            )
+        return [name, f"{rng.uniform(0, 5000):.2f}"]
+
+    def _admin_account_command(self, kind, invalid):
+        """The lines of a delete, disable, or changeplan command (admin only)."""
+        if kind != "admin":
+            return []
+        name, number = self._account(None, invalid)
+        if invalid and name:
+            name = self.rng.choice(self.holders)
+        return [name or self.rng.choice(self.holders)] + self._number(number)
+
+    def _delete(self, kind, holder, invalid):
+        return self._admin_account_command(kind, invalid)
+
+    def _disable(self, kind, holder, invalid):
+        return self._admin_account_command(kind, invalid)
+
+    def _changeplan(self, kind, holder, invalid):
+        return self._admin_account_command(kind, invalid)
+
+
+def generate_scripts(
+    accounts: dict[int, Account], sessions: int, seed: int
+) -> list[str]:
+    """Generate `sessions` session scripts against the accounts, as text ready for stdin."""
+    generator = SessionScriptGenerator(accounts, random.Random(seed))
+    return ["\n".join(generator.session()) + "\n" for _ in range(sessions)]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate an accounts file and realistic session scripts for load testing."
+    )
+    parser.add_argument(
+        "output_dir", help="Directory to write the accounts file and scripts to"
+    )
+    parser.add_argument(
+        "--accounts", type=int, default=10000, help="Number of accounts to generate"
+    )
+    parser.add_argument(
+        "--sessions", type=int, default=1000, help="Number of session scripts to generate"
+    )
+    parser.add_argument("--seed", type=int, default=3060, help="Random seed")
+    args = parser.parse_args()
+
+    accounts = generate_accounts(args.accounts, random.Random(args.seed))
+    sessions_dir = os.path.join(args.output_dir, "sessions")
+    os.makedirs(sessions_dir, exist_ok=True)
+    write_accounts(accounts, os.path.join(args.output_dir, "accounts.txt"))
+
+    for i, script in enumerate(generate_scripts(accounts, args.sessions, args.seed)):
+        with open(os.path.join(sessions_dir, f"session-{i:05}.txt"), "w") as f:
+            f.write(script)
+
+    print(
+        f"Wrote {len(accounts)} accounts and {args.sessions} session scripts to {args.output_dir}"
+    )
+
+
+if __name__ == "__main__":
+    main()
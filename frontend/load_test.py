@@ -0,0 +1,125 @@
+"""
+This module is a load-test client for `server.py`. It replays scripted sessions (by default the
+scenarios in `inputs/`) over many parallel connections and reports session latency and throughput.
+
+To run this module, start the server and run `python load_test.py --port 8765 --sessions 500 --concurrency 50`.
+"""
+
+import argparse
+import asyncio
+import glob
+import itertools
+import os
+import statistics
+import sys
+import time
+
+
+async def run_script(
+    script: bytes, host: str, port: int | None, unix_path: str | None
+) -> float:
+    """Send one session script over a new connection, read the whole transcript, and return the elapsed time."""
+    start = time.perf_counter()
+
+    if unix_path is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+
+    writer.write(script)
+    await writer.drain()
+    # Closing our side is the end of input, just like EOF on stdin
+    writer.write_eof()
+
+    await reader.read()
+    writer.close()
+    await writer.wait_closed()
+
+    return time.perf_counter() - start
+
+
+async def run_load(
+    scripts: list[bytes],
+    sessions: int,
+    concurrency: int,
+    host: str,
+    port: int | None,
+    unix_path: str | None,
+) -> tuple[list[float], int, float]:
+    """Run `sessions` scripted sessions with at most `concurrency` in flight and return the latencies, failures, and wall time."""
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def run_one(script: bytes) -> float | None:
+        nonlocal failures
+        async with semaphore:
+            try:
+                return await run_script(script, host, port, unix_path)
+            except OSError as e:
+                failures += 1
+                print(f"Session failed: {e}", file=sys.stderr)
+                return None
+
+    start = time.perf_counter()
+    session_scripts = itertools.islice(itertools.cycle(scripts), sessions)
+    results = await asyncio.gather(*(run_one(script) for script in session_scripts))
+    wall_time = time.perf_counter() - start
+
+    return [latency for latency in results if latency is not None], failures, wall_time
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drive many concurrent scripted sessions against the frontend server."
+    )
+    address = parser.add_mutually_exclusive_group(required=True)
+    address.add_argument("--port", type=int, help="TCP port of the server")
+    address.add_argument("--unix", help="Unix socket path of the server")
+    parser.add_argument("--host", default="127.0.0.1", help="Server address for TCP")
+    parser.add_argument(
+        "--sessions", type=int, default=100, help="Total number of sessions to run"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="Number of sessions run in parallel"
+    )
+    parser.add_argument(
+        "scripts",
+        nargs="*",
+        help="Session scripts to replay (default: inputs/*.txt next to this file)",
+    )
+
+    args = parser.parse_args()
+
+    inputs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "inputs")
+    paths = args.scripts or sorted(glob.glob(os.path.join(inputs_dir, "*.txt")))
+    if not paths:
+        print("No session scripts found.")
+        sys.exit(1)
+
+    scripts = []
+    for path in paths:
+        with open(path, "rb") as f:
+            script = f.read()
+        scripts.append(script if script.endswith(b"\n") else script + b"\n")
+
+    latencies, failures, wall_time = asyncio.run(
+        run_load(
+            scripts, args.sessions, args.concurrency, args.host, args.port, args.unix
+        )
+    )
+
+    print(f"Sessions:    {len(latencies)} completed, {failures} failed")
+    print(f"Wall time:   {wall_time:.3f} s")
+    print(f"Throughput:  {len(latencies) / wall_time:.1f} sessions/s")
+    if latencies:
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(
+            f"Latency:     mean {statistics.mean(latencies) * 1000:.2f} ms, "
+            f"median {statistics.median(latencies) * 1000:.2f} ms, "
+            f"p95 {p95 * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,29 +7,100 @@ description.
 
 To run this module, run `python main.py accounts.txt transactions.txt` in the terminal.
 You can then enter commands to perform transactions.
+
+Pass `--journal SECONDS` before the file names to append each accepted transaction to the
+transactions file as it happens, flushing and fsyncing the file at most every SECONDS seconds.
+Pass `--shared-accounts TABLE` to use an accounts table published by `shared_accounts.py` instead
+of parsing the accounts file, and `--format binary` to write the packed binary transaction log
+instead of the text transactions file. Pass `--session-ids` to write a unique ID on each session's
+end of session line, so the backend can skip the session if the file is uploaded twice.
 """
 
+import os
 import sys
-from pathlib import Path
-from session import Session
-from transaction import TransactionHandler
+
+# Only `sys` and `os` (which the interpreter has already loaded) are imported up front, so that
+# printing the banner costs as little as possible. The session and transaction modules are
+# imported at the first login, and the names below are only needed for type checking.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from session import Session
+    from transaction import TransactionHandler
+
+
+def _non_negative_float(text: str) -> float:
+    """Helper function to convert a command line option value to a non-negative float."""
+    value = float(text)
+    if value < 0:
+        raise ValueError(f"Expected a non-negative number, got {text}")
+    return value
+
+
+def _transaction_format(text: str) -> str:
+    """Helper function to validate the transaction file format option."""
+    if text not in ("text", "binary"):
+        raise ValueError(f"Expected 'text' or 'binary', got {text}")
+    return text
+
+
+# Command line options accepted before the file arguments, mapped to their value converters
+OPTIONS = {
+    "--journal": _non_negative_float,
+    "--shared-accounts": str,
+    "--format": _transaction_format,
+}
+
+# Command line flags accepted before the file arguments, which take no value
+FLAGS = {"--session-ids"}
 
 
 def main():
     """Handle user input and perform transactions."""
 
     # Frontend must accept filenames as command line arguments, but since the backend has not been implemented yet, we will ignore the accounts file argument and write to accounts.txt directly in the logout handler. This is just for testing purposes to show changes to accounts.txt and make the program easier to test.
-    if len(sys.argv) != 3:
-        print("Usage: python main.py <accounts_file> <transaction_output_file>")
+    try:
+        (accounts_file, transaction_output_file), options = parse_args(sys.argv[1:])
+    except ValueError:
+        print(
+            "Usage: python main.py [--journal SECONDS] [--shared-accounts TABLE] [--format text|binary] [--session-ids] <accounts_file> <transaction_output_file>"
+        )
         sys.exit(1)
 
-    accounts_file = sys.argv[1]
-    transaction_output_file = sys.argv[2]
-
-    if not Path(accounts_file).is_file():
+    if not os.path.isfile(accounts_file):
         print(f"Accounts file '{accounts_file}' does not exist.")
         sys.exit(1)
 
+    # Sessions read from the published table instead of parsing the accounts file themselves
+    shared_accounts = None
+    if options["--shared-accounts"] is not None:
+        from shared_accounts import attach_accounts
+
+        shared_accounts = attach_accounts(options["--shared-accounts"])
+
+    run_session_loop(
+        accounts_file,
+        lambda: transaction_output_file,
+        journal_interval=options["--journal"],
+        shared_accounts=shared_accounts,
+        transaction_format=options["--format"] or "text",
+        session_ids=options["--session-ids"],
+    )
+
+
+def run_session_loop(
+    accounts_file: str,
+    next_transaction_output_file: "Callable[[], str]",
+    **session_options,
+):
+    """
+    Read commands from standard input and handle them until the input ends.
+
+    `next_transaction_output_file` is called at each login to choose where that session's
+    transactions are written. Any other keyword arguments (such as `journal_interval`,
+    `shared_accounts`, `transaction_format`, or `session_ids`) are passed on to every `Session`.
+    """
     session = None
 
     print("Banking System")
@@ -52,11 +123,11 @@ def main():
             print("You are already logged in. Please log out before logging in again.")
             continue
 
-        transaction_handler = TransactionHandler(session)
-
         # Handle login and logout separately since they don't produce transactions
         if command == "login":
-            session = handle_login(accounts_file, transaction_output_file)
+            session, transaction_handler = handle_login(
+                accounts_file, next_transaction_output_file(), **session_options
+            )
             continue
         elif command == "logout":
             session = handle_logout(session)
@@ -84,11 +155,37 @@ def main():
             print("Invalid command.")
 
         if transaction is not None:
-            session.transactions.append(transaction)
+            session.record_transaction(transaction)
+
 
+def parse_args(argv: list[str]) -> tuple[list[str], dict]:
+    """Split the command line into the two file arguments and the `--option value` and `--flag` settings."""
+    options = {option: None for option in OPTIONS}
+    options.update({flag: False for flag in FLAGS})
+    positional = []
 
-def handle_login(accounts_file: str, transaction_output_file: str) -> Session:
-    """Prompt the user for input to log in and create a new session."""
+    args = iter(argv)
+    for arg in args:
+        if arg in FLAGS:
+            options[arg] = True
+        elif arg in OPTIONS:
+            options[arg] = OPTIONS[arg](next(args, ""))
+        else:
+            positional.append(arg)
+
+    if len(positional) != 2:
+        raise ValueError("Expected an accounts file and a transaction output file.")
+
+    return positional, options
+
+
+def handle_login(
+    accounts_file: str, transaction_output_file: str, **session_options
+) -> tuple["Session", "TransactionHandler"]:
+    """
+    Prompt the user for input to log in, and return the new session with the transaction handler
+    that handles its transactions.
+    """
     # Get the session kind from the user
     while True:
         kind = get_text("Enter session kind (admin/standard): ")
@@ -104,18 +201,29 @@ def handle_login(accounts_file: str, transaction_output_file: str) -> Session:
         account_holder_name = get_text("Enter account holder name: ")
 
     # Create a new session
-    session = Session(kind, account_holder_name, accounts_file, transaction_output_file)
+    from session import Session
+    from transaction import TransactionHandler
+
+    session = Session(
+        kind,
+        account_holder_name,
+        accounts_file,
+        transaction_output_file,
+        **session_options,
+    )
 
-    return session
+    return session, TransactionHandler(session)
 
 
-def handle_logout(session: Session):
+def handle_logout(session: "Session"):
     """Log out of the current session and write the transactions to the file."""
     session.write_transactions()
     return None
 
 
-def handle_withdrawal(session: Session, transaction_handler: TransactionHandler):
+def handle_withdrawal(
+    session: "Session", transaction_handler: "TransactionHandler"
+):
     """Withdraw money from an account."""
 
     # Ask for the account holder's name, account number, and amount to withdraw
@@ -131,7 +239,9 @@ def handle_withdrawal(session: Session, transaction_handler: TransactionHandler)
     return transaction_handler.withdrawal(account_holder_name, account_number, amount)
 
 
-def handle_transfer(session: Session, transaction_handler: TransactionHandler):
+def handle_transfer(
+    session: "Session", transaction_handler: "TransactionHandler"
+):
     """Transfer money from one account to another."""
 
     # Ask for the account holder's name (if logged in as admin)
@@ -154,7 +264,9 @@ def handle_transfer(session: Session, transaction_handler: TransactionHandler):
     )
 
 
-def handle_paybill(session: Session, transaction_handler: TransactionHandler):
+def handle_paybill(
+    session: "Session", transaction_handler: "TransactionHandler"
+):
     """Pay a bill with money from an account."""
 
     # Ask for the account holder's name (if logged in as admin)
@@ -180,7 +292,9 @@ def handle_paybill(session: Session, transaction_handler: TransactionHandler):
     )
 
 
-def handle_deposit(session: Session, transaction_handler: TransactionHandler):
+def handle_deposit(
+    session: "Session", transaction_handler: "TransactionHandler"
+):
     """Deposit money into an account."""
 
     # Ask for the account holder's name (if logged in as admin)
@@ -198,7 +312,9 @@ def handle_deposit(session: Session, transaction_handler: TransactionHandler):
     return transaction_handler.deposit(account_holder_name, account_number, amount)
 
 
-def handle_create(session: Session, transaction_handler: TransactionHandler):
+def handle_create(
+    session: "Session", transaction_handler: "TransactionHandler"
+):
     """Create a new account."""
 
     # Ensure only admins can create this transaction
@@ -215,7 +331,9 @@ def handle_create(session: Session, transaction_handler: TransactionHandler):
     return transaction_handler.create(account_holder_name, initial_balance)
 
 
-def handle_delete(session: Session, transaction_handler: TransactionHandler):
+def handle_delete(
+    session: "Session", transaction_handler: "TransactionHandler"
+):
     """Delete an account."""
 
     # Ensure only admins can create this transaction
@@ -232,7 +350,9 @@ def handle_delete(session: Session, transaction_handler: TransactionHandler):
     return transaction_handler.delete(account_holder_name, account_number)
 
 
-def handle_disable(session: Session, transaction_handler: TransactionHandler):
+def handle_disable(
+    session: "Session", transaction_handler: "TransactionHandler"
+):
     """Disable an account."""
 
     # Ensure only admins can create this transaction
@@ -249,7 +369,9 @@ def handle_disable(session: Session, transaction_handler: TransactionHandler):
     return transaction_handler.disable(account_holder_name, account_number)
 
 
-def handle_changeplan(session: Session, transaction_handler: TransactionHandler):
+def handle_changeplan(
+    session: "Session", transaction_handler: "TransactionHandler"
+):
     """Change the payment plan of an account."""
 
     # Ensure only admins can create this transaction
@@ -288,13 +410,20 @@ def get_int(prompt: str) -> int:
 
 def get_float(prompt: str) -> float:
     """Helper function to get a valid float input from the user."""
+    # Imported here rather than up front, so it is not loaded before the first amount is read
+    import math
+
     while True:
         text = input(prompt).strip()
         _print_newline_if_not_tty()
         try:
-            return float(text)
+            value = float(text)
         except ValueError:
-            print("Please enter a valid number.")
+            value = math.nan
+        # Infinity and NaN parse as floats but are not amounts
+        if math.isfinite(value):
+            return value
+        print("Please enter a valid number.")
 
 
 def _print_newline_if_not_tty():
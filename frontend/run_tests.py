@@ -0,0 +1,200 @@
+"""
+This module runs the frontend regression scenarios. Every `inputs/<name>.txt` script is fed to the
+frontend on standard input, and the transaction file and terminal output it produces are compared
+with `expected/<name>.etf` and `expected/<name>.out`.
+
+Scenarios run in parallel worker processes, each one in-process with its standard input and output
+held in memory. Results are cached by a hash of the scenario's files and the frontend source (with
+the common/ modules it imports), so scenarios are only rerun when something they depend on has
+changed.
+
+To run this module, run `python run_tests.py` from the frontend directory (or `python frontend/run_tests.py`
+from the repository root). Pass `--no-cache` to rerun everything, `--jobs N` to set the number of
+worker processes, or scenario names to run only those scenarios.
+"""
+
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+FRONTEND_DIR = os.path.dirname(os.path.abspath(__file__))
+INPUTS_DIR = os.path.join(FRONTEND_DIR, "inputs")
+EXPECTED_DIR = os.path.join(FRONTEND_DIR, "expected")
+OUTPUTS_DIR = os.path.join(FRONTEND_DIR, "outputs")
+ACCOUNTS_FILE = os.path.join(FRONTEND_DIR, "accounts.txt")
+COMMON_DIR = os.path.join(FRONTEND_DIR, os.pardir, "common")
+CACHE_FILE = os.path.join(OUTPUTS_DIR, ".test_cache.json")
+
+
+def read_text(path: str) -> str | None:
+    """Read a file with normalized line endings, or return None if it does not exist."""
+    try:
+        with open(path, "r", newline="") as f:
+            return f.read().replace("\r\n", "\n")
+    except FileNotFoundError:
+        return None
+
+
+def source_digest() -> str:
+    """Hash the frontend source code and the common/ modules it uses, so that any code change invalidates every cached result."""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(FRONTEND_DIR, "*.py"))) + sorted(
+        glob.glob(os.path.join(COMMON_DIR, "*.py"))
+    ):
+        digest.update(os.path.relpath(path, FRONTEND_DIR).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def scenario_key(name: str, source: str) -> str:
+    """Hash everything a scenario's result depends on: its input, expectations, accounts file, and the source."""
+    digest = hashlib.sha256(source.encode())
+    for path in (
+        os.path.join(INPUTS_DIR, f"{name}.txt"),
+        os.path.join(EXPECTED_DIR, f"{name}.etf"),
+        os.path.join(EXPECTED_DIR, f"{name}.out"),
+        ACCOUNTS_FILE,
+    ):
+        digest.update(b"\0")
+        digest.update((read_text(path) or "").encode())
+    return digest.hexdigest()
+
+
+def run_scenario(name: str) -> dict:
+    """Run one scenario through the frontend in this process and compare its outputs with the expected files."""
+    import main as frontend
+
+    atf_path = os.path.join(OUTPUTS_DIR, f"{name}.atf")
+    if os.path.exists(atf_path):
+        os.remove(atf_path)
+
+    stdin, stdout, argv = sys.stdin, sys.stdout, sys.argv
+    sys.stdin = io.StringIO(read_text(os.path.join(INPUTS_DIR, f"{name}.txt")))
+    sys.stdout = io.StringIO()
+    sys.argv = ["main.py", ACCOUNTS_FILE, atf_path]
+
+    start = time.perf_counter()
+    try:
+        frontend.main()
+    except SystemExit:
+        pass
+    finally:
+        elapsed = time.perf_counter() - start
+        output = sys.stdout.getvalue()
+        sys.stdin, sys.stdout, sys.argv = stdin, stdout, argv
+
+    # Keep the outputs on disk so failures can be inspected and diffed by hand
+    with open(os.path.join(OUTPUTS_DIR, f"{name}.out"), "w") as f:
+        f.write(output)
+
+    expected_transactions = read_text(os.path.join(EXPECTED_DIR, f"{name}.etf"))
+    expected_output = read_text(os.path.join(EXPECTED_DIR, f"{name}.out"))
+
+    return {
+        "transactions_match": expected_transactions is not None
+        and read_text(atf_path) == expected_transactions,
+        "output_matches": expected_output is not None and output == expected_output,
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the frontend regression scenarios in parallel and check them against the expected outputs."
+    )
+    parser.add_argument(
+        "scenarios",
+        nargs="*",
+        help="Names of the scenarios to run (default: every inputs/*.txt)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Rerun every scenario even if its cached result is still valid",
+    )
+
+    args = parser.parse_args()
+
+    names = args.scenarios or sorted(
+        os.path.basename(path)[: -len(".txt")]
+        for path in glob.glob(os.path.join(INPUTS_DIR, "*.txt"))
+    )
+    missing = [
+        name
+        for name in names
+        if not os.path.isfile(os.path.join(INPUTS_DIR, f"{name}.txt"))
+    ]
+    if missing:
+        print(f"Unknown scenarios: {', '.join(missing)}")
+        sys.exit(1)
+
+    os.makedirs(OUTPUTS_DIR, exist_ok=True)
+
+    try:
+        with open(CACHE_FILE, "r") as f:
+            cache = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        cache = {}
+
+    source = source_digest()
+    keys = {name: scenario_key(name, source) for name in names}
+
+    results = {}
+    to_run = []
+    for name in names:
+        cached = cache.get(name)
+        if not args.no_cache and cached is not None and cached["key"] == keys[name]:
+            results[name] = dict(cached["result"], cached=True)
+        else:
+            to_run.append(name)
+
+    start = time.perf_counter()
+    if to_run:
+        with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+            for name, result in zip(to_run, executor.map(run_scenario, to_run)):
+                results[name] = dict(result, cached=False)
+                cache[name] = {"key": keys[name], "result": result}
+    elapsed = time.perf_counter() - start
+
+    with open(CACHE_FILE, "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+    failed = 0
+    for name in names:
+        result = results[name]
+        passed = result["transactions_match"] and result["output_matches"]
+        failed += not passed
+
+        timing = "cached" if result["cached"] else f"{result['seconds'] * 1000:.1f} ms"
+        print(f"[{'PASS' if passed else 'FAIL'}] {name} ({timing})")
+        if not result["transactions_match"]:
+            print("  Transactions differ!")
+        if not result["output_matches"]:
+            print("  Terminal output differs!")
+
+    cached = sum(result["cached"] for result in results.values())
+    print("--------------------")
+    print(
+        f"{len(names) - failed}/{len(names)} scenarios passed "
+        f"({cached} cached, {len(to_run)} run in {elapsed:.2f} s)"
+    )
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
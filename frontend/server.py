@@ -0,0 +1,268 @@
+"""
+This module serves many frontend sessions at once. It listens on a local TCP or Unix socket and
+gives every client connection its own terminal: the same prompts and commands as `main.py`, with
+its own `Session` and `TransactionHandler`. All sessions share one read-only snapshot of the
+accounts file, and every session writes its transactions to a uniquely named file in the output
+directory.
+
+To run this module, run `python server.py accounts.txt outputs --port 8765` (or pass
+`--unix /tmp/banking.sock` instead of `--port`). Use `load_test.py` to drive it with many clients.
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import main as frontend
+from account import read_accounts
+from shared_accounts import attach_accounts
+
+
+class ThreadLocalStream:
+    """
+    Stands in for `sys.stdin` or `sys.stdout` and forwards to the stream bound to the current thread.
+
+    The frontend reads commands with `input()` and reports results with `print()`, so each client
+    thread binds its socket streams here and the existing handlers talk to the right client.
+    """
+
+    def __init__(self, default):
+        """Create a stream that falls back to `default` on threads without a bound stream."""
+        self.default = default
+        self.local = threading.local()
+
+    def bind(self, stream):
+        """Bind a stream to the current thread (or unbind it with None)."""
+        self.local.stream = stream
+
+    def __getattr__(self, name):
+        return getattr(getattr(self.local, "stream", None) or self.default, name)
+
+
+class ClientInput:
+    """A readable text stream that pulls lines from an asyncio `StreamReader` on the event loop."""
+
+    def __init__(self, reader: asyncio.StreamReader, loop: asyncio.AbstractEventLoop):
+        """Create an input stream for the given client reader."""
+        self.reader = reader
+        self.loop = loop
+
+    def readline(self, size: int = -1) -> str:
+        """Block the calling thread until the client sends a line (or "" once it disconnects)."""
+        try:
+            line = asyncio.run_coroutine_threadsafe(
+                self.reader.readline(), self.loop
+            ).result()
+        except (ConnectionError, CancelledError, RuntimeError):
+            # A dropped connection or a server shutting down ends the input like EOF
+            return ""
+        return line.decode(errors="replace")
+
+    def isatty(self) -> bool:
+        return False
+
+
+class ClientOutput:
+    """A writable text stream that hands its writes to an asyncio `StreamWriter` on the event loop."""
+
+    def __init__(self, writer: asyncio.StreamWriter, loop: asyncio.AbstractEventLoop):
+        """Create an output stream for the given client writer."""
+        self.writer = writer
+        self.loop = loop
+
+    def write(self, text: str) -> int:
+        """Queue the text to be sent to the client."""
+        try:
+            self.loop.call_soon_threadsafe(self._write, text.encode())
+        except RuntimeError:
+            # The event loop has already closed, so there is nobody left to send to
+            pass
+        return len(text)
+
+    def _write(self, data: bytes):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+class SessionServer:
+    """Accepts client connections and runs a frontend terminal for each one on a worker thread."""
+
+    def __init__(
+        self,
+        accounts_file: str,
+        output_dir: str,
+        max_clients: int = 64,
+        journal_interval: float | None = None,
+        shared_accounts_table: str | None = None,
+        transaction_format: str = "text",
+        session_ids: bool = False,
+    ):
+        """Load the shared accounts snapshot and prepare the worker threads for the clients."""
+        self.accounts_file = accounts_file
+        self.output_dir = output_dir
+        self.journal_interval = journal_interval
+        self.transaction_format = transaction_format
+        self.session_ids = session_ids
+
+        # Every session reads from this snapshot through its own copy-on-write overlay
+        if shared_accounts_table is not None:
+            self.shared_accounts = attach_accounts(shared_accounts_table)
+        else:
+            self.shared_accounts = read_accounts(accounts_file)
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_clients, thread_name_prefix="session"
+        )
+        self.session_numbers = itertools.count(1)
+        self.run_prefix = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+        self.stdin = ThreadLocalStream(sys.stdin)
+        self.stdout = ThreadLocalStream(sys.stdout)
+
+    def next_transaction_output_file(self) -> str:
+        """Return a transaction file name that no other session of this server uses."""
+        return os.path.join(
+            self.output_dir,
+            f"session-{self.run_prefix}-{next(self.session_numbers):06}"
+            f"{'.btx' if self.transaction_format == 'binary' else '.atf'}",
+        )
+
+    def run_terminal(self, client_input: ClientInput, client_output: ClientOutput):
+        """Run the frontend command loop for one client on the current worker thread."""
+        self.stdin.bind(client_input)
+        self.stdout.bind(client_output)
+        try:
+            frontend.run_session_loop(
+                self.accounts_file,
+                self.next_transaction_output_file,
+                journal_interval=self.journal_interval,
+                shared_accounts=self.shared_accounts,
+                transaction_format=self.transaction_format,
+                session_ids=self.session_ids,
+            )
+        finally:
+            self.stdin.bind(None)
+            self.stdout.bind(None)
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """Serve one client connection until it disconnects."""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self.executor,
+                self.run_terminal,
+                ClientInput(reader, loop),
+                ClientOutput(writer, loop),
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(
+        self,
+        host: str = "127.0.0.1",
+        port: int | None = None,
+        unix_path: str | None = None,
+    ):
+        """Listen on the given TCP port or Unix socket path until cancelled."""
+        sys.stdin, sys.stdout = self.stdin, self.stdout
+        try:
+            if unix_path is not None:
+                server = await asyncio.start_unix_server(self.handle_client, unix_path)
+            else:
+                server = await asyncio.start_server(self.handle_client, host, port)
+
+            addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+            print(f"Serving frontend sessions on {addresses}", file=sys.stderr)
+
+            async with server:
+                await server.serve_forever()
+        finally:
+            sys.stdin, sys.stdout = self.stdin.default, self.stdout.default
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Banking System Front End server: serves many concurrent sessions over a local socket."
+    )
+    parser.add_argument("accounts_file", help="Path to the current accounts file")
+    parser.add_argument(
+        "output_dir", help="Directory for the per-session transaction files"
+    )
+    address = parser.add_mutually_exclusive_group(required=True)
+    address.add_argument("--port", type=int, help="TCP port to listen on")
+    address.add_argument("--unix", help="Unix socket path to listen on")
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Address to bind for TCP (default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--max-clients",
+        type=int,
+        default=64,
+        help="Maximum number of sessions served at the same time (default: 64)",
+    )
+    parser.add_argument(
+        "--journal",
+        type=frontend._non_negative_float,
+        help="Journal each session's transactions, syncing at most every SECONDS seconds",
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--shared-accounts",
+        help="Use an accounts table published by shared_accounts.py instead of parsing the accounts file",
+        metavar="TABLE",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("text", "binary"),
+        default="text",
+        help="Format of the per-session transaction files (default: text)",
+    )
+    parser.add_argument(
+        "--session-ids",
+        action="store_true",
+        help="Write a unique session ID on each session's end of session line",
+    )
+
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.accounts_file):
+        print(f"Accounts file '{args.accounts_file}' does not exist.")
+        sys.exit(1)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    server = SessionServer(
+        args.accounts_file,
+        args.output_dir,
+        args.max_clients,
+        args.journal,
+        args.shared_accounts,
+        args.format,
+        args.session_ids,
+    )
+    asyncio.run(server.serve(args.host, args.port, args.unix))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nExiting...")
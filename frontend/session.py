@@ -1,5 +1,68 @@
-from account import Account, read_accounts
-from transaction import Transaction, TransactionCode
+import itertools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections.abc import Mapping
+
+from account import Account, AccountsOverlay, read_accounts
+from transaction import Transaction, TransactionCode, TransactionLog, amount_to_cents
+
+# The binary transaction-log format and the record layouts are shared with the backend through
+# the common/ directory
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "common")
+)
+from binary_transactions import pack_header, pack_record  # noqa: E402
+from records import END_OF_SESSION, TRANSACTION  # noqa: E402
+
+# Formats the session can write its transactions in
+TRANSACTION_FORMATS = ("text", "binary")
+
+# Buffer size used for the journal file so appends do not hit the disk one record at a time
+JOURNAL_BUFFER_SIZE = 64 * 1024
+
+# The sequence of transactions ends with an end of session transaction code
+END_OF_SESSION_LINE = END_OF_SESSION
+
+
+def end_of_session_line(session_id: str | None = None) -> str:
+    """Return the end of session line, carrying the session ID in its miscellaneous field if given."""
+    if session_id is None:
+        return END_OF_SESSION_LINE
+    return TRANSACTION.format(TransactionCode.END.value, "", 0, 0.0, session_id)
+
+
+def format_transaction(transaction: Transaction) -> str:
+    """Format a transaction as a single line of the transactions file (without the newline)."""
+    return TRANSACTION.format(
+        transaction.code.value,
+        transaction.account_holder_name,
+        transaction.account_number,
+        transaction.amount,
+        _miscellaneous_field(transaction),
+    )
+
+
+def pack_transaction(transaction: Transaction, timestamp: float) -> bytes:
+    """Pack a transaction as a record of the binary transaction log."""
+    return pack_record(
+        transaction.code.value,
+        transaction.account_holder_name,
+        transaction.account_number,
+        amount_to_cents(transaction.amount),
+        # The binary record keeps the text after the amount, including the separating space
+        " " + _miscellaneous_field(transaction),
+        timestamp,
+    )
+
+
+def _miscellaneous_field(transaction: Transaction) -> str:
+    """Helper to format the miscellaneous field of a transaction line."""
+    if transaction.miscellaneous is not None:
+        return str(transaction.miscellaneous).ljust(2)
+    return "  "
 
 
 class Session:
@@ -11,8 +74,28 @@ class Session:
         account_holder_name: str | None = None,
         accounts_file: str = "accounts.txt",
         transaction_output_file: str = "transactions.txt",
+        journal_interval: float | None = None,
+        shared_accounts: Mapping[int, Account] | None = None,
+        transaction_format: str = "text",
+        session_ids: bool = False,
     ):
-        """Create a new session with the given kind and account holder name (if applicable)."""
+        """
+        Create a new session with the given kind and account holder name (if applicable).
+
+        If `journal_interval` is given, the session journals its transactions: each accepted
+        transaction is appended to the output file as soon as it is recorded, and the buffered
+        records are flushed and fsynced at most `journal_interval` seconds apart. A timer syncs
+        them when no other transaction comes in before then.
+
+        If `shared_accounts` is given, the session works on a copy-on-write view of that
+        read-only snapshot instead of reading the accounts file.
+
+        `transaction_format` is "text" for the fixed-width transactions file or "binary" for the
+        packed binary transaction log (with a timestamp on every record).
+
+        If `session_ids` is set, the session gets a unique ID that is written on its end of
+        session line, so the backend can recognize the session if it is uploaded again.
+        """
 
         # Validate the session details
         if kind not in {"standard", "admin"}:
@@ -21,18 +104,37 @@ class Session:
             raise ValueError(
                 "An account holder name must be provided for standard sessions."
             )
+        if transaction_format not in TRANSACTION_FORMATS:
+            raise ValueError("Invalid transaction format. Must be 'text' or 'binary'.")
+        if journal_interval is not None and journal_interval < 0:
+            raise ValueError("The journal interval cannot be negative.")
 
         # Initialize the session attributes
         self.kind = kind
         self.account_holder_name = account_holder_name
         self.accounts_file = accounts_file
         self.transaction_output_file = transaction_output_file
+        self.journal_interval = journal_interval
+        self.transaction_format = transaction_format
+        self.session_id = uuid.uuid4().hex if session_ids else None
 
-        # Read in the current bank accounts file
-        self.accounts: dict[int, Account] = self.read_accounts()
+        # The accounts are loaded on first access, since many sessions never look at them
+        self.shared_accounts = shared_accounts
+        self._accounts: Mapping[int, Account] | None = None
 
-        # Initialize the transactions list for the session
-        self.transactions: list[Transaction] = []
+        # Initialize the transaction log for the session (stays empty when journaling)
+        self.transactions = TransactionLog(
+            timestamps=transaction_format == "binary"
+        )
+
+        # Open the journal up front so that every accepted transaction can be appended to it
+        self._journal = None
+        self._last_sync = time.monotonic()
+        # The timer syncs the journal from its own thread, so the lock guards every use of it
+        self._journal_lock = threading.Lock()
+        self._sync_timer: threading.Timer | None = None
+        if journal_interval is not None:
+            self._journal = self._open_transaction_output_file()
 
         # Store total amounts for each transaction type for the session
         self.transaction_totals: dict[TransactionCode, float] = {
@@ -41,30 +143,96 @@ class Session:
             TransactionCode.PAYBILL: 0.0,
         }
 
+    @property
+    def accounts(self) -> Mapping[int, Account]:
+        """The session's accounts, read from the accounts file (or the shared snapshot) the first time they are needed."""
+        if self._accounts is None:
+            if self.shared_accounts is not None:
+                self._accounts = AccountsOverlay(self.shared_accounts)
+            else:
+                self._accounts = self.read_accounts()
+        return self._accounts
+
+    def owns_account(self, account_number: int) -> bool:
+        """Check whether the account belongs to the account holder logged in to this session."""
+        return self.accounts.owned_by(account_number, self.account_holder_name)
+
     def read_accounts(self):
         """Read the accounts from the accounts.txt file and return a dictionary mapping account numbers to Account objects."""
         return read_accounts(self.accounts_file)
 
+    def record_transaction(self, transaction: Transaction):
+        """Record an accepted transaction, appending it to the journal right away if the session is journaling."""
+        if self._journal is None:
+            self.transactions.append(transaction)
+            return
+
+        with self._journal_lock:
+            self._journal.write(self._encode_transaction(transaction, time.time()))
+
+            # Group commit: records accumulate in the buffer until the interval has elapsed, or
+            # until the timer started by the oldest unsynced record fires if the teller goes idle
+            if time.monotonic() - self._last_sync >= self.journal_interval:
+                self._sync_journal()
+            elif self._sync_timer is None:
+                self._sync_timer = threading.Timer(
+                    self.journal_interval, self.sync_journal
+                )
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+
+    def sync_journal(self):
+        """Flush the buffered journal records and fsync them to disk."""
+        with self._journal_lock:
+            if self._journal is not None:
+                self._sync_journal()
+
+    def _sync_journal(self):
+        """Helper to sync the journal with the lock held, stopping any pending timer."""
+        if self._sync_timer is not None:
+            self._sync_timer.cancel()
+            self._sync_timer = None
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._last_sync = time.monotonic()
+
     def write_transactions(self):
         """Write the transactions from the session to the transactions.txt file."""
-        with open(self.transaction_output_file, "w") as f:
-            for transaction in self.transactions:
-                parts = [
-                    f"{transaction.code.value:02}",
-                    transaction.account_holder_name.ljust(20),
-                    f"{transaction.account_number:05}",
-                    f"{transaction.amount:.2f}".zfill(8),
-                ]
-
-                if transaction.miscellaneous is not None:
-                    parts.append(str(transaction.miscellaneous).ljust(2))
-                else:
-                    parts.append("  ")
-
-                line = " ".join(parts)
-                f.write(line + "\n")
-
-            # The sequence of transactions ends with an end of session transaction code
-            f.write(
-                f"{TransactionCode.END.value:02} {''.ljust(20)} {'00000'} {'00000.00'} {'  '}\n"
+        if self._journal is not None:
+            # Every transaction is already in the journal, so only the terminator is left
+            with self._journal_lock:
+                self._journal.write(self._encode_end_of_session())
+                self._sync_journal()
+                self._journal.close()
+                self._journal = None
+            return
+
+        timestamps = self.transactions.timestamps or itertools.repeat(None)
+        with self._open_transaction_output_file() as f:
+            for transaction, timestamp in zip(self.transactions, timestamps):
+                f.write(self._encode_transaction(transaction, timestamp))
+
+            f.write(self._encode_end_of_session())
+
+    def _open_transaction_output_file(self):
+        """Helper to open the transaction output file for writing in the session's format."""
+        if self.transaction_format == "binary":
+            f = open(
+                self.transaction_output_file, "wb", buffering=JOURNAL_BUFFER_SIZE
             )
+            f.write(pack_header(timestamps=True))
+            return f
+        return open(self.transaction_output_file, "w", buffering=JOURNAL_BUFFER_SIZE)
+
+    def _encode_transaction(self, transaction: Transaction, timestamp: float | None):
+        """Helper to encode a transaction in the session's format, ready to be written."""
+        if self.transaction_format == "binary":
+            return pack_transaction(transaction, timestamp)
+        return format_transaction(transaction) + "\n"
+
+    def _encode_end_of_session(self):
+        """Helper to encode the end of session transaction in the session's format."""
+        if self.transaction_format == "binary":
+            misc = "   " if self.session_id is None else f" {self.session_id}"
+            return pack_record(TransactionCode.END.value, "", 0, 0, misc, time.time())
+        return end_of_session_line(self.session_id) + "\n"
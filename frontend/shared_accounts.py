@@ -0,0 +1,161 @@
+"""
+This module shares one parsed copy of the accounts file between many frontend processes. The
+accounts are published once into a packed, fixed-width table file (ideally on a memory-backed
+filesystem such as /dev/shm), and every frontend process maps that file read-only instead of
+parsing the accounts file itself. Pages of the table are shared through the page cache, so a
+process only pays for the records it actually looks up.
+
+Sessions never write to the table: they use an `AccountsOverlay` on top of it, which keeps their
+balance changes, creates, and deletes private to the session.
+
+To publish a table, run `python shared_accounts.py accounts.txt /dev/shm/banking-accounts.tbl`, then
+start frontends with `python main.py --shared-accounts /dev/shm/banking-accounts.tbl accounts.txt transactions.txt`.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Iterator, Mapping
+
+from account import Account, read_accounts
+
+# Header: magic, format version, number of account records
+HEADER = struct.Struct("<4sHI")
+MAGIC = b"BKAT"
+VERSION = 1
+
+# Account record: account number, holder name (UTF-8, NUL padded), active flag, balance in cents.
+# The name field is wide enough for 20 characters of any script.
+RECORD = struct.Struct("<I80s?q")
+ACCOUNT_NUMBER = struct.Struct("<I")
+NAME = struct.Struct("<4x80s")
+
+
+def publish_accounts(accounts_file: str, table_file: str) -> int:
+    """Parse the accounts file and write it as a packed table sorted by account number, returning the record count."""
+    accounts = read_accounts(accounts_file)
+
+    table = bytearray(HEADER.size + RECORD.size * len(accounts))
+    HEADER.pack_into(table, 0, MAGIC, VERSION, len(accounts))
+
+    offset = HEADER.size
+    for account_number in sorted(accounts):
+        account = accounts[account_number]
+        RECORD.pack_into(
+            table,
+            offset,
+            account_number,
+            account.account_holder_name.encode(),
+            account.is_active,
+            round(account.balance * 100),
+        )
+        offset += RECORD.size
+
+    # Replace the table atomically so attached processes never see a half-written file
+    temporary_file = f"{table_file}.{os.getpid()}.tmp"
+    with open(temporary_file, "wb") as f:
+        f.write(table)
+    os.replace(temporary_file, table_file)
+
+    return len(accounts)
+
+
+def attach_accounts(table_file: str) -> "SharedAccountsTable":
+    """Map a published accounts table read-only and return it as a mapping of account numbers to accounts."""
+    with open(table_file, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return SharedAccountsTable(buffer)
+
+
+class SharedAccountsTable(Mapping):
+    """
+    A read-only mapping of account numbers to accounts backed by a packed table.
+
+    Lookups binary search the sorted records and build a fresh `Account` for the match, so
+    nothing is parsed up front and the process holds no per-account objects.
+    """
+
+    def __init__(self, buffer):
+        """Wrap a buffer holding a published accounts table."""
+        magic, version, count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a published accounts table (or an unsupported version).")
+        if len(buffer) != HEADER.size + RECORD.size * count:
+            raise ValueError("The accounts table is truncated or corrupted.")
+
+        self.buffer = buffer
+        self.count = count
+
+    def _account_number_at(self, index: int) -> int:
+        return ACCOUNT_NUMBER.unpack_from(self.buffer, HEADER.size + RECORD.size * index)[0]
+
+    def _find(self, account_number) -> int:
+        """Return the record index of the account number, or -1 if it is not in the table."""
+        if not isinstance(account_number, int):
+            return -1
+
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._account_number_at(middle) < account_number:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self.count and self._account_number_at(low) == account_number:
+            return low
+        return -1
+
+    def __getitem__(self, account_number: int) -> Account:
+        index = self._find(account_number)
+        if index < 0:
+            raise KeyError(account_number)
+
+        account_number, name, is_active, cents = RECORD.unpack_from(
+            self.buffer, HEADER.size + RECORD.size * index
+        )
+        return Account(name.rstrip(b"\0").decode(), account_number, cents / 100, is_active)
+
+    def __contains__(self, account_number) -> bool:
+        return self._find(account_number) >= 0
+
+    def owned_by(self, account_number: int, account_holder_name: str) -> bool:
+        """Check whether the account belongs to the given account holder, comparing the packed name in place."""
+        index = self._find(account_number)
+        if index < 0:
+            return False
+
+        name = NAME.unpack_from(self.buffer, HEADER.size + RECORD.size * index)[0]
+        return name.rstrip(b"\0") == account_holder_name.encode()
+
+    def __iter__(self) -> Iterator[int]:
+        for index in range(self.count):
+            yield self._account_number_at(index)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def max_account_number(self, default: int) -> int:
+        """Return the highest account number, the last of the sorted records, or `default` if there are none."""
+        if self.count == 0:
+            return default
+        return self._account_number_at(self.count - 1)
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python shared_accounts.py <accounts_file> <table_file>")
+        sys.exit(1)
+
+    accounts_file, table_file = sys.argv[1], sys.argv[2]
+    if not os.path.isfile(accounts_file):
+        print(f"Accounts file '{accounts_file}' does not exist.")
+        sys.exit(1)
+
+    count = publish_accounts(accounts_file, table_file)
+    print(f"Published {count} accounts to {table_file}")
+
+
+if __name__ == "__main__":
+    main()
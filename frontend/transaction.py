@@ -1,8 +1,13 @@
+import time
+from array import array
+from collections.abc import Iterator
 from enum import Enum
-from typing import TYPE_CHECKING
 
 from account import Account
 
+# `typing` is not imported just for this: it is the slowest import of the first login, and the
+# names below are only needed for type checking, as in main.py
+TYPE_CHECKING = False
 if TYPE_CHECKING:
     from session import Session
 
@@ -24,6 +29,14 @@ class TransactionCode(Enum):
 class Transaction:
     """Represents a transaction performed in the banking system, with a code, account holder name, account number, amount, and optional miscellaneous information."""
 
+    __slots__ = (
+        "code",
+        "account_holder_name",
+        "account_number",
+        "amount",
+        "miscellaneous",
+    )
+
     def __init__(
         self,
         code: TransactionCode,
@@ -40,6 +53,83 @@ class Transaction:
         self.miscellaneous = miscellaneous
 
 
+def amount_to_cents(amount: float) -> int:
+    """Convert an amount to whole cents using the same two-decimal rounding as the transactions file."""
+    return int(f"{amount:.2f}".replace(".", ""))
+
+
+class TransactionLog:
+    """
+    A compact, append-only log of a session's transactions.
+
+    Instead of one object per transaction, the log stores the code, account number, amount in
+    cents, holder name, and miscellaneous information as packed columns. Holder names and
+    miscellaneous values repeat a lot within a session, so they are stored once and referenced
+    by index. Iterating the log yields `Transaction` objects again.
+
+    With `timestamps=True` the log also records when each transaction was appended.
+    """
+
+    # Marks a transaction without miscellaneous information in the misc column
+    NO_MISCELLANEOUS = -1
+
+    def __init__(self, timestamps: bool = False):
+        """Create an empty transaction log."""
+        self.codes = array("B")
+        self.account_numbers = array("I")
+        self.cents = array("q")
+        self.name_ids = array("I")
+        self.miscellaneous_ids = array("i")
+        self.timestamps = array("d") if timestamps else None
+
+        # Distinct holder names and miscellaneous values, referenced by the id columns
+        self.strings: list[str] = []
+        self.string_ids: dict[str, int] = {}
+
+    def _string_id(self, text: str) -> int:
+        string_id = self.string_ids.get(text)
+        if string_id is None:
+            string_id = self.string_ids[text] = len(self.strings)
+            self.strings.append(text)
+        return string_id
+
+    def append(self, transaction: Transaction):
+        """Add a transaction to the end of the log."""
+        self.codes.append(transaction.code.value)
+        self.account_numbers.append(transaction.account_number)
+        # Cents come from the same two-decimal rounding used to write the amount, so nothing is lost
+        self.cents.append(amount_to_cents(transaction.amount))
+        self.name_ids.append(self._string_id(transaction.account_holder_name))
+        if transaction.miscellaneous is None:
+            self.miscellaneous_ids.append(self.NO_MISCELLANEOUS)
+        else:
+            self.miscellaneous_ids.append(
+                self._string_id(str(transaction.miscellaneous))
+            )
+        if self.timestamps is not None:
+            self.timestamps.append(time.time())
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __iter__(self) -> Iterator[Transaction]:
+        strings = self.strings
+        for code, account_number, cents, name_id, miscellaneous_id in zip(
+            self.codes,
+            self.account_numbers,
+            self.cents,
+            self.name_ids,
+            self.miscellaneous_ids,
+        ):
+            yield Transaction(
+                TransactionCode(code),
+                strings[name_id],
+                account_number,
+                cents / 100,
+                None if miscellaneous_id < 0 else strings[miscellaneous_id],
+            )
+
+
 class TransactionHandler:
     """Handles transactions performed in the banking system, ensuring that they are valid based on the session kind and account details."""
 
@@ -52,9 +142,12 @@ class TransactionHandler:
     ) -> Transaction:
         """Withdraw money from an account, ensuring that the transaction is valid based on the session kind and account details."""
 
-        # Validate the account holder's name
+        # Validate the account holder's name and that the account is theirs
         if self.session.kind == "standard":
-            if account_holder_name != self.session.account_holder_name:
+            if (
+                account_holder_name != self.session.account_holder_name
+                or not self.session.owns_account(account_number)
+            ):
                 print(
                     "Bank account must be a valid account for the account holder currently logged in."
                 )
@@ -112,9 +205,12 @@ class TransactionHandler:
     ) -> Transaction:
         """Transfer money from one account to another, ensuring that the transaction is valid based on the session kind and account details."""
 
-        # Validate the account holder's name
+        # Validate the account holder's name and that the account is theirs
         if self.session.kind == "standard":
-            if from_account_holder_name != self.session.account_holder_name:
+            if (
+                from_account_holder_name != self.session.account_holder_name
+                or not self.session.owns_account(from_account_number)
+            ):
                 print(
                     "Bank account must be a valid account for the account holder currently logged in."
                 )
@@ -184,9 +280,12 @@ class TransactionHandler:
     ) -> Transaction:
         """Pay a bill from an account, ensuring that the transaction is valid based on the session kind and account details."""
 
-        # Validate the account holder's name
+        # Validate the account holder's name and that the account is theirs
         if self.session.kind == "standard":
-            if account_holder_name != self.session.account_holder_name:
+            if (
+                account_holder_name != self.session.account_holder_name
+                or not self.session.owns_account(account_number)
+            ):
                 print(
                     "Bank account must be a valid account for the account holder currently logged in."
                 )
@@ -246,7 +345,10 @@ class TransactionHandler:
 
         # Validate the account holder's name and account number based on the session kind
         if self.session.kind == "standard":
-            if account_holder_name != self.session.account_holder_name:
+            if (
+                account_holder_name != self.session.account_holder_name
+                or not self.session.owns_account(account_number)
+            ):
                 print(
                     "Bank account must be a valid account for the account holder currently logged in."
                 )
@@ -270,6 +372,11 @@ class TransactionHandler:
             print("Cannot deposit negative or zero amount.")
             return
 
+        # The transactions file holds amounts up to $99,999.99
+        if amount > 99999.99:
+            print("Deposit amount cannot exceed $99,999.99.")
+            return
+
         # Deposited funds should not be available for use in the current session
         print("Deposited funds will be available for use in the next session.")
 
@@ -293,12 +400,15 @@ class TransactionHandler:
             return
 
         # Validate the initial balance
+        if initial_balance < 0:
+            print("Initial balance cannot be negative.")
+            return
         if initial_balance > 99999.99:
             print("Initial balance cannot exceed $99,999.99.")
             return
 
         # Generate a new, unique account number
-        account_number = max(self.session.accounts.keys(), default=10000) + 1
+        account_number = self.session.accounts.max_account_number(default=10000) + 1
 
         # Add the new account to the session's accounts
         self.session.accounts[account_number] = Account(